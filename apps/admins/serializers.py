@@ -1,6 +1,8 @@
 from rest_framework import serializers
 # from ..models import Vehicle, Payment
-from apps.core.models import Payment, Vehicle
+from apps.core.models import DailyRate, LedgerEntry, NoChargeDay, Payment, Station, Vehicle
+from apps.core.services.vehicle_finance import VehicleFinanceService
+from utils.plates import validate_plate_available
 from apps.users.models import (
     TaxPayer, User, Agent
 )
@@ -15,17 +17,29 @@ class AgentsSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     class Meta:
         model = Agent
-        fields = ['id', 'user', 'full_name', 'phone', 'station_location', 'active_status']
+        fields = ['id', 'user', 'full_name', 'phone', 'station_location', 'station', 'active_status']
+
+
+class StationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Station
+        fields = ['id', 'name', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
 
 class PromoteAgentSerializer(serializers.Serializer):
     """ Validate input for promoting a user """
     user_id = serializers.UUIDField()
     station_location = serializers.CharField(required=False, allow_blank=True)
+    station = serializers.PrimaryKeyRelatedField(queryset=Station.objects.all(), required=False, allow_null=True)
     
 class CreateVehicleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vehicle
-        fields = ['plate_number', 'owner_name', 'phone_number']
+        fields = ['plate_number', 'owner_name', 'phone_number', 'station']
+
+    def validate_plate_number(self, value):
+        return validate_plate_available(value, self.instance)
 
 
 class TaxPayerSerializer(serializers.ModelSerializer):
@@ -60,25 +74,29 @@ class AdminVehicleSerializer(serializers.ModelSerializer):
     total_paid = serializers.FloatField(read_only=True)
     total_expected_revenue = serializers.FloatField(read_only=True)
     compliance_status = serializers.ReadOnlyField()
-    daily_rate = serializers.FloatField(read_only=True)
+    daily_rate = serializers.FloatField(source='current_daily_rate', read_only=True)
     exempted_days_count = serializers.ReadOnlyField() # Useful for agents to see
     
     recent_payments = serializers.SerializerMethodField()
     active_exemption = serializers.SerializerMethodField() # To show if they are currently sick
+    qr_status = serializers.CharField(read_only=True)
 
     class Meta:
         model = Vehicle
         fields = [
-            'id', 'plate_number', 'owner_name', 'phone_number', 
-            'created_at', 'is_active', 'is_approved_by_admin', 'activated_at', 
+            'id', 'plate_number', 'owner_name', 'phone_number', 'station',
+            'created_at', 'is_active', 'is_approved_by_admin', 'activated_at', 'qr_status',
             'current_balance', 'total_paid', 'total_expected_revenue',
             'daily_rate', 'compliance_status', 'exempted_days_count',
             'active_exemption',
             'recent_payments'
         ]
 
+    def validate_plate_number(self, value):
+        return validate_plate_available(value, self.instance)
+
     def get_recent_payments(self, obj):
-        payments = obj.payments.order_by('-timestamp')[:3]
+        payments = VehicleFinanceService.get_recent_payments(obj, limit=3)
         return PaymentSerializer(payments, many=True).data
 
     def get_active_exemption(self, obj):
@@ -86,14 +104,7 @@ class AdminVehicleSerializer(serializers.ModelSerializer):
         Check if there is an approved exemption currently active today.
         This helps agents know not to harass someone who is officially 'sick'.
         """
-        from django.utils import timezone
-        today = timezone.now().date()
-        
-        exemption = obj.exemptions.filter(
-            is_approved=True, 
-            start_date__lte=today, 
-            end_date__gte=today
-        ).first()
+        exemption = VehicleFinanceService.get_active_exemption(obj)
         
         if exemption:
             return {
@@ -129,3 +140,43 @@ class VehicleFinanceSerializer(serializers.ModelSerializer):
             "current_balance",
             "compliance_status",
         ]
+
+
+class LedgerEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LedgerEntry
+        fields = [
+            "id",
+            "posted_date",
+            "entry_type",
+            "debit",
+            "credit",
+            "running_balance",
+            "payment",
+            "memo",
+            "created_at",
+        ]
+
+
+class DailyRateSerializer(serializers.ModelSerializer):
+    vehicle_plate = serializers.CharField(
+        source="vehicle.plate_number",
+        read_only=True
+    )
+
+    class Meta:
+        model = DailyRate
+        fields = ["id", "vehicle", "vehicle_plate", "rate", "effective_from", "created_at"]
+        read_only_fields = ["id", "created_at"]
+
+    def validate_rate(self, value):
+        if value < 0:
+            raise serializers.ValidationError("Rate cannot be negative.")
+        return value
+
+
+class NoChargeDaySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = NoChargeDay
+        fields = ["id", "date", "reason", "description", "created_at"]
+        read_only_fields = ["id", "created_at"]
@@ -1,98 +1,408 @@
-from django.db.models import Sum, Count
-from django.db.models.functions import TruncDay, TruncMonth
+import uuid
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Case, Count, F, Sum, Value, When, BooleanField
+from django.db.models.functions import TruncHour, TruncMonth, TruncWeek
 from django.utils import timezone
-from datetime import timedelta
-from apps.core.models import Payment 
+from django.utils.dateparse import parse_date, parse_datetime
+
+from apps.core.models import Payment, PaymentDailyRollup
+from apps.users.models import Agent
+
 
 class DashboardService:
     """
-    Service to handle data aggregation for the Admin Finance Dashboard. 
+    Data aggregation for the admin dashboards (overview and finance share it).
+
+    Summary, time series, method breakdown and agent leaderboard for the selected
+    range *and* the range just before it come out of one SQL statement. Day, week and
+    month buckets read the daily payment rollups (PaymentDailyRollup), so a year is a
+    few rows per day rather than every payment: GROUPING SETS with FILTERed sums on
+    PostgreSQL, one finely grouped query rolled up in Python elsewhere (SQLite has no
+    GROUPING SETS). Hour buckets are a bounded range scan of the payments themselves.
+    Only the latest transactions are a separate (indexed, LIMIT 10) query.
+
+    The graph is dense: every bucket of the range is present, empty ones with 0.
     """
 
-    @staticmethod
-    def get_dashboard_data(period="30_days", vehicle_id=None, agent_id=None):
-        queryset = Payment.objects.filter(payment_status='success')
-        
-        # --- Date Filter ---
-        today = timezone.now()
-        start_date = today - timedelta(days=30) # Default
-
-        if period == 'today':
-            start_date = today.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif period == 'week':
-            start_date = today - timedelta(days=7)
-        elif period == 'month':
-            start_date = today - timedelta(days=30)
-        elif period == '3_months':
-            start_date = today - timedelta(days=90)
-        elif period == 'year':
-            start_date = today - timedelta(days=365)
-            
-        queryset = queryset.filter(timestamp__gte=start_date)
-
-        # --- Specific Filters ---
-        if vehicle_id:
-            queryset = queryset.filter(vehicle__id=vehicle_id)
+    PERIOD_DAYS = {
+        "week": 7,
+        "month": 30,
+        "3_months": 90,
+        "year": 365,
+    }
+    DEFAULT_DAYS = 30
+    TOP_AGENTS = 5
+    RECENT_TRANSACTIONS = 10
 
-        if agent_id:
-            queryset = queryset.filter(collected_by__id=agent_id)
+    BUCKETS = ("hour", "day", "week", "month")
+    # Automatic bucket: the first whose limit covers the range
+    BUCKET_LIMITS = (
+        ("hour", timedelta(days=2)),
+        ("day", timedelta(days=92)),
+        ("week", timedelta(days=183)),
+    )
+    MAX_POINTS = 1000
 
-        # --- Aggregations ---
-        total_revenue = queryset.aggregate(Sum('amount'))['amount__sum'] or 0
-        total_transactions = queryset.count()
-        avg_transaction = total_revenue / total_transactions if total_transactions > 0 else 0
+    # GROUPING(bucket, payment_method, collected_by_id) for each grouping set
+    TOTAL_SET, SERIES_SET, METHOD_SET, AGENT_SET = 7, 3, 5, 6
+
+    # --- Range ---
+
+    @staticmethod
+    def resolve_range(period=None, start=None, end=None, bucket=None, now=None):
+        """
+        (start, end, bucket unit) as aware datetimes, end excluded.
+
+        `start`/`end` (ISO dates or datetimes) take precedence over `period`; a date
+        `end` covers that whole day and a missing one means now. Anything coarser than
+        hour buckets is widened to whole days (the rollups are daily).
+        Raises ValueError for unparsable or inverted ranges and unknown buckets.
+        """
+        now = now or timezone.now()
+        today = timezone.localdate(now)
 
-        # --- Graph Data ---
-        if period == 'year':
-            graph_data = (
-                queryset
-                .annotate(date=TruncMonth('timestamp'))
-                .values('date')
-                .annotate(total=Sum('amount'))
-                .order_by('date')
+        if start or end:
+            range_end = DashboardService._parse_bound(end, is_end=True) if end else now
+            range_start = (
+                DashboardService._parse_bound(start, is_end=False)
+                if start else range_end - timedelta(days=DashboardService.DEFAULT_DAYS)
             )
+        elif period == 'today':
+            range_start, range_end = DashboardService._start_of(today), now
+        else:
+            days = DashboardService.PERIOD_DAYS.get(period, DashboardService.DEFAULT_DAYS)
+            range_start, range_end = DashboardService._start_of(today - timedelta(days=days)), now
+        if range_end <= range_start:
+            raise ValueError("end must be after start.")
+
+        if bucket is None:
+            # The year view keeps its monthly graph; everything else follows the span
+            if period == 'year' and not (start or end):
+                bucket = 'month'
+            else:
+                bucket = DashboardService.auto_bucket(range_end - range_start)
+        elif bucket not in DashboardService.BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(DashboardService.BUCKETS)}.")
+
+        if bucket != 'hour':
+            range_start = DashboardService._start_of(timezone.localtime(range_start).date())
+            last_day = timezone.localtime(range_end).date()
+            if range_end != DashboardService._start_of(last_day):
+                range_end = DashboardService._start_of(last_day + timedelta(days=1))
+
+        points = (range_end - range_start) / DashboardService._nominal_length(bucket)
+        if points > DashboardService.MAX_POINTS:
+            raise ValueError(f"Too many {bucket} buckets for this range; use a larger bucket.")
+        return range_start, range_end, bucket
+
+    @staticmethod
+    def auto_bucket(span):
+        for unit, limit in DashboardService.BUCKET_LIMITS:
+            if span <= limit:
+                return unit
+        return 'month'
+
+    @staticmethod
+    def _parse_bound(value, is_end):
+        try:
+            day = parse_date(value)
+            if day is not None:
+                return DashboardService._start_of(day + timedelta(days=1) if is_end else day)
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValueError("start and end must be ISO dates or datetimes.")
+        return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+    @staticmethod
+    def _nominal_length(unit):
+        lengths = {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1)}
+        return lengths.get(unit, timedelta(days=28))
+
+    # --- Buckets ---
+
+    @staticmethod
+    def _start_of(day):
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    @staticmethod
+    def _truncate(moment, unit):
+        moment = timezone.localtime(moment)
+        if unit == 'hour':
+            return moment.replace(minute=0, second=0, microsecond=0)
+        day = moment.date()
+        if unit == 'week':
+            day -= timedelta(days=day.weekday())
+        elif unit == 'month':
+            day = day.replace(day=1)
+        return DashboardService._start_of(day)
+
+    @staticmethod
+    def _next_bucket(moment, unit):
+        if unit == 'hour':
+            return moment + timedelta(hours=1)
+        day = timezone.localtime(moment).date()
+        if unit == 'day':
+            day += timedelta(days=1)
+        elif unit == 'week':
+            day += timedelta(weeks=1)
+        else:
+            day = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return DashboardService._start_of(day)
+
+    @staticmethod
+    def bucket_starts(start, end, unit):
+        bucket = DashboardService._truncate(start, unit)
+        while bucket < end:
+            yield bucket
+            bucket = DashboardService._next_bucket(bucket, unit)
+
+    @staticmethod
+    def _bucket_key(bucket):
+        # Dates from the rollups, datetimes from the payments scan
+        if isinstance(bucket, datetime):
+            return timezone.localtime(bucket) if timezone.is_aware(bucket) else timezone.make_aware(bucket)
+        return DashboardService._start_of(bucket)
+
+    # --- Entry point ---
+
+    @staticmethod
+    def get_dashboard_data(period="30_days", vehicle_id=None, agent_id=None, start=None, end=None, bucket=None):
+        """
+        Raises ValueError for a vehicle_id / agent_id that is not a UUID and for a bad
+        range or bucket (see resolve_range).
+        """
+        try:
+            vehicle_id = uuid.UUID(str(vehicle_id)) if vehicle_id else None
+            agent_id = uuid.UUID(str(agent_id)) if agent_id else None
+        except ValueError:
+            raise ValueError("vehicle_id and agent_id must be valid UUIDs.")
+
+        start, end, unit = DashboardService.resolve_range(period, start, end, bucket)
+        previous_start = start - (end - start)
+
+        if unit == 'hour':
+            totals = DashboardService._aggregate_payments(previous_start, start, end, vehicle_id, agent_id)
+        elif connection.vendor == 'postgresql':
+            totals = DashboardService._aggregate_grouping_sets(previous_start, start, end, unit, vehicle_id, agent_id)
         else:
-            graph_data = (
-                queryset
-                .annotate(date=TruncDay('timestamp'))
-                .values('date')
-                .annotate(total=Sum('amount'))
-                .order_by('date')
+            totals = DashboardService._aggregate_grouped(previous_start, start, end, unit, vehicle_id, agent_id)
+
+        return DashboardService._build_response(totals, start, end, unit, vehicle_id, agent_id)
+
+    # --- Aggregation (one statement) ---
+
+    @staticmethod
+    def _empty_totals():
+        return {
+            "current": [Decimal("0.00"), 0],
+            "previous": [Decimal("0.00"), 0],
+            "series": {},
+            "methods": {},
+            "agents": {},
+        }
+
+    @staticmethod
+    def _aggregate_grouping_sets(previous_start, start, end, unit, vehicle_id, agent_id):
+        # Day-aligned range (see resolve_range), so plain date bounds on the rollups
+        filters = ["day >= %s", "day < %s"]
+        params = [unit, timezone.localdate(start), timezone.localdate(previous_start), timezone.localdate(end)]
+        if vehicle_id:
+            filters.append("vehicle_id = %s")
+            params.append(vehicle_id)
+        if agent_id:
+            filters.append("collected_by_id = %s")
+            params.append(agent_id)
+
+        sql = f"""
+            WITH scoped AS (
+                SELECT
+                    date_trunc(%s, day)::date AS bucket,
+                    payment_method,
+                    collected_by_id,
+                    total_amount,
+                    payment_count,
+                    day >= %s AS is_current
+                FROM {PaymentDailyRollup._meta.db_table}
+                WHERE {" AND ".join(filters)}
             )
+            SELECT
+                GROUPING(bucket, payment_method, collected_by_id),
+                bucket,
+                payment_method,
+                collected_by_id,
+                COALESCE(SUM(total_amount) FILTER (WHERE is_current), 0),
+                COALESCE(SUM(payment_count) FILTER (WHERE is_current), 0),
+                COALESCE(SUM(total_amount) FILTER (WHERE NOT is_current), 0),
+                COALESCE(SUM(payment_count) FILTER (WHERE NOT is_current), 0),
+                COALESCE(SUM(total_amount) FILTER (WHERE is_current AND payment_method = 'agent'), 0),
+                COALESCE(SUM(payment_count) FILTER (WHERE is_current AND payment_method = 'agent'), 0)
+            FROM scoped
+            GROUP BY GROUPING SETS ((), (bucket), (payment_method), (collected_by_id))
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
 
-        # --- Agent Performance ---
-        agent_performance = (
-            queryset.filter(payment_method='agent')
-            .values('collected_by__id', 'collected_by__user__email', 'collected_by__full_name')
+        totals = DashboardService._empty_totals()
+        for grouping, bucket, method, agent, total, count, previous_total, previous_count, agent_total, agent_count in rows:
+            if grouping == DashboardService.TOTAL_SET:
+                totals["current"] = [total, count]
+                totals["previous"] = [previous_total, previous_count]
+            elif grouping == DashboardService.SERIES_SET and count:
+                totals["series"][DashboardService._bucket_key(bucket)] = total
+            elif grouping == DashboardService.METHOD_SET and count:
+                totals["methods"][method] = total
+            elif grouping == DashboardService.AGENT_SET and agent_count:
+                totals["agents"][agent] = [agent_total, agent_count]
+        return totals
+
+    @staticmethod
+    def _aggregate_grouped(previous_start, start, end, unit, vehicle_id, agent_id):
+        queryset = PaymentDailyRollup.objects.filter(
+            day__gte=timezone.localdate(previous_start), day__lt=timezone.localdate(end)
+        )
+        if vehicle_id:
+            queryset = queryset.filter(vehicle_id=vehicle_id)
+        if agent_id:
+            queryset = queryset.filter(collected_by_id=agent_id)
+
+        buckets = {'week': TruncWeek('day'), 'month': TruncMonth('day')}
+        rows = (
+            queryset
             .annotate(
-                total_collected=Sum('amount'),
-                transaction_count=Count('id')
+                bucket=buckets.get(unit, F('day')),
+                is_current=Case(
+                    When(day__gte=timezone.localdate(start), then=Value(True)),
+                    default=Value(False), output_field=BooleanField(),
+                ),
             )
-            .order_by('-total_collected')[:5]
+            .values_list('bucket', 'payment_method', 'collected_by_id', 'is_current')
+            .annotate(total=Sum('total_amount'), count=Sum('payment_count'))
+            .order_by()
         )
+        return DashboardService._roll_up(rows)
 
-        top_agents_clean = []
-        for agent in agent_performance:
-            # Use full name if available, else email
-            name = agent['collected_by__full_name'] or agent['collected_by__user__email'] or "Unknown Agent"
-            top_agents_clean.append({
-                "id": agent['collected_by__id'],
-                "collected_by": name,
-                "total_collected": agent['total_collected'],
-                "transaction_count": agent['transaction_count']
-            })
+    @staticmethod
+    def _aggregate_payments(previous_start, start, end, vehicle_id, agent_id):
+        """
+        Hour buckets: the rollups are too coarse, so the payments of both ranges
+        (at most a few days) are grouped directly.
+        """
+        queryset = Payment.objects.filter(payment_status='success', timestamp__gte=previous_start, timestamp__lt=end)
+        if vehicle_id:
+            queryset = queryset.filter(vehicle_id=vehicle_id)
+        if agent_id:
+            queryset = queryset.filter(collected_by_id=agent_id)
 
-        # --- Method Breakdown ---
-        method_breakdown = (
-            queryset.values('payment_method')
-            .annotate(total=Sum('amount'))
-            .order_by('-total')
+        rows = (
+            queryset
+            .annotate(
+                bucket=TruncHour('timestamp'),
+                is_current=Case(When(timestamp__gte=start, then=Value(True)), default=Value(False), output_field=BooleanField()),
+            )
+            .values_list('bucket', 'payment_method', 'collected_by_id', 'is_current')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
         )
+        return DashboardService._roll_up(rows)
+
+    @staticmethod
+    def _roll_up(rows):
+        totals = DashboardService._empty_totals()
+        for bucket, method, agent, is_current, total, count in rows:
+            if not is_current:
+                totals["previous"][0] += total
+                totals["previous"][1] += count
+                continue
+            bucket = DashboardService._bucket_key(bucket)
+            totals["current"][0] += total
+            totals["current"][1] += count
+            totals["series"][bucket] = totals["series"].get(bucket, 0) + total
+            totals["methods"][method] = totals["methods"].get(method, 0) + total
+            if method == 'agent':
+                agent_totals = totals["agents"].setdefault(agent, [0, 0])
+                agent_totals[0] += total
+                agent_totals[1] += count
+        return totals
+
+    # --- Response ---
+
+    @staticmethod
+    def _change(current, previous):
+        if not previous:
+            return None
+        return round((Decimal(current) - Decimal(previous)) * 100 / Decimal(previous), 2)
+
+    @staticmethod
+    def _build_response(totals, start, end, unit, vehicle_id, agent_id):
+        total_revenue, total_transactions = totals["current"]
+        previous_revenue, previous_transactions = totals["previous"]
+        total_revenue = total_revenue or 0
+        avg_transaction = total_revenue / total_transactions if total_transactions > 0 else 0
+
+        # --- Agent Performance ---
+        ranked = sorted(totals["agents"].items(), key=lambda item: item[1][0], reverse=True)[:DashboardService.TOP_AGENTS]
+        names = {
+            agent['id']: agent['full_name'] or agent['user__email']
+            for agent in Agent.objects.filter(pk__in=[pk for pk, _ in ranked if pk]).values('id', 'full_name', 'user__email')
+        }
+        top_agents_clean = [
+            {
+                "id": pk,
+                # Use full name if available, else email
+                "collected_by": names.get(pk) or "Unknown Agent",
+                "total_collected": total,
+                "transaction_count": count,
+            }
+            for pk, (total, count) in ranked
+        ]
+
+        # --- Method Breakdown ---
+        method_breakdown = [
+            {"payment_method": method, "total": total}
+            for method, total in sorted(totals["methods"].items(), key=lambda item: item[1], reverse=True)
+        ]
+
+        # --- Time Series (every bucket, empty ones as 0) ---
+        graph_data = [
+            {"date": bucket, "total": totals["series"].get(bucket, 0)}
+            for bucket in DashboardService.bucket_starts(start, end, unit)
+        ]
+
+        return {
+            "summary": {
+                "total_revenue": total_revenue,
+                "total_transactions": total_transactions,
+                "average_value": round(avg_transaction, 2)
+            },
+            "comparison": {
+                "previous_revenue": previous_revenue or 0,
+                "previous_transactions": previous_transactions,
+                "revenue_change_pct": DashboardService._change(total_revenue, previous_revenue),
+                "transactions_change_pct": DashboardService._change(total_transactions, previous_transactions),
+            },
+            "graph_data": graph_data,
+            "top_agents": top_agents_clean,
+            "payment_methods": method_breakdown,
+            "recent_transactions": DashboardService._recent_transactions(start, end, vehicle_id, agent_id),
+        }
+
+    @staticmethod
+    def _recent_transactions(start, end, vehicle_id, agent_id):
+        queryset = Payment.objects.filter(payment_status='success', timestamp__gte=start, timestamp__lt=end)
+        if vehicle_id:
+            queryset = queryset.filter(vehicle_id=vehicle_id)
+        if agent_id:
+            queryset = queryset.filter(collected_by_id=agent_id)
 
-        # --- Recent Transactions ---
-        recent_transactions = queryset.select_related('vehicle', 'collected_by').order_by('-timestamp')[:10]
         recent_data = []
-        for p in recent_transactions:
+        recent = queryset.select_related('vehicle', 'collected_by').order_by('-timestamp')[:DashboardService.RECENT_TRANSACTIONS]
+        for p in recent:
             if p.collected_by:
                 agent_name = p.collected_by.full_name
             else:
@@ -106,15 +416,4 @@ class DashboardService:
                 "agent": agent_name,
                 "date": p.timestamp
             })
-
-        return {
-            "summary": {
-                "total_revenue": total_revenue,
-                "total_transactions": total_transactions,
-                "average_value": round(avg_transaction, 2)
-            },
-            "graph_data": list(graph_data),
-            "top_agents": top_agents_clean,
-            "payment_methods": list(method_breakdown),
-            "recent_transactions": recent_data
-        }
+        return recent_data
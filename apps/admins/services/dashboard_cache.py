@@ -0,0 +1,121 @@
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import connection
+
+from apps.admins.services.dashboard import DashboardService
+from apps.core.services.payment_rollup import PaymentRollupService
+
+
+class DashboardCache:
+    """
+    Response cache in front of DashboardService.
+
+    Entries are keyed by the request arguments (period or start/end, bucket, vehicle_id,
+    agent_id) and stamped with the payments
+    version (PaymentRollupService.version), which every payment change bumps; an entry
+    of an older version, or older than FRESH_SECONDS, is stale.
+
+    Concurrent misses on one key are coalesced with a cache lock: one request computes,
+    the others wait for its entry. Within STALE_SECONDS of being built a stale entry is
+    still served immediately while one background refresh replaces it (0 turns that off).
+    Both the version and the lock need a cache every process shares (settings.prod).
+    """
+
+    FRESH_SECONDS = 60
+    STALE_SECONDS = 300
+    LOCK_SECONDS = 30
+    WAIT_SECONDS = 10
+    POLL_SECONDS = 0.05
+
+    @staticmethod
+    def key(period, vehicle_id=None, agent_id=None, start=None, end=None, bucket=None):
+        parts = (period, vehicle_id, agent_id, start, end, bucket)
+        return "dashboard:" + ":".join(str(part or "-") for part in parts)
+
+    @staticmethod
+    def get(period="30_days", vehicle_id=None, agent_id=None, start=None, end=None, bucket=None, allow_stale=True):
+        """
+        Same result (and ValueErrors) as DashboardService.get_dashboard_data.
+        """
+        args = (period, vehicle_id, agent_id, start, end, bucket)
+        key = DashboardCache.key(*args)
+        version = PaymentRollupService.version()
+
+        entry = cache.get(key)
+        if entry is not None:
+            age = time.time() - entry["built_at"]
+            if entry["version"] == version and age < DashboardCache.FRESH_SECONDS:
+                return entry["data"]
+            stale_ok = allow_stale and DashboardCache.STALE_SECONDS > 0
+            if stale_ok and age < DashboardCache.FRESH_SECONDS + DashboardCache.STALE_SECONDS:
+                DashboardCache._refresh_in_background(key, args)
+                return entry["data"]
+
+        return DashboardCache._compute_once(key, args, version)
+
+    @staticmethod
+    def invalidate(period, vehicle_id=None, agent_id=None, start=None, end=None, bucket=None):
+        cache.delete(DashboardCache.key(period, vehicle_id, agent_id, start, end, bucket))
+
+    # --- Single flight ---
+
+    @staticmethod
+    def _acquire(key):
+        token = uuid.uuid4().hex
+        return token if cache.add(f"{key}:lock", token, DashboardCache.LOCK_SECONDS) else None
+
+    @staticmethod
+    def _release(key, token):
+        if cache.get(f"{key}:lock") == token:
+            cache.delete(f"{key}:lock")
+
+    @staticmethod
+    def _build(key, args):
+        # Version read first: a payment landing mid-aggregation leaves the entry stale
+        version = PaymentRollupService.version()
+        data = DashboardService.get_dashboard_data(*args)
+        cache.set(
+            key,
+            {"version": version, "built_at": time.time(), "data": data},
+            DashboardCache.FRESH_SECONDS + DashboardCache.STALE_SECONDS,
+        )
+        return data
+
+    @staticmethod
+    def _compute_once(key, args, version):
+        token = DashboardCache._acquire(key)
+        if token:
+            try:
+                return DashboardCache._build(key, args)
+            finally:
+                DashboardCache._release(key, token)
+
+        # Someone else is computing it: wait for their entry
+        deadline = time.monotonic() + DashboardCache.WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(DashboardCache.POLL_SECONDS)
+            entry = cache.get(key)
+            if entry is not None and entry["version"] >= version:
+                return entry["data"]
+            if cache.get(f"{key}:lock") is None:
+                # They gave up (error) without leaving an entry
+                break
+        return DashboardCache._build(key, args)
+
+    @staticmethod
+    def _refresh_in_background(key, args):
+        token = DashboardCache._acquire(key)
+        if not token:
+            return
+
+        def refresh():
+            try:
+                DashboardCache._build(key, args)
+            finally:
+                DashboardCache._release(key, token)
+                connection.close()
+
+        threading.Thread(target=refresh, daemon=True).start()
@@ -14,7 +14,16 @@ from .views import (
     AdminDashboardView,
     AdminFinanceDashboardView,
     AgentDetailView,
-    AgentListView
+    AgentListView,
+    AdminVehicleFinanceListView,
+    AdminFleetHealthView,
+    AdminDailyRateListCreateView,
+    AdminDailyRateDeleteView,
+    AdminNoChargeDayListCreateView,
+    AdminNoChargeDayDeleteView,
+    AdminStationListCreateView,
+    AdminStationDetailView,
+    AdminQRCodeQueueView
 )
 
 
@@ -33,10 +42,14 @@ urlpatterns = [
     # agents
     path('agents/', AgentListView.as_view(), name='agent_list'),
     path('agents/<uuid:id>/', AgentDetailView.as_view(), name='agent_detail'),
+
+    # stations
+    path('stations/', AdminStationListCreateView.as_view(), name='station_list'),
+    path('stations/<int:pk>/', AdminStationDetailView.as_view(), name='station_detail'),
     
     # vehicles
     path('vehicles/<uuid:id>/approve/', VehicleViewSet.as_view({'post': 'approve_vehicle'}), name='approve-vehicle'),
-    # path("vehicles/finance/", AdminVehicleFinanceListView.as_view()),
+    path("vehicles/finance/", AdminVehicleFinanceListView.as_view()),
 
     # Payments
     path("payments/", AdminPaymentListView.as_view()),
@@ -44,10 +57,17 @@ urlpatterns = [
     path("payments/<uuid:pk>/update/", AdminPaymentUpdateView.as_view()),
     path("payments/<uuid:pk>/delete/", AdminPaymentDeleteView.as_view()),
 
+    # Rate schedule
+    path("rates/", AdminDailyRateListCreateView.as_view()),
+    path("rates/<int:pk>/delete/", AdminDailyRateDeleteView.as_view()),
+    path("calendar/no-charge/", AdminNoChargeDayListCreateView.as_view()),
+    path("calendar/no-charge/<int:pk>/delete/", AdminNoChargeDayDeleteView.as_view()),
 
     # Dashboard
     path("dashboard/", AdminDashboardView.as_view()),
     path("dashboard/finance/", AdminFinanceDashboardView.as_view()),
+    path("dashboard/fleet-health/", AdminFleetHealthView.as_view()),
+    path("dashboard/qr-codes/", AdminQRCodeQueueView.as_view()),
 
 
 
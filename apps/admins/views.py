@@ -13,6 +13,9 @@ from rest_framework import generics, filters
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.views import APIView
+from datetime import date, timedelta
+from django.db.models import F
+from django.utils import timezone
 from apps.users.models import  (
     TaxPayer,
     User,
@@ -21,13 +24,19 @@ from apps.users.models import  (
 from apps.users.api import (
     UserProfileSerializer
 )
+from utils.pagination import KeysetPagination
+from utils.plates import PlateLookupMixin, plate_key
+from utils.search import VehicleSearchFilter
 from utils.permissions import (
     IsAdmin, 
     
 )
 from apps.core.models import(
     Vehicle, 
-    Payment
+    Payment,
+    DailyRate,
+    NoChargeDay,
+    Station
 )
 from .serializers import (
     AgentsSerializer,
@@ -35,12 +44,19 @@ from .serializers import (
     CreateVehicleSerializer,
     VehicleFinanceSerializer,
     AdminVehicleSerializer,
+    LedgerEntrySerializer,
+    DailyRateSerializer,
+    NoChargeDaySerializer,
     UserSerializer,
-    PromoteAgentSerializer
+    PromoteAgentSerializer,
+    StationSerializer
     
 )
-from apps.admins.services.dashboard import DashboardService
-from apps.admins.services.finance import FinanceDashboardService
+from apps.core.services.vehicle_finance import VehicleFinanceService
+from apps.core.services.fleet_finance import FleetFinanceCalculator
+from apps.core.services.tax_ledger import TaxLedgerService
+from apps.core.services.qr_codes import QRCodeService
+from apps.admins.services.dashboard_cache import DashboardCache
 
 class AgentListView(generics.ListAPIView):
     """
@@ -49,10 +65,12 @@ class AgentListView(generics.ListAPIView):
     permission_classes = [IsAdmin]
     serializer_class = AgentsSerializer
     queryset = Agent.objects.select_related("user").all().order_by('-created_at')
+    pagination_class = KeysetPagination
 
-class AgentDetailView(generics.RetrieveAPIView):
+class AgentDetailView(generics.RetrieveUpdateAPIView):
     """
     Retrieve details of a specific user by ID.
+    PATCH { "station": 3 } moves the agent to another station (null = whole fleet).
     """
     permission_classes = [IsAdmin]
     serializer_class = AgentsSerializer
@@ -61,6 +79,24 @@ class AgentDetailView(generics.RetrieveAPIView):
     lookup_field = 'id'
 
 
+class AdminStationListCreateView(generics.ListCreateAPIView):
+    """
+    Stations that agents and vehicles are assigned to.
+    """
+    permission_classes = [IsAdmin]
+    serializer_class = StationSerializer
+    queryset = Station.objects.all()
+
+
+class AdminStationDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Deleting a station leaves its agents and vehicles unassigned (whole fleet).
+    """
+    permission_classes = [IsAdmin]
+    serializer_class = StationSerializer
+    queryset = Station.objects.all()
+
+
 class PotentialAgentsListView(generics.ListAPIView):
     """
     Returns a list of users with role='taxpayer'.
@@ -77,8 +113,9 @@ from django.db import transaction
 
 class PromoteToAgentView(APIView):
     """
-    Payload: { "user_id": "...", "station_location": "Main Market" }
+    Payload: { "user_id": "...", "station_location": "Main Market" } or { "user_id": "...", "station": 3 }
     Action: Changes role to 'agent' and creates Agent profile.
+    A station_location without a station assigns the station of that name (created if new).
     """
     permission_classes = [IsAdmin]
 
@@ -88,7 +125,8 @@ class PromoteToAgentView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         user_id = serializer.validated_data['user_id']
-        station = serializer.validated_data.get('station_location', '')
+        station_location = serializer.validated_data.get('station_location', '').strip()
+        station = serializer.validated_data.get('station')
 
         user = get_object_or_404(User, id=user_id)
 
@@ -107,13 +145,20 @@ class PromoteToAgentView(APIView):
                 if hasattr(user, 'tax_payer_profile'):
                     full_name = user.tax_payer_profile.full_name
 
-                # 3. Create Agent Profile
+                # 3. Resolve the station
+                if station is None and station_location:
+                    station, _ = Station.objects.get_or_create(name=station_location)
+                if station is not None and not station_location:
+                    station_location = station.name
+
+                # 4. Create Agent Profile
                 # We use update_or_create just in case a profile was left over from before
                 Agent.objects.update_or_create(
                     user=user,
                     defaults={
                         'full_name': full_name,
-                        'station_location': station
+                        'station_location': station_location,
+                        'station': station
                     }
                 )
 
@@ -127,14 +172,33 @@ class PromoteToAgentView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class VehicleViewSet(viewsets.ModelViewSet):
-    queryset = Vehicle.objects.all().order_by('-created_at')
+class VehicleViewSet(PlateLookupMixin, viewsets.ModelViewSet):
+    queryset = VehicleFinanceService.with_finance(Vehicle.objects.all()).order_by('-created_at')
     serializer_class = AdminVehicleSerializer
     permission_classes = [IsAdmin]
-    
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['plate_number', 'phone_number']
-    lookup_field = 'plate_number'      
+    pagination_class = KeysetPagination
+
+    filter_backends = [VehicleSearchFilter]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        # ?min_debt_days=7 -> vehicles that have not been covered for more than 7 days
+        min_debt_days = self.request.query_params.get('min_debt_days')
+        if min_debt_days and min_debt_days.isdigit():
+            cutoff = timezone.now().date() - timedelta(days=int(min_debt_days))
+            queryset = queryset.filter(ledger_state__paid_through__lt=cutoff)
+
+        # ?station=3 -> one station's vehicles (uses the station index)
+        station = self.request.query_params.get('station')
+        if station and station.isdigit():
+            queryset = queryset.filter(station_id=int(station))
+
+        # ?sort=debt -> deepest debt first (indexed scan on paid_through)
+        if self.request.query_params.get('sort') == 'debt':
+            queryset = queryset.order_by(F('ledger_state__paid_through').asc(nulls_last=True))
+
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(is_active=True, is_approved_by_admin=True)
@@ -161,20 +225,58 @@ class VehicleViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
 
+    @action(detail=True, methods=['get'])
+    def ledger(self, request, plate_number=None):
+        """
+        Ledger statement. ?as_of=YYYY-MM-DD gives the balance at the end of that day
+        and the entries up to it; ?start= limits how far back the entries go.
+        """
+        vehicle = self.get_object()
+
+        try:
+            as_of = date.fromisoformat(request.query_params.get('as_of') or timezone.now().date().isoformat())
+            start = request.query_params.get('start')
+            start = date.fromisoformat(start) if start else None
+        except ValueError:
+            return Response(
+                {"detail": "Dates must be YYYY-MM-DD."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        entries = TaxLedgerService.statement(vehicle.pk, start=start, end=as_of)
+        return Response({
+            "plate_number": vehicle.plate_number,
+            "as_of": as_of,
+            "balance": TaxLedgerService.balance_as_of(vehicle.pk, as_of),
+            "entries": LedgerEntrySerializer(entries, many=True).data,
+        })
+
+
 
+class AdminVehicleFinanceListView(generics.ListAPIView):
+    """
+    Fleet finance list. ?status=ACTIVE|OWING|INACTIVE_DUE_TO_DEBT filters on the
+    stored compliance tier (indexed, refreshed on every write and by the daily
+    process_status_crossings run).
+    """
+    serializer_class = VehicleFinanceSerializer
+    permission_classes = [IsAdmin]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = Vehicle.objects.all().order_by('-created_at')
 
-# class AdminVehicleFinanceListView(generics.ListAPIView):
-#     serializer_class = VehicleFinanceSerializer
-#     permission_classes = [IsAdmin]
+        status = self.request.query_params.get("status")
+        if status:
+            queryset = queryset.filter(ledger_state__compliance_status=status.upper())
 
-#     def get_queryset(self):
-#         status = self.request.query_params.get("status")
-#         # return VehicleFinanceListService.get_filtered_vehicles(status)
+        return VehicleFinanceService.with_finance(queryset)
 
 class AdminPaymentListView(generics.ListAPIView):
     queryset = Payment.objects.select_related("vehicle").order_by("-timestamp")
     serializer_class = PaymentSerializer
     permission_classes = [IsAdmin]
+    pagination_class = KeysetPagination
 
     filter_backends = [
         DjangoFilterBackend,
@@ -207,11 +309,69 @@ class AdminPaymentUpdateView(generics.UpdateAPIView):
     serializer_class = PaymentSerializer
     permission_classes = [IsAdmin]
 
+    def perform_update(self, serializer):
+        # Keep the vehicle ledger counters in the same transaction as the edit
+        # (the payment signal locks the row before reading its previous state)
+        with transaction.atomic():
+            serializer.save()
+
 
 class AdminPaymentDeleteView(generics.DestroyAPIView):
     queryset = Payment.objects.all()
     permission_classes = [IsAdmin]
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+
+
+class AdminDailyRateListCreateView(generics.ListCreateAPIView):
+    """
+    Rate schedule. Rows without a vehicle are the global rate; ?vehicle=<plate> lists
+    one vehicle's overrides, ?scope=global only the global rows.
+    """
+    serializer_class = DailyRateSerializer
+    permission_classes = [IsAdmin]
+
+    def get_queryset(self):
+        queryset = DailyRate.objects.select_related("vehicle").order_by("vehicle", "effective_from")
+
+        plate = self.request.query_params.get("vehicle")
+        if plate:
+            queryset = queryset.filter(vehicle__plate_key=plate_key(plate))
+        elif self.request.query_params.get("scope") == "global":
+            queryset = queryset.filter(vehicle__isnull=True)
+
+        return queryset
+
+
+class AdminDailyRateDeleteView(generics.DestroyAPIView):
+    queryset = DailyRate.objects.all()
+    permission_classes = [IsAdmin]
+
+
+class AdminNoChargeDayListCreateView(generics.ListCreateAPIView):
+    """
+    Fleet-wide no-charge days (holidays, strikes, lockdowns). ?year=2026 filters.
+    """
+    serializer_class = NoChargeDaySerializer
+    permission_classes = [IsAdmin]
+
+    def get_queryset(self):
+        queryset = NoChargeDay.objects.all()
+
+        year = self.request.query_params.get("year")
+        if year and year.isdigit():
+            queryset = queryset.filter(date__year=int(year))
+
+        return queryset
+
+
+class AdminNoChargeDayDeleteView(generics.DestroyAPIView):
+    queryset = NoChargeDay.objects.all()
+    permission_classes = [IsAdmin]
+
+
 class AdminDashboardView(APIView):
     permission_classes = [IsAdmin]
 
@@ -219,25 +379,44 @@ class AdminDashboardView(APIView):
         period = request.query_params.get('period', '30_days')
         vehicle_id = request.query_params.get('vehicle_id')
         agent_id = request.query_params.get('agent_id')
-        
-        data = DashboardService.get_dashboard_data(
-            period=period,
-            vehicle_id=vehicle_id,
-            agent_id=agent_id
-        )
+
+        try:
+            data = DashboardCache.get(
+                period=period,
+                vehicle_id=vehicle_id,
+                agent_id=agent_id,
+                start=request.query_params.get('start'),
+                end=request.query_params.get('end'),
+                bucket=request.query_params.get('bucket'),
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response(data)
-    
-class AdminFinanceDashboardView(APIView):
+
+
+class AdminFinanceDashboardView(AdminDashboardView):
+    """
+    Same figures (and cache entries) as the overview dashboard.
+    """
+
+
+class AdminQRCodeQueueView(APIView):
+    """
+    Sticker QR job health: pending / ready / failed counts, throughput over the last
+    hour and the age of the oldest pending vehicle (see QRCodeService.stats).
+    """
     permission_classes = [IsAdmin]
 
     def get(self, request):
-        period = request.query_params.get('period', '30_days')
-        vehicle_id = request.query_params.get('vehicle_id')
-        agent_id = request.query_params.get('agent_id')
-        
-        data = FinanceDashboardService.get_dashboard_data(
-            period=period,
-            vehicle_id=vehicle_id,
-            agent_id=agent_id
-        )
-        return Response(data)
\ No newline at end of file
+        return Response(QRCodeService.stats())
+
+
+class AdminFleetHealthView(APIView):
+    """
+    Fleet-wide compliance tiers and money totals, computed with the vectorized calculator.
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        calculator = FleetFinanceCalculator().run()
+        return Response(calculator.summary())
@@ -1,6 +1,10 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 # from ..models import Vehicle, Payment
 from apps.core.models import Payment, Vehicle
+from apps.core.services.vehicle_finance import VehicleFinanceService
+from utils.plates import validate_plate_available
 from apps.users.models import (
     TaxPayer
 )
@@ -31,7 +35,7 @@ class AgentVehicleSerializer(serializers.ModelSerializer):
     total_paid = serializers.FloatField(read_only=True)
     total_expected_revenue = serializers.FloatField(read_only=True)
     compliance_status = serializers.ReadOnlyField()
-    daily_rate = serializers.FloatField(read_only=True)
+    daily_rate = serializers.FloatField(source='current_daily_rate', read_only=True)
     exempted_days_count = serializers.ReadOnlyField() # Useful for agents to see
     
     recent_payments = serializers.SerializerMethodField()
@@ -48,8 +52,11 @@ class AgentVehicleSerializer(serializers.ModelSerializer):
             'recent_payments'
         ]
 
+    def validate_plate_number(self, value):
+        return validate_plate_available(value, self.instance)
+
     def get_recent_payments(self, obj):
-        payments = obj.payments.order_by('-timestamp')[:3]
+        payments = VehicleFinanceService.get_recent_payments(obj, limit=3)
         return PaymentSerializer(payments, many=True).data
 
     def get_active_exemption(self, obj):
@@ -57,14 +64,7 @@ class AgentVehicleSerializer(serializers.ModelSerializer):
         Check if there is an approved exemption currently active today.
         This helps agents know not to harass someone who is officially 'sick'.
         """
-        from django.utils import timezone
-        today = timezone.now().date()
-        
-        exemption = obj.exemptions.filter(
-            is_approved=True, 
-            start_date__lte=today, 
-            end_date__gte=today
-        ).first()
+        exemption = VehicleFinanceService.get_active_exemption(obj)
         
         if exemption:
             return {
@@ -100,3 +100,34 @@ class VehicleFinanceSerializer(serializers.ModelSerializer):
             "current_balance",
             "compliance_status",
         ]
+
+
+class ScanBatchSerializer(serializers.Serializer):
+    """ Plates checked in one park sweep """
+    MAX_PLATES = 300
+
+    plates = serializers.ListField(
+        child=serializers.CharField(max_length=32),
+        allow_empty=False,
+        max_length=MAX_PLATES,
+    )
+
+
+class OfflineCollectionSerializer(serializers.Serializer):
+    """ One cash collection queued on the device while offline """
+    idempotency_key = serializers.CharField(max_length=64)
+    plate_number = serializers.CharField(max_length=32)
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0.01"))
+    collected_at = serializers.DateTimeField()
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+
+class PaymentSyncSerializer(serializers.Serializer):
+    """ An end-of-shift upload of offline collections """
+    MAX_COLLECTIONS = 500
+
+    collections = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=MAX_COLLECTIONS,
+    )
@@ -0,0 +1,47 @@
+import pytest
+from rest_framework.test import APIClient
+
+from apps.core.models import Payment, Station, Vehicle
+from apps.users.models import Agent, User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def stations():
+    return Station.objects.create(name="North Park"), Station.objects.create(name="South Market")
+
+
+@pytest.fixture
+def client(stations):
+    user = User.objects.create_user(email="sync-agent@example.com", password="unused", role="agent")
+    Agent.objects.create(user=user, full_name="Sync Agent", phone="08000000000", station=stations[0])
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def make_vehicle(plate, station):
+    return Vehicle.objects.create(
+        plate_number=plate, owner_name="Test Owner", phone_number="08000000000", station=station
+    )
+
+
+def collection(key, plate):
+    return {"idempotency_key": key, "plate_number": plate, "amount": "150.00", "collected_at": "2026-10-18T07:45:00Z"}
+
+
+def test_sync_rejects_plates_of_other_stations(client, stations):
+    home = make_vehicle("SY-001", stations[0])
+    away = make_vehicle("SY-002", stations[1])
+
+    response = client.post(
+        "/api/agent/payments/sync/",
+        {"collections": [collection("k1", "SY-001"), collection("k2", "SY-002")]},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.data["results"]] == ["created", "rejected"]
+    assert Payment.objects.filter(vehicle=home).count() == 1
+    assert not Payment.objects.filter(vehicle=away).exists()
@@ -2,7 +2,10 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     AgentVehicleViewSet, 
-    
+    AgentScanView,
+    AgentScanBatchView,
+    AgentPaymentSyncView,
+    AgentSyncFeedView,
 )
 
 agent_router = DefaultRouter()
@@ -11,4 +14,8 @@ agent_router.register(r'vehicles', AgentVehicleViewSet, basename='agent-vehicles
 
 urlpatterns = [
     path('', include(agent_router.urls)),
+    path('scan/', AgentScanBatchView.as_view(), name='agent-scan-batch'),
+    path('payments/sync/', AgentPaymentSyncView.as_view(), name='agent-payment-sync'),
+    path('sync/', AgentSyncFeedView.as_view(), name='agent-sync-feed'),
+    path('scan/<str:plate_number>/', AgentScanView.as_view(), name='agent-scan'),
 ]
@@ -9,6 +9,7 @@ from rest_framework import (
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
 from rest_framework import generics, filters
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.views import APIView
@@ -29,26 +30,54 @@ from apps.core.models import(
     Vehicle, 
     Payment
 )
+from apps.core.services.vehicle_finance import VehicleFinanceService
+from apps.core.services.scan_card import ScanCardService
+from apps.core.services.payment_sync import PaymentSyncService
+from apps.core.services.change_feed import VehicleChangeFeed
 from .serializers import (
-    AgentVehicleSerializer
+    AgentVehicleSerializer,
+    OfflineCollectionSerializer,
+    PaymentSyncSerializer,
+    ScanBatchSerializer
 )
+from utils.pagination import KeysetPagination
+from utils.plates import PlateLookupMixin, plate_key
+from utils.search import VehicleSearchFilter
 from utils.permissions import (
     IsAgent
 )
 
-class AgentVehicleViewSet(viewsets.ModelViewSet):
-    queryset = Vehicle.objects.all().order_by('-created_at')
+class StationScopeMixin:
+    """
+    Partitions agent endpoints by the agent's home station (Agent.station): listing,
+    lookups, search, scans and the sync feed only see that station's vehicles.
+    Agents without a station (and admins) keep the whole fleet.
+    """
+
+    def get_station_id(self):
+        if not hasattr(self, '_station_id'):
+            self._station_id = (
+                Agent.objects.filter(user=self.request.user).values_list('station_id', flat=True).first()
+            )
+        return self._station_id
+
+
+class AgentVehicleViewSet(StationScopeMixin, PlateLookupMixin, viewsets.ModelViewSet):
+    queryset = VehicleFinanceService.with_finance(Vehicle.objects.all()).order_by('-created_at')
     serializer_class = AgentVehicleSerializer
     permission_classes = [IsAgent]
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['plate_number', 'phone_number']
-    lookup_field = 'plate_number' 
+    pagination_class = KeysetPagination
+    filter_backends = [VehicleSearchFilter]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        station_id = self.get_station_id()
+        if station_id is not None:
+            queryset = queryset.filter(station_id=station_id)
+        return queryset
 
     def retrieve(self, request, *args, **kwargs):
-        vehicle = get_object_or_404(
-            Vehicle,
-            plate_number__iexact=kwargs[self.lookup_field]
-        )
+        vehicle = self.get_object()
 
         if not vehicle.is_active:
             return Response(
@@ -63,9 +92,10 @@ class AgentVehicleViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     # modify the vehicle the creation and  make status true if admin created else false
+    # Vehicles registered by an agent belong to the agent's station
     def perform_create(self, serializer):
         if self.request.user.role == 'agent':
-            serializer.save(is_active=False, is_approved_by_admin=False)
+            serializer.save(is_active=False, is_approved_by_admin=False, station_id=self.get_station_id())
         else:
             serializer.save(is_active=True, is_approved_by_admin=True)
 
@@ -81,16 +111,162 @@ class AgentVehicleViewSet(viewsets.ModelViewSet):
         if not amount:
             return Response({"error": "Amount is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Record the payment
-        Payment.objects.create(
-            vehicle=vehicle,
-            amount=amount,
-            payment_method='agent',
-            collected_by=agent_id,
-            payment_status='success',
-            notes=f"Collected manually via Agent App"
-        )
+        # Optional key from the app: a retried request doesn't record the payment twice
+        idempotency_key = request.data.get('idempotency_key') or None
+        if idempotency_key and Payment.objects.filter(collected_by=agent, idempotency_key=idempotency_key).exists():
+            serializer = self.get_serializer(vehicle)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        # Record the payment (ledger counters are updated in the same transaction)
+        try:
+            with transaction.atomic():
+                Payment.objects.create(
+                    vehicle=vehicle,
+                    amount=amount,
+                    payment_method='agent',
+                    collected_by=agent_id,
+                    payment_status='success',
+                    idempotency_key=idempotency_key,
+                    notes=f"Collected manually via Agent App"
+                )
+        except IntegrityError:
+            # A concurrent retry with the same key committed first: answer as a duplicate
+            if not idempotency_key:
+                raise
+            get_object_or_404(Payment, collected_by=agent, idempotency_key=idempotency_key)
+            # Reloaded so the balance includes that payment
+            serializer = self.get_serializer(self.get_object())
+            return Response(serializer.data, status=status.HTTP_200_OK)
 
         # Return updated vehicle data (so the frontend updates the balance instantly)
+        # The payment signal invalidated this instance's finance snapshot.
         serializer = self.get_serializer(vehicle)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class AgentScanView(StationScopeMixin, APIView):
+    """
+    Sticker scan in the field: plate, owner, tier, balance, exempt today and last
+    payment day from the plate's cached scan card (see ScanCardService), a couple
+    of hundred bytes instead of the full vehicle. The full record stays at
+    vehicles/<plate>/.
+    """
+    permission_classes = [IsAgent]
+
+    def get(self, request, plate_number):
+        found = ScanCardService.get(plate_number, self.get_station_id())
+        if found is None:
+            return Response({"detail": "Vehicle not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        card, is_active = found
+        if not is_active:
+            return Response(
+                {
+                    "detail": "This vehicle is currently inactive.",
+                    "code": "VEHICLE_INACTIVE"
+                },
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(card)
+
+
+class AgentScanBatchView(StationScopeMixin, APIView):
+    """
+    Park sweep: Payload { "plates": ["AD-1234", "KN 55", ...] } (up to 300).
+    Returns the scan card of every known plate, in the order sent and with "active"
+    added, and lists the plates no vehicle has (or not at the agent's station)
+    under "unknown". One request and a fixed number of queries, however many plates.
+    """
+    permission_classes = [IsAgent]
+
+    def post(self, request):
+        serializer = ScanBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        plates = serializer.validated_data['plates']
+        cards = ScanCardService.get_many(plates, self.get_station_id())
+
+        results, unknown, seen = [], [], set()
+        for plate in plates:
+            key = plate_key(plate)
+            if key in seen:
+                continue
+            seen.add(key)
+            if key in cards:
+                card, is_active = cards[key]
+                results.append({**card, "active": is_active})
+            else:
+                unknown.append(plate)
+
+        return Response({"results": results, "unknown": unknown})
+
+
+class AgentPaymentSyncView(StationScopeMixin, APIView):
+    """
+    End-of-shift sync of offline collections.
+    Payload: { "collections": [{ "idempotency_key": "...", "plate_number": "AD-1234",
+               "amount": "300.00", "collected_at": "2026-10-18T07:45:00Z", "notes": "" }, ...] }
+    Returns one result per collection, in order: "created", "duplicate" (already
+    synced; same payment_id as the first time) or "rejected" with the errors; plates
+    outside the agent's station are rejected as not found. Re-sending the same batch is safe.
+    """
+    permission_classes = [IsAgent]
+
+    def post(self, request):
+        serializer = PaymentSyncSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        agent = get_object_or_404(Agent, user=request.user)
+
+        # Invalid items are reported per item; the rest of the batch still syncs
+        valid, invalid = [], {}
+        for index, item in enumerate(serializer.validated_data['collections']):
+            collection = OfflineCollectionSerializer(data=item)
+            if collection.is_valid():
+                valid.append(collection.validated_data)
+            else:
+                invalid[index] = collection.errors
+
+        try:
+            synced = iter(PaymentSyncService.sync(agent, valid, self.get_station_id())) if valid else iter(())
+        except IntegrityError:
+            # Another upload of the same keys committed first; a retry reports them as duplicates
+            return Response(
+                {"detail": "These collections are being synced by another request. Retry."},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        results = []
+        for index, item in enumerate(serializer.validated_data['collections']):
+            if index in invalid:
+                results.append({
+                    "idempotency_key": item.get("idempotency_key"),
+                    "status": PaymentSyncService.REJECTED,
+                    "error": invalid[index],
+                })
+            else:
+                results.append(next(synced))
+
+        return Response({"results": results})
+
+
+class AgentSyncFeedView(StationScopeMixin, APIView):
+    """
+    Delta feed for the app's offline copy of the agent's station (or of the fleet):
+    ?since=<cursor>&limit=200. Start with since=0, then pass back the returned
+    cursor until has_more is false; later calls return only the vehicles changed
+    since (with {"id", "deleted": true} tombstones for vehicles deleted or moved
+    away). {"reset": true} means start over from since=0.
+    """
+    permission_classes = [IsAgent]
+
+    def get(self, request):
+        since = request.query_params.get('since') or '0'
+        limit = request.query_params.get('limit') or str(VehicleChangeFeed.PAGE_SIZE)
+        if not VehicleChangeFeed.CURSOR.match(since) or not limit.isdigit():
+            return Response(
+                {"detail": "since must be a cursor from this feed and limit a non-negative integer."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(VehicleChangeFeed.page(since, int(limit), self.get_station_id()))
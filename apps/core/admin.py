@@ -1,8 +1,15 @@
 from .models import (
-Vehicle, Payment
+Vehicle, Payment, VehicleLedgerState, LedgerEntry, DailyRate, NoChargeDay, PaymentDailyRollup, VehicleChange, Station
 )
 
 from django.contrib import admin
 
 admin.site.register(Vehicle)
 admin.site.register(Payment)
+admin.site.register(VehicleLedgerState)
+admin.site.register(LedgerEntry)
+admin.site.register(DailyRate)
+admin.site.register(NoChargeDay)
+admin.site.register(PaymentDailyRollup)
+admin.site.register(VehicleChange)
+admin.site.register(Station)
@@ -3,9 +3,11 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
+from django.db import transaction
 from apps.core.models import Vehicle, VehicleExemption
 from ..serializers import VehicleExemptionSerializer
 
+from utils.pagination import KeysetPagination
 from utils.permissions import (
     IsAgent,
     IsAdmin,
@@ -57,6 +59,7 @@ class ExemptionCreateView(generics.CreateAPIView):
 class PendingExemptionListView(generics.ListAPIView):
     serializer_class = VehicleExemptionSerializer
     permission_classes = [IsAdmin]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         # Show only unapproved requests, newest first
@@ -72,15 +75,17 @@ class ExemptionActionView(APIView):
         action = request.data.get('action') # "approve" or "reject"
         
         if action == 'approve':
-            exemption.is_approved = True
-            exemption.approved_by = request.user
-            exemption.save()
+            with transaction.atomic():
+                exemption.is_approved = True
+                exemption.approved_by = request.user
+                exemption.save()
             return Response({"message": "Exemption approved. Tax has been recalculated."}, status=status.HTTP_200_OK)
             
         elif action == 'reject':
             # If rejected, we usually just delete the request or mark it as rejected (if you add a status field).
             # For now, let's delete it so the user knows it didn't count.
-            exemption.delete() 
+            with transaction.atomic():
+                exemption.delete()
             return Response({"message": "Exemption request rejected and removed."}, status=status.HTTP_200_OK)
         
         return Response({"error": "Invalid action. Use 'approve' or 'reject'."}, status=status.HTTP_400_BAD_REQUEST)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from apps.core.models import Payment, Vehicle, VehicleExemption
+from utils.plates import validate_plate_available
 
 class VehicleExemptionSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -23,6 +24,7 @@ class PaymentSerializer(serializers.ModelSerializer):
 
 class PublicVehicleSerializer(serializers.ModelSerializer):
     compliance_status = serializers.ReadOnlyField()
+    daily_rate = serializers.DecimalField(max_digits=6, decimal_places=2, source='current_daily_rate', read_only=True)
 
     class Meta:
         model = Vehicle
@@ -32,4 +34,7 @@ class PublicVehicleSerializer(serializers.ModelSerializer):
             'daily_rate', 'compliance_status'
         ]
 
+    def validate_plate_number(self, value):
+        return validate_plate_available(value, self.instance)
+
     
\ No newline at end of file
@@ -1,5 +1,5 @@
-import tempfile
 import random
+from io import BytesIO
 from rest_framework import (
     viewsets, 
     status, 
@@ -19,8 +19,12 @@ from django.shortcuts import get_object_or_404, render
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
-import qrcode
+from reportlab.lib.utils import ImageReader
 
+from utils.pagination import KeysetPagination
+from utils.plates import PlateLookupMixin, plate_key
+from utils.qr_assets import qr_assets
+from utils.search import VehicleSearchFilter
 from utils.permissions import (
     IsAgent, 
     IsTaxPayer
@@ -29,25 +33,24 @@ from apps.core.models import(
     Vehicle, 
     Payment
 )
+from apps.core.services.vehicle_finance import VehicleFinanceService
 from .serializers import (
     PaymentSerializer, 
     PublicVehicleSerializer
 )
 
-class PublicVehicleViews(viewsets.ModelViewSet):
-    queryset = Vehicle.objects.all().order_by('-created_at')
+class PublicVehicleViews(PlateLookupMixin, viewsets.ModelViewSet):
+    queryset = VehicleFinanceService.with_finance(Vehicle.objects.all()).order_by('-created_at')
     serializer_class = PublicVehicleSerializer
     permission_classes = [permissions.AllowAny]
-    
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['plate_number', 'phone_number']
-    lookup_field = 'plate_number' 
+    pagination_class = KeysetPagination
+
+    filter_backends = [VehicleSearchFilter]
+    # Public: no owner names
+    search_scopes = ("plate", "phone")
 
     def retrieve(self, request, *args, **kwargs):
-        vehicle = get_object_or_404(
-            Vehicle,
-            plate_number__iexact=kwargs[self.lookup_field]
-        )
+        vehicle = self.get_object()
 
         if not vehicle.is_active:
             return Response(
@@ -61,11 +64,33 @@ class PublicVehicleViews(viewsets.ModelViewSet):
         serializer = self.get_serializer(vehicle)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def qr(self, request, plate_number=None):
+        """
+        The vehicle's sticker QR from the shared asset cache: SVG by default,
+        ?type=png for the bitmap. The ETag is the content hash and format.
+        """
+        # Only the plate is needed, not the finance annotations of the queryset
+        vehicle = get_object_or_404(Vehicle.objects.only('plate_number'), plate_key=plate_key(plate_number))
+        fmt = request.query_params.get('type', 'svg')
+        if fmt not in qr_assets.FORMATS:
+            return Response({"detail": "type must be svg or png."}, status=status.HTTP_400_BAD_REQUEST)
+
+        asset = qr_assets.get(vehicle.plate_number, fmt)
+        etag = f'"{asset.digest}.{fmt}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(asset.content, content_type=asset.content_type)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=86400'
+        return response
 
 
 class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Payment.objects.all().order_by('-timestamp')
     serializer_class = PaymentSerializer
+    pagination_class = KeysetPagination
 
 
 # Mock function for sending SMS (Replace with Twilio/Termii/KudiSMS later)
@@ -138,14 +163,12 @@ def generate_pdf_receipt(request, reference):
     # Change 'localhost:8000' to your real domain in production
     verify_url = request.build_absolute_uri(f'/api/public/verify/{reference}/')
     
-    qr = qrcode.make(verify_url)
-    
-    # Save QR to a temporary file to draw it on PDF
-    with tempfile.NamedTemporaryFile(delete=True) as tmp:
-        qr.save(tmp.name)
-        # Draw the image (x, y, width, height)
-        p.drawImage(tmp.name, 400, height - 250, 150, 150)
-        p.drawString(420, height - 265, "Scan to Verify")
+    # Rendered once per receipt URL; later downloads reuse the cached PNG
+    qr = qr_assets.png(verify_url)
+
+    # Draw the image (x, y, width, height)
+    p.drawImage(ImageReader(BytesIO(qr.content)), 400, height - 250, 150, 150)
+    p.drawString(420, height - 265, "Scan to Verify")
 
     # Footer
     p.setFont("Helvetica-Oblique", 10)
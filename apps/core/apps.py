@@ -3,4 +3,10 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.core'
\ No newline at end of file
+    name = 'apps.core'
+
+    def ready(self):
+        import apps.core.signals
+        # The project's celery app, so tasks queued from any process (web, commands,
+        # crons) use the configured broker
+        import src.celery
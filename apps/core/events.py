@@ -0,0 +1,7 @@
+# core/events.py
+from django.dispatch import Signal
+
+# Sent whenever a vehicle's stored 7-day rule tier changes, whether because of a
+# payment / exemption write or because the debt crossed a threshold overnight.
+# Keyword arguments: vehicle_id, previous, current, changed_at.
+compliance_status_changed = Signal()
@@ -0,0 +1,32 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.core.services.tax_ledger import TaxLedgerService
+
+
+class Command(BaseCommand):
+    help = (
+        "Posts the daily tax charges to the ledger of every billed vehicle, catching up any "
+        "days a missed run left out. Meant to run once a day, shortly after midnight; "
+        "re-running for the same day is a no-op."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", default=None, help="Charge up to this day (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        day = None
+        if options["date"]:
+            try:
+                day = date.fromisoformat(options["date"])
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD")
+            # The ledger is append-only: a charge posted ahead would block every earlier day
+            if day > timezone.now().date():
+                raise CommandError("--date can't be in the future")
+
+        posted = TaxLedgerService.accrue_charges(day, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Posted {posted} daily charges."))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.models import Vehicle
+from utils.plates import plate_key
+from apps.core.services.tax_ledger import TaxLedgerService
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the append-only tax ledger (daily charges and payments) for vehicles that predate it. "
+        "Vehicles whose ledger is already open are skipped, so the command can be re-run safely."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--plate", action="append", dest="plates",
+            help="Only backfill these plate numbers (repeatable). Defaults to the whole fleet.",
+        )
+
+    def handle(self, *args, **options):
+        vehicles = Vehicle.objects.filter(ledger_state__ledger_opened_on__isnull=True)
+        if options["plates"]:
+            plates = [plate_key(plate) for plate in options["plates"]]
+            vehicles = Vehicle.objects.filter(plate_key__in=plates)
+
+        backfilled = 0
+        entries = 0
+        for vehicle in vehicles.order_by("pk").iterator():
+            written = TaxLedgerService.backfill(vehicle)
+            entries += written
+            backfilled += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Ledger backfilled: {backfilled} vehicles, {entries} entries."))
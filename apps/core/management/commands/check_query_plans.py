@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.services.query_plans import QueryPlanService
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAINs the payment / dashboard / ledger hot queries and fails if any of them "
+        "reads its table with a sequential scan. Run after migrations (e.g. in CI)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verbose-plans", action="store_true", help="Print every plan, not only failing ones.")
+
+    def handle(self, *args, **options):
+        failures = 0
+        for name, plan, ok in QueryPlanService.check():
+            if ok:
+                self.stdout.write(self.style.SUCCESS(f"ok    {name}"))
+            else:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"SCAN  {name}"))
+            if not ok or options["verbose_plans"]:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f"{failures} hot queries fall back to a sequential scan.")
+        self.stdout.write(self.style.SUCCESS("All hot queries use an index."))
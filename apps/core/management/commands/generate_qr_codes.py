@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.services.qr_codes import QRCodeService
+
+
+class Command(BaseCommand):
+    help = (
+        "Makes the sticker QR of every vehicle the workers left pending (jobs lost while the broker "
+        "was down, vehicles imported without signals); vehicles queued less than "
+        "QRCodeService.STUCK_AFTER ago are left to the workers. Renders here by default; --enqueue "
+        "hands them to the celery workers instead. Prints the queue stats at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retry-failed", action="store_true", help="Also retry vehicles marked failed.")
+        parser.add_argument("--enqueue", action="store_true", help="Queue jobs for the workers instead of rendering here.")
+        parser.add_argument("--limit", type=int, default=None)
+
+    def handle(self, *args, **options):
+        vehicle_ids = QRCodeService.leftover_ids(include_failed=options["retry_failed"])
+        if options["limit"]:
+            vehicle_ids = vehicle_ids[:options["limit"]]
+        vehicle_ids = list(vehicle_ids)
+
+        if options["enqueue"] and not settings.CELERY_BROKER_URL:
+            raise CommandError("--enqueue needs CELERY_BROKER_URL; run without it to render here.")
+        if options["enqueue"]:
+            QRCodeService.enqueue(vehicle_ids)
+            self.stdout.write(self.style.SUCCESS(f"Queued {len(vehicle_ids)} QR jobs."))
+        else:
+            started = time.monotonic()
+            made, failed = 0, 0
+            for vehicle_id in vehicle_ids:
+                try:
+                    if QRCodeService.generate(vehicle_id) is not None:
+                        made += 1
+                except Exception as exc:
+                    failed += 1
+                    QRCodeService.mark_failed(vehicle_id)
+                    self.stderr.write(f"{vehicle_id}: {exc}")
+
+            elapsed = time.monotonic() - started
+            rate = made / elapsed if elapsed else 0
+            self.stdout.write(self.style.SUCCESS(
+                f"QR codes done: {made} made, {failed} failed in {elapsed:.1f}s ({rate:.1f}/s)."
+            ))
+
+        self.stdout.write(", ".join(f"{key}={value}" for key, value in QRCodeService.stats().items()))
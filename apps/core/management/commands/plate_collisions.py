@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.models import Vehicle
+
+
+class Command(BaseCommand):
+    help = (
+        "Lists vehicles whose plates normalize to the same key (migration 0014 gave the "
+        "later ones a KEY~n plate_key). Correct or delete the duplicates through the admin "
+        "vehicle API using their exact plate number."
+    )
+
+    def handle(self, *args, **options):
+        suffixed = Vehicle.objects.filter(plate_key__contains="~").values_list("plate_key", flat=True)
+        keys = sorted({key.split("~")[0] for key in suffixed})
+        if not keys:
+            self.stdout.write(self.style.SUCCESS("No plate collisions."))
+            return
+
+        vehicles = Vehicle.objects.filter(plate_key__regex=rf"^({'|'.join(keys)})(~[0-9]+)?$").order_by(
+            "plate_key"
+        ).values_list("plate_key", "plate_number", "owner_name", "created_at")
+        for key, plate_number, owner_name, created_at in vehicles:
+            self.stdout.write(f"{key:<24} {plate_number:<20} {owner_name:<30} {created_at:%Y-%m-%d}")
+        self.stdout.write(self.style.WARNING(f"{len(keys)} plate key(s) shared by more than one vehicle."))
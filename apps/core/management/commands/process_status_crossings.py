@@ -0,0 +1,38 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.core.services.compliance_scheduler import ComplianceScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-evaluates the 7-day rule only for vehicles whose scheduled crossing date has come "
+        "(VehicleLedgerState.next_status_check) and schedules their next check. Meant to run daily; "
+        "use sweep_compliance for a full recompute."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", default=None, help="Process checks due up to this day (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        if options["date"]:
+            try:
+                today = date.fromisoformat(options["date"])
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD")
+
+        started = time.monotonic()
+        scheduler = ComplianceScheduler.load(until=today)
+        self.stdout.write(f"due={len(scheduler)}")
+
+        processed, changed = scheduler.run(today, batch_size=options["batch_size"])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Status crossings done: {processed} vehicles checked, {changed} status changes in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.models import Vehicle
+from utils.plates import plate_key
+from apps.core.services.vehicle_ledger import VehicleLedgerService
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized per-vehicle finance counters from payments and exemptions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--plate", action="append", dest="plates",
+            help="Only rebuild these plate numbers (repeatable). Defaults to the whole fleet.",
+        )
+
+    def handle(self, *args, **options):
+        vehicle_ids = None
+        if options["plates"]:
+            plates = [plate_key(plate) for plate in options["plates"]]
+            vehicle_ids = list(Vehicle.objects.filter(plate_key__in=plates).values_list("pk", flat=True))
+
+        VehicleLedgerService.rebuild(vehicle_ids)
+        self.stdout.write(self.style.SUCCESS("Ledger state rebuilt."))
@@ -0,0 +1,28 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.services.payment_rollup import PaymentRollupService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the daily payment rollups from the payments table. "
+        "Without --start/--end every day is rebuilt."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", default=None, help="First day to rebuild (YYYY-MM-DD).")
+        parser.add_argument("--end", default=None, help="Last day to rebuild (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options["start"]) if options["start"] else None
+            end = date.fromisoformat(options["end"]) if options["end"] else None
+        except ValueError:
+            raise CommandError("--start and --end must be YYYY-MM-DD")
+        if start and end and end < start:
+            raise CommandError("--end must not be before --start")
+
+        written = PaymentRollupService.rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt payment rollups: {written} rows."))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core.services.compliance import ComplianceService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the 7-day rule tier for every vehicle in batches and stores it on the ledger state. "
+        "Meant to run daily; pass --after with the last printed cursor to resume an interrupted run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--after", default=None, help="Resume after this vehicle id (cursor from a previous run).")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        processed = 0
+        changed = 0
+
+        for batch in ComplianceService.iter_batches(options["batch_size"], options["after"]):
+            changed += ComplianceService.recompute(batch)
+            processed += len(batch)
+
+            elapsed = time.monotonic() - started
+            rate = processed / elapsed if elapsed else 0
+            self.stdout.write(
+                f"processed={processed} changed={changed} rate={rate:.0f}/s cursor={batch[-1].pk}"
+            )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Compliance sweep done: {processed} vehicles, {changed} status changes in {elapsed:.1f}s."
+        ))
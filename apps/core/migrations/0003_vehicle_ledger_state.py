@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from datetime import timedelta
+from decimal import Decimal, ROUND_FLOOR
+from django.db import migrations, models
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+
+def backfill_ledger_state(apps, schema_editor):
+    Vehicle = apps.get_model('core', 'Vehicle')
+    Payment = apps.get_model('core', 'Payment')
+    VehicleExemption = apps.get_model('core', 'VehicleExemption')
+    VehicleLedgerState = apps.get_model('core', 'VehicleLedgerState')
+
+    paid = {
+        row['vehicle_id']: row
+        for row in Payment.objects.filter(payment_status='success')
+        .values('vehicle_id').annotate(total=Sum('amount'), last=Max('timestamp'))
+    }
+    exempt = {}
+    for vehicle_id, start_date, end_date in VehicleExemption.objects.filter(
+        is_approved=True
+    ).values_list('vehicle_id', 'start_date', 'end_date'):
+        days, until = exempt.get(vehicle_id, (0, None))
+        days += max((end_date - start_date).days + 1, 0)
+        until = max(until, end_date) if until else end_date
+        exempt[vehicle_id] = (days, until)
+
+    states = []
+    for vehicle in Vehicle.objects.all().iterator():
+        total_paid = paid.get(vehicle.pk, {}).get('total') or Decimal('0.00')
+        exempt_days, exempt_until = exempt.get(vehicle.pk, (0, None))
+
+        paid_through = None
+        if vehicle.activated_at and vehicle.is_active and vehicle.daily_rate > 0:
+            start = vehicle.activated_at.date()
+            if timezone.localtime(vehicle.activated_at).hour >= 16:
+                start += timedelta(days=1)
+            paid_days = (total_paid / vehicle.daily_rate).to_integral_value(rounding=ROUND_FLOOR)
+            paid_through = start + timedelta(days=exempt_days + int(paid_days) - 1)
+
+        states.append(VehicleLedgerState(
+            vehicle_id=vehicle.pk,
+            total_paid=total_paid,
+            last_payment_at=paid.get(vehicle.pk, {}).get('last'),
+            approved_exempt_days=exempt_days,
+            exempt_until=exempt_until,
+            paid_through=paid_through,
+        ))
+    VehicleLedgerState.objects.bulk_create(states, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleLedgerState',
+            fields=[
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger_state', serialize=False, to='core.vehicle')),
+                ('total_paid', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('last_payment_at', models.DateTimeField(blank=True, null=True)),
+                ('approved_exempt_days', models.PositiveIntegerField(default=0)),
+                ('exempt_until', models.DateField(blank=True, null=True)),
+                ('paid_through', models.DateField(blank=True, db_index=True, null=True)),
+                ('balance_as_of', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(backfill_ledger_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_vehicle_ledger_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicleledgerstate',
+            name='compliance_status',
+            field=models.CharField(choices=[('ACTIVE', 'Active'), ('OWING', 'Owing'), ('INACTIVE_DUE_TO_DEBT', 'Inactive due to debt')], db_index=True, default='ACTIVE', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='vehicleledgerstate',
+            name='status_computed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
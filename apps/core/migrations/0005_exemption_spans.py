@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:06
+
+import django.db.models.deletion
+from datetime import timedelta
+from decimal import ROUND_FLOOR
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def build_exemption_spans(apps, schema_editor):
+    """
+    Merges the approved exemptions of every vehicle into spans, and resets the
+    ledger counters that used to double-count overlapping exemptions.
+    """
+    VehicleExemption = apps.get_model('core', 'VehicleExemption')
+    VehicleExemptionSpan = apps.get_model('core', 'VehicleExemptionSpan')
+    VehicleLedgerState = apps.get_model('core', 'VehicleLedgerState')
+
+    ranges = {}
+    for vehicle_id, start_date, end_date in VehicleExemption.objects.filter(
+        is_approved=True
+    ).values_list('vehicle_id', 'start_date', 'end_date'):
+        if end_date >= start_date:
+            ranges.setdefault(vehicle_id, []).append((start_date, end_date))
+
+    spans = []
+    totals = {}
+    for vehicle_id, vehicle_ranges in ranges.items():
+        merged = []
+        for start, end in sorted(vehicle_ranges):
+            if merged and start <= merged[-1][1] + timedelta(days=1):
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        total = 0
+        for start, end in merged:
+            total += (end - start).days + 1
+            spans.append(VehicleExemptionSpan(
+                vehicle_id=vehicle_id, start_date=start, end_date=end, cumulative_days=total
+            ))
+        totals[vehicle_id] = (total, merged[-1][1])
+    VehicleExemptionSpan.objects.bulk_create(spans, batch_size=1000)
+
+    for state in VehicleLedgerState.objects.select_related('vehicle').iterator():
+        exempt_days, exempt_until = totals.get(state.vehicle_id, (0, None))
+        if exempt_days == state.approved_exempt_days and exempt_until == state.exempt_until:
+            continue
+        state.approved_exempt_days = exempt_days
+        state.exempt_until = exempt_until
+
+        vehicle = state.vehicle
+        if vehicle.activated_at and vehicle.is_active and vehicle.daily_rate > 0:
+            start = vehicle.activated_at.date()
+            if timezone.localtime(vehicle.activated_at).hour >= 16:
+                start += timedelta(days=1)
+            paid_days = (state.total_paid / vehicle.daily_rate).to_integral_value(rounding=ROUND_FLOOR)
+            state.paid_through = start + timedelta(days=exempt_days + int(paid_days) - 1)
+        state.save(update_fields=['approved_exempt_days', 'exempt_until', 'paid_through'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_ledger_state_compliance_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleExemptionSpan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('cumulative_days', models.PositiveIntegerField()),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exemption_spans', to='core.vehicle')),
+            ],
+            options={
+                'ordering': ['vehicle', 'start_date'],
+                'constraints': [models.UniqueConstraint(fields=('vehicle', 'start_date'), name='unique_exemption_span_start')],
+            },
+        ),
+        migrations.RunPython(build_exemption_spans, migrations.RunPython.noop),
+    ]
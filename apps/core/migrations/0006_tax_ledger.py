@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:09
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_exemption_spans'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicleledgerstate',
+            name='ledger_balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='vehicleledgerstate',
+            name='ledger_opened_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posted_date', models.DateField()),
+                ('entry_type', models.CharField(choices=[('charge', 'Daily Charge'), ('payment', 'Payment'), ('exemption', 'Exemption Credit'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('debit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('credit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('running_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('memo', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='core.payment')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='core.vehicle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vehicle', 'posted_date', 'id'], name='ledger_vehicle_posted_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('entry_type', 'charge')), fields=('vehicle', 'posted_date'), name='one_charge_per_vehicle_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tax_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rate', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('effective_from', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('vehicle', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rates', to='core.vehicle')),
+            ],
+            options={
+                'ordering': ['effective_from'],
+                'constraints': [models.UniqueConstraint(fields=('vehicle', 'effective_from'), name='unique_vehicle_rate_date'), models.UniqueConstraint(condition=models.Q(('vehicle__isnull', True)), fields=('effective_from',), name='unique_global_rate_date')],
+            },
+        ),
+    ]
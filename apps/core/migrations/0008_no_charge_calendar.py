@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_daily_rate_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoChargeDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('reason', models.CharField(choices=[('holiday', 'Public Holiday'), ('strike', 'Strike'), ('lockdown', 'Government Lockdown'), ('other', 'Other')], max_length=20)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:17
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def schedule_everyone(apps, schema_editor):
+    # First process_status_crossings run checks the whole fleet and schedules each vehicle
+    VehicleLedgerState = apps.get_model('core', 'VehicleLedgerState')
+    VehicleLedgerState.objects.update(next_status_check=timezone.now().date())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_no_charge_calendar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicleledgerstate',
+            name='next_status_check',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(schedule_everyone, migrations.RunPython.noop),
+    ]
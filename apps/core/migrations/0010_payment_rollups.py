@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:20
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def fill_rollups(apps, schema_editor):
+    Payment = apps.get_model('core', 'Payment')
+    PaymentDailyRollup = apps.get_model('core', 'PaymentDailyRollup')
+    rows = (
+        Payment.objects.filter(payment_status='success')
+        .annotate(day=TruncDate('timestamp'))
+        .values('day', 'payment_method', 'collected_by_id', 'vehicle_id')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    PaymentDailyRollup.objects.bulk_create(
+        [
+            PaymentDailyRollup(
+                day=row['day'],
+                payment_method=row['payment_method'],
+                collected_by_id=row['collected_by_id'],
+                vehicle_id=row['vehicle_id'],
+                total_amount=row['total'],
+                payment_count=row['count'],
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_next_status_check'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('payment_method', models.CharField(choices=[('agent', 'Agent Cash'), ('online', 'Online Payment'), ('bank', 'Bank Transfer'), ('ussd', 'USSD Payment')], max_length=100)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('collected_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_rollups', to='users.agent')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_rollups', to='core.vehicle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'payment_method'], name='rollup_day_method_idx'), models.Index(fields=['vehicle', 'day'], name='rollup_vehicle_day_idx'), models.Index(fields=['collected_by', 'day'], name='rollup_agent_day_idx')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
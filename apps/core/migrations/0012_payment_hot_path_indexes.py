@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:27
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def deduplicate_references(apps, schema_editor):
+    # Blank references become NULL; repeated ones keep the oldest payment's and the
+    # later payments get a numbered suffix, so the unique constraint can be added
+    Payment = apps.get_model('core', 'Payment')
+    Payment.objects.filter(refrence='').update(refrence=None)
+
+    duplicated = (
+        Payment.objects.exclude(refrence__isnull=True)
+        .values('refrence')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .values_list('refrence', flat=True)
+    )
+    for reference in list(duplicated):
+        later = Payment.objects.filter(refrence=reference).order_by('timestamp', 'id')[1:]
+        for i, pk in enumerate(later.values_list('id', flat=True), start=2):
+            Payment.objects.filter(pk=pk).update(refrence=f"{reference}-{i}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_payment_time_index'),
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_references, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['collected_by', 'timestamp'], name='payment_agent_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['vehicle', '-timestamp'], name='payment_vehicle_time_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(fields=('refrence',), name='unique_payment_reference'),
+        ),
+    ]
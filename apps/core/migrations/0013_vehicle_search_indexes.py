@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# Trigram GIN indexes on the normalized expressions VehicleSearchService queries.
+# PostgreSQL only: other databases search with the in-process n-gram index.
+INDEXES = {
+    'vehicle_plate_trgm_idx': "regexp_replace(upper(plate_number), '[^A-Z0-9]', '', 'g')",
+    'vehicle_phone_trgm_idx': "regexp_replace(phone_number, '[^0-9]', '', 'g')",
+    'vehicle_owner_trgm_idx': "upper(owner_name)",
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, expression in INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON core_vehicle USING gin (({expression}) gin_trgm_ops)"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_payment_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,72 @@
+import logging
+from collections import defaultdict
+
+from django.db import migrations, models
+
+from utils.plates import plate_key
+
+logger = logging.getLogger(__name__)
+
+
+def fill_plate_keys(apps, schema_editor):
+    """
+    Oldest vehicle keeps the plain key; later ones that normalize to the same plate
+    ("AD 1234" / "AD-1234") get "KEY~2", "KEY~3" and are logged; `manage.py
+    plate_collisions` lists them again later. They stay reachable by their exact
+    plate_number, and saving a corrected one replaces the suffixed key.
+    """
+    Vehicle = apps.get_model('core', 'Vehicle')
+
+    seen = defaultdict(list)
+    for vehicle in Vehicle.objects.order_by('created_at', 'pk').iterator():
+        key = plate_key(vehicle.plate_number)
+        seen[key].append(vehicle.plate_number)
+        if len(seen[key]) > 1:
+            key = f"{key}~{len(seen[key])}"
+        Vehicle.objects.filter(pk=vehicle.pk).update(plate_key=key)
+
+    collisions = {key: plates for key, plates in seen.items() if len(plates) > 1}
+    for key, plates in sorted(collisions.items()):
+        logger.warning("Plate collision on %s (oldest keeps the key): %s", key, ", ".join(plates))
+
+
+def swap_plate_search_index(apps, schema_editor):
+    # The trigram index of migration 0013 now lives on the stored key
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS vehicle_plate_trgm_idx")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS vehicle_plate_key_trgm_idx ON core_vehicle USING gin (plate_key gin_trgm_ops)"
+    )
+
+
+def restore_plate_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS vehicle_plate_key_trgm_idx")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS vehicle_plate_trgm_idx ON core_vehicle "
+        "USING gin ((regexp_replace(upper(plate_number), '[^A-Z0-9]', '', 'g')) gin_trgm_ops)"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_vehicle_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='plate_key',
+            field=models.CharField(editable=False, max_length=32, null=True),
+        ),
+        migrations.RunPython(fill_plate_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='vehicle',
+            name='plate_key',
+            field=models.CharField(editable=False, max_length=32, unique=True),
+        ),
+        migrations.RunPython(swap_plate_search_index, restore_plate_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:39
+
+from django.db import migrations, models
+
+
+def seed_feed(apps, schema_editor):
+    # One row per existing vehicle, so a copy started from the beginning gets the whole fleet
+    Vehicle = apps.get_model('core', 'Vehicle')
+    VehicleChange = apps.get_model('core', 'VehicleChange')
+    vehicle_ids = Vehicle.objects.order_by('created_at', 'pk').values_list('pk', flat=True)
+    VehicleChange.objects.bulk_create(
+        [VehicleChange(vehicle_id=vehicle_id) for vehicle_id in vehicle_ids.iterator()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_payment_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vehicle_id', models.UUIDField(blank=True, db_index=True, null=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(seed_feed, migrations.RunPython.noop),
+    ]
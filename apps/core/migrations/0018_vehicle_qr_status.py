@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:45
+
+from django.db import migrations, models
+
+
+def mark_existing_qr_codes(apps, schema_editor):
+    # Vehicles saved before this rendered their QR inline; the rest stay pending for the job
+    Vehicle = apps.get_model('core', 'Vehicle')
+    Vehicle.objects.exclude(qr_code__isnull=True).exclude(qr_code='').update(qr_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_stations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='qr_generated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='qr_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10),
+        ),
+        migrations.RunPython(mark_existing_qr_codes, migrations.RunPython.noop),
+    ]
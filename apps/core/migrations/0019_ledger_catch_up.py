@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:12
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_charged_through(apps, schema_editor):
+    # Accrual resumes after each vehicle's latest charge; ledgers without one start
+    # from ledger_opened_on
+    VehicleLedgerState = apps.get_model('core', 'VehicleLedgerState')
+    LedgerEntry = apps.get_model('core', 'LedgerEntry')
+    latest_charge = (
+        LedgerEntry.objects
+        .filter(vehicle_id=OuterRef('vehicle_id'), entry_type='charge')
+        .order_by('-posted_date')
+        .values('posted_date')[:1]
+    )
+    VehicleLedgerState.objects.filter(ledger_opened_on__isnull=False).update(charged_through=Subquery(latest_charge))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_vehicle_qr_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicleledgerstate',
+            name='charged_through',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='ledgerentry',
+            name='entry_type',
+            field=models.CharField(choices=[('charge', 'Daily Charge'), ('payment', 'Payment'), ('exemption', 'Exemption Credit'), ('no_charge', 'No-Charge Day Credit'), ('adjustment', 'Adjustment')], max_length=20),
+        ),
+        migrations.RunPython(fill_charged_through, migrations.RunPython.noop),
+    ]
@@ -4,10 +4,8 @@ from datetime import timedelta
 from django.db.models import Sum
 from decimal import Decimal
 import uuid
-import qrcode
-from io import BytesIO
-from django.core.files import File
-from PIL import Image, ImageDraw
+
+from utils.plates import plate_key
 
 from django.db import models
 from django.db.models import Sum, Q
@@ -16,16 +14,46 @@ from decimal import Decimal
 import uuid
 import datetime
 
+class Station(models.Model):
+    """
+    A collection point (motor park / market). Agents work one station and see only
+    the vehicles based there; vehicles without a station are only visible fleet-wide.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
 class Vehicle(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
     # user logic ...
     owner = models.ForeignKey("users.TaxPayer", on_delete=models.CASCADE, related_name="vehicles", null=True, blank=True)
     plate_number = models.CharField(max_length=20, unique=True, db_index=True)
+    # plate_number without separators or case (utils.plates.plate_key); all lookups go through it
+    plate_key = models.CharField(max_length=32, unique=True, editable=False)
     owner_name = models.CharField(max_length=100)
     phone_number = models.CharField(max_length=15)
+    # Home station; agents of a station are scoped to its vehicles
+    station = models.ForeignKey(Station, on_delete=models.SET_NULL, null=True, blank=True, related_name="vehicles")
     
     daily_rate = models.DecimalField(max_digits=6, decimal_places=2, default=150.00)
     qr_code = models.ImageField(upload_to='qr_codes/', blank=True, null=True)
+    # The sticker QR is rendered and uploaded by a background job (see QRCodeService)
+    QR_PENDING = "pending"
+    QR_READY = "ready"
+    QR_FAILED = "failed"
+    QR_STATUS_CHOICES = [
+        (QR_PENDING, "Pending"),
+        (QR_READY, "Ready"),
+        (QR_FAILED, "Failed"),
+    ]
+    qr_status = models.CharField(max_length=10, choices=QR_STATUS_CHOICES, default=QR_PENDING, db_index=True)
+    qr_generated_at = models.DateTimeField(null=True, blank=True)
     # This field handles the "Soft" delete or permanent ban
     # If they are just owing money, this stays True, but we flag them visually
     is_active = models.BooleanField(default=True)
@@ -34,6 +62,12 @@ class Vehicle(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     activated_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # A station's vehicle list, newest first (the agent list view)
+            models.Index(fields=["station", "-created_at"], name="vehicle_station_created_idx"),
+        ]
+
 
     def __str__(self):
         return f"{self.plate_number} - {self.owner_name}"
@@ -41,34 +75,25 @@ class Vehicle(models.Model):
     def save(self, *args, **kwargs):
         self.plate_number = self.plate_number.upper().strip()
 
+        # A key suffixed by migration 0014 (a collision) is kept until the plate is corrected
+        key = plate_key(self.plate_number)
+        if (self.plate_key or "").split("~")[0] != key:
+            self.plate_key = key
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "plate_number" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "plate_key"}
+
         # Detect activation moment
         if self.is_active and self.is_approved_by_admin and self.activated_at is None:
             self.activated_at = timezone.now()
 
-        if not self.qr_code:
-            qr_image = qrcode.make(self.plate_number).convert("RGB")
-
-            canvas_size = 290
-            canvas = Image.new("RGB", (canvas_size, canvas_size), "white")
-
-            qr_width, qr_height = qr_image.size
-            pos = (
-                (canvas_size - qr_width) // 2,
-                (canvas_size - qr_height) // 2,
-            )
-
-            canvas.paste(qr_image, pos)
-
-            buffer = BytesIO()
-            canvas.save(buffer, format="PNG")
-            buffer.seek(0)
-
-            file_name = f"qr_{self.plate_number}.png"
-            self.qr_code.save(file_name, File(buffer), save=False)
-
         super().save(*args, **kwargs)
 
 
+    # --- Finance ---
+    # All of these read one VehicleFinanceSnapshot per instance, so serializing
+    # a vehicle computes paid / exempt / expected / balance only once.
+
     @property
     def days_since_activation(self):
         """
@@ -76,7 +101,7 @@ class Vehicle(models.Model):
         Delegated to VehicleFinanceService.
         """
         from apps.core.services.vehicle_finance import VehicleFinanceService
-        return VehicleFinanceService.calculate_days_since_activation(self)
+        return VehicleFinanceService.snapshot(self).days_active
 
     @property
     def exempted_days_count(self):
@@ -85,7 +110,7 @@ class Vehicle(models.Model):
         Delegated to VehicleFinanceService.
         """
         from apps.core.services.vehicle_finance import VehicleFinanceService
-        return VehicleFinanceService.calculate_exemptions(self)
+        return VehicleFinanceService.snapshot(self).exempted_days
 
     @property
     def total_expected_revenue(self):
@@ -94,18 +119,27 @@ class Vehicle(models.Model):
         Delegated to VehicleFinanceService.
         """
         from apps.core.services.vehicle_finance import VehicleFinanceService
-        return VehicleFinanceService.calculate_expected_revenue(self)
+        return VehicleFinanceService.snapshot(self).expected_revenue
 
     @property
     def total_paid(self):
         """Sum of all verified payments."""
         from apps.core.services.vehicle_finance import VehicleFinanceService
-        return VehicleFinanceService.calculate_total_paid(self)
+        return VehicleFinanceService.snapshot(self).total_paid
 
     @property
     def current_balance(self):
         from apps.core.services.vehicle_finance import VehicleFinanceService
-        return VehicleFinanceService.calculate_current_balance(self)
+        return VehicleFinanceService.snapshot(self).balance
+
+    @property
+    def current_daily_rate(self):
+        """
+        The rate charged today according to the rate schedule (see DailyRate).
+        daily_rate itself is only the base rate for days no schedule entry covers.
+        """
+        from apps.core.services.vehicle_finance import VehicleFinanceService
+        return VehicleFinanceService.snapshot(self).daily_rate
 
     @property
     def compliance_status(self):
@@ -114,7 +148,7 @@ class Vehicle(models.Model):
         Delegated to VehicleFinanceService.
         """
         from apps.core.services.vehicle_finance import VehicleFinanceService
-        return VehicleFinanceService.get_compliance_status(self)
+        return VehicleFinanceService.snapshot(self).compliance_status
     
     
 # New Model for Sickness/Theft
@@ -140,7 +174,86 @@ class VehicleExemption(models.Model):
 
     def __str__(self):
         return f"{self.vehicle.plate_number} - {self.reason} ({self.start_date} to {self.end_date})"
-    
+
+
+class VehicleExemptionSpan(models.Model):
+    """
+    Approved exemptions for a vehicle merged into non-overlapping date ranges.
+    Rebuilt by ExemptionIndex whenever an exemption is approved, edited or rejected.
+
+    cumulative_days is the number of exempt days in this span and every earlier one,
+    so "exempt days up to D" is one index probe on (vehicle, start_date).
+    """
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name="exemption_spans")
+    start_date = models.DateField()
+    end_date = models.DateField()
+    cumulative_days = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["vehicle", "start_date"]
+        constraints = [
+            models.UniqueConstraint(fields=["vehicle", "start_date"], name="unique_exemption_span_start"),
+        ]
+
+    def __str__(self):
+        return f"{self.vehicle_id}: {self.start_date} to {self.end_date}"
+
+
+class NoChargeDay(models.Model):
+    """
+    A day nobody is charged for (public holiday, strike, lockdown), fleet-wide.
+    Replaces creating one VehicleExemption per vehicle; read through NoChargeCalendar.
+    """
+    REASON_CHOICES = [
+        ('holiday', 'Public Holiday'),
+        ('strike', 'Strike'),
+        ('lockdown', 'Government Lockdown'),
+        ('other', 'Other'),
+    ]
+
+    date = models.DateField(unique=True)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    description = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"{self.date} - {self.reason}"
+
+
+class DailyRate(models.Model):
+    """
+    Effective-dated daily tax rate. Rows without a vehicle are the global schedule,
+    rows with one are overrides for that vehicle.
+
+    A vehicle with rows of its own is on its own schedule from its first row on:
+    global rows effective after that don't change its rate. Before it (and for
+    vehicles without overrides) the rate is the latest global row effective on or
+    before the day. Days before any row use Vehicle.daily_rate. See RateScheduleService.
+    """
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name="rates", null=True, blank=True)
+    rate = models.DecimalField(max_digits=6, decimal_places=2)
+    effective_from = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["effective_from"]
+        constraints = [
+            models.UniqueConstraint(fields=["vehicle", "effective_from"], name="unique_vehicle_rate_date"),
+            models.UniqueConstraint(
+                fields=["effective_from"],
+                condition=Q(vehicle__isnull=True),
+                name="unique_global_rate_date",
+            ),
+        ]
+
+    def __str__(self):
+        scope = self.vehicle_id or "global"
+        return f"{scope}: {self.rate} from {self.effective_from}"
+
+
 class Payment(models.Model):
     PAYMENT_METHODS = [
         ('agent', 'Agent Cash'),
@@ -171,5 +284,181 @@ class Payment(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     notes = models.TextField(blank=True, null=True)
 
+    # Offline agent collections (see PaymentSyncService): the key the device generated for
+    # the collection, so a re-sent upload can't record it twice, and when the cash was taken
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True)
+    collected_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Range scans of successful payments (hourly dashboard buckets, latest transactions)
+            models.Index(fields=["payment_status", "timestamp"], name="payment_status_time_idx"),
+            # Agent collection stats
+            models.Index(fields=["collected_by", "timestamp"], name="payment_agent_time_idx"),
+            # Latest payments of a vehicle (every vehicle serializer)
+            models.Index(fields=["vehicle", "-timestamp"], name="payment_vehicle_time_idx"),
+        ]
+        constraints = [
+            # Receipt verification / PDF and gateway callbacks look payments up by reference.
+            # NULLs (agent cash) don't collide.
+            models.UniqueConstraint(fields=["refrence"], name="unique_payment_reference"),
+            # One payment per device key and agent; NULL keys (every other payment) don't collide
+            models.UniqueConstraint(fields=["collected_by", "idempotency_key"], name="unique_agent_idempotency_key"),
+        ]
+
+    def __str__(self):
+        return f"₦{self.amount} - {self.vehicle.plate_number}"
+
+    def save(self, *args, **kwargs):
+        # A blank reference means "none"; stored as NULL so it stays out of the unique constraint
+        if not self.refrence:
+            self.refrence = None
+        super().save(*args, **kwargs)
+
+
+class VehicleLedgerState(models.Model):
+    """
+    Denormalized finance counters for a vehicle.
+    Kept current on every payment / exemption write (see apps.core.signals),
+    so reading a balance never has to aggregate the payments table.
+    """
+    COMPLIANCE_CHOICES = [
+        ("ACTIVE", "Active"),
+        ("OWING", "Owing"),
+        ("INACTIVE_DUE_TO_DEBT", "Inactive due to debt"),
+    ]
+
+    vehicle = models.OneToOneField(Vehicle, on_delete=models.CASCADE, primary_key=True, related_name="ledger_state")
+
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    last_payment_at = models.DateTimeField(null=True, blank=True)
+
+    # Full length of every approved exemption, plus the latest end date.
+    # While exempt_until is in the past the counter equals the capped day count.
+    approved_exempt_days = models.PositiveIntegerField(default=0)
+    exempt_until = models.DateField(null=True, blank=True)
+
+    # Last day covered by payments: the vehicle starts owing the day after.
+    # Ordering by this column orders the fleet by debt (oldest date = deepest debt).
+    paid_through = models.DateField(null=True, blank=True, db_index=True)
+
+    # When the counters above were last brought current
+    balance_as_of = models.DateTimeField(default=timezone.now)
+
+    # Stored 7-day rule tier, written on every payment / exemption write and when the
+    # debt crosses a threshold (process_status_crossings), so the fleet can be filtered
+    # by status in SQL. sweep_compliance recomputes it for everyone.
+    compliance_status = models.CharField(max_length=30, choices=COMPLIANCE_CHOICES, default="ACTIVE", db_index=True)
+    status_computed_at = models.DateTimeField(null=True, blank=True)
+
+    # Earliest day the tier can drop without any write (ACTIVE -> OWING -> INACTIVE_DUE_TO_DEBT).
+    # Empty when only a payment or exemption can change it. See ComplianceScheduler.
+    next_status_check = models.DateField(null=True, blank=True, db_index=True)
+
+    # Head of the append-only LedgerEntry chain. ledger_opened_on stays empty until
+    # the vehicle's history has been backfilled (see the backfill_ledger command).
+    ledger_balance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    ledger_opened_on = models.DateField(null=True, blank=True)
+    # Last day the daily accrual has dealt with (charged, or skipped as exempt / no-charge);
+    # the next run catches up from the day after, so a missed run is never lost
+    charged_through = models.DateField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.vehicle_id} - paid ₦{self.total_paid}"
+
+
+class LedgerEntry(models.Model):
+    """
+    Append-only tax ledger. Entries are never edited or deleted: corrections are new
+    entries. Each row carries the vehicle's running balance after it, so the balance on
+    any date is the last entry posted on or before that date (one index probe).
+    """
+    ENTRY_TYPES = [
+        ("charge", "Daily Charge"),
+        ("payment", "Payment"),
+        ("exemption", "Exemption Credit"),
+        ("no_charge", "No-Charge Day Credit"),
+        ("adjustment", "Adjustment"),
+    ]
+
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name="ledger_entries")
+    posted_date = models.DateField()
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES)
+
+    # Double entry: charges debit the vehicle, payments and exemptions credit it
+    debit = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    credit = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    running_balance = models.DecimalField(max_digits=14, decimal_places=2)
+
+    # Kept (SET_NULL) so history survives the source row being deleted
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name="ledger_entries")
+    memo = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["vehicle", "posted_date", "id"], name="ledger_vehicle_posted_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["vehicle", "posted_date"],
+                condition=Q(entry_type="charge"),
+                name="one_charge_per_vehicle_day",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.vehicle_id} {self.posted_date} {self.entry_type} {self.credit - self.debit}"
+
+
+class PaymentDailyRollup(models.Model):
+    """
+    Successful payments summed per (day, payment_method, collected_by, vehicle).
+    Moved by the payment signals in the same transaction as the payment change, and
+    rebuilt for a date range by `rebuild_payment_rollups`. Dashboards read these
+    instead of grouping the payments table.
+    """
+    day = models.DateField()
+    payment_method = models.CharField(max_length=100, choices=Payment.PAYMENT_METHODS)
+    collected_by = models.ForeignKey(
+        "users.Agent", on_delete=models.SET_NULL, null=True, blank=True, related_name="payment_rollups"
+    )
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name="payment_rollups")
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    payment_count = models.IntegerField(default=0)
+
+    class Meta:
+        # Not unique: deleting an agent folds its rows into the collected_by=NULL ones
+        indexes = [
+            models.Index(fields=["day", "payment_method"], name="rollup_day_method_idx"),
+            models.Index(fields=["vehicle", "day"], name="rollup_vehicle_day_idx"),
+            models.Index(fields=["collected_by", "day"], name="rollup_agent_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.payment_method} {self.vehicle_id}: {self.total_amount} ({self.payment_count})"
+
+
+class VehicleChange(models.Model):
+    """
+    Change feed behind the agent app's offline copy of the fleet (see VehicleChangeFeed).
+    The id is the feed sequence. Each vehicle has one row per station, re-inserted at the
+    end of the feed whenever the vehicle or one of its payments / exemptions / rates
+    changes; deleting the vehicle (or moving it to another station) leaves a tombstone.
+    A row without a vehicle is a reset: something moved every vehicle's figures, so
+    copies made before it start over.
+    """
+    vehicle_id = models.UUIDField(null=True, blank=True, db_index=True)
+    # The vehicle's station when recorded (a move leaves a tombstone in the old one)
+    station_id = models.BigIntegerField(null=True, blank=True)
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # One station's feed after a cursor
+            models.Index(fields=["station_id", "id"], name="vehicle_change_station_idx"),
+        ]
+
     def __str__(self):
-        return f"₦{self.amount} - {self.vehicle.plate_number}"
\ No newline at end of file
+        return f"#{self.pk} {self.vehicle_id or 'reset'}{' (deleted)' if self.deleted else ''}"
@@ -0,0 +1,153 @@
+import re
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from apps.core.models import Vehicle, VehicleChange
+from apps.core.services.scan_card import ScanCardService
+
+
+class VehicleChangeFeed:
+    """
+    Incremental sync for the agent app: the vehicles changed since a cursor, as scan
+    cards (plus id and daily rate) or tombstones, in feed order.
+
+    Writes record the vehicle after commit (rolled back changes never show up) under
+    its current station and drop the vehicle's earlier row for that station, so a
+    station's feed holds one row per vehicle and a page never repeats one. A vehicle
+    moved to another station leaves a tombstone in the old station's feed. Agents
+    with a station read only its rows (through the station index); agents without
+    one read every row. Fleet-wide changes (no-charge days, global rates) record a
+    reset instead; a cursor from before it gets {"reset": true} and starts over, as
+    does a cursor issued for a station the agent is no longer at.
+
+    The cursor is the row id, so ids must become visible in order: a reader that
+    saw id 11 before a slower transaction committed id 10 would skip it for good.
+    Writers therefore take a transaction-scoped advisory lock on PostgreSQL, which
+    makes allocating the ids and committing them one step (SQLite serializes
+    writers on its own).
+    """
+
+    PAGE_SIZE = 200
+    MAX_PAGE_SIZE = 1000
+    CURSOR = re.compile(r"^(?:(\d+):)?(\d+)$")
+    # pg_advisory_xact_lock key serializing writes to the feed
+    LOCK_KEY = 0x76636866
+
+    @staticmethod
+    def record(vehicle_id, deleted=False, station_id=None):
+        """
+        A tombstone (deleted=True) goes to the station the vehicle was at; other
+        changes are filed under the station it is at when the transaction commits.
+        """
+        if not deleted:
+            VehicleChangeFeed.record_many([vehicle_id])
+        elif vehicle_id is not None:
+            transaction.on_commit(lambda: VehicleChangeFeed._write(
+                [VehicleChange(vehicle_id=vehicle_id, station_id=station_id, deleted=True)]
+            ))
+
+    @staticmethod
+    def record_many(vehicle_ids):
+        vehicle_ids = [vehicle_id for vehicle_id in set(vehicle_ids) if vehicle_id is not None]
+        if not vehicle_ids:
+            return
+
+        def write():
+            VehicleChangeFeed._write([
+                VehicleChange(vehicle_id=vehicle_id, station_id=station_id)
+                for vehicle_id, station_id in Vehicle.objects.filter(pk__in=vehicle_ids).values_list("pk", "station_id")
+            ])
+
+        transaction.on_commit(write)
+
+    @staticmethod
+    def reset():
+        def write():
+            with transaction.atomic():
+                VehicleChangeFeed._lock()
+                row = VehicleChange.objects.create(vehicle_id=None)
+                VehicleChange.objects.filter(vehicle_id__isnull=True, pk__lt=row.pk).delete()
+
+        transaction.on_commit(write)
+
+    @staticmethod
+    def cursor(position, station_id=None):
+        return str(position) if station_id is None else f"{station_id}:{position}"
+
+    @staticmethod
+    def parse_cursor(value, station_id=None):
+        """
+        Feed position of a cursor from page(), or None when it was issued for another
+        station (the agent was moved) and the copy has to start over. "0" is always
+        the start. Raises ValueError for anything else.
+        """
+        match = VehicleChangeFeed.CURSOR.match(value or "0")
+        if match is None:
+            raise ValueError(value)
+        position = int(match.group(2))
+        issued_for = int(match.group(1)) if match.group(1) else None
+        if position and issued_for != station_id:
+            return None
+        return position
+
+    @staticmethod
+    def page(since="0", limit=PAGE_SIZE, station_id=None):
+        """
+        {"cursor", "has_more", "changes"} after the cursor `since` ("0" = the whole
+        fleet, or the station's), or {"reset": true, ...} when the caller's copy has
+        to start over from "0".
+        """
+        limit = max(1, min(limit, VehicleChangeFeed.MAX_PAGE_SIZE))
+        position = VehicleChangeFeed.parse_cursor(since, station_id)
+        if position is None or (
+            position and VehicleChange.objects.filter(vehicle_id__isnull=True, pk__gt=position).exists()
+        ):
+            return {"reset": True, "cursor": "0", "has_more": True, "changes": []}
+
+        rows = VehicleChange.objects.filter(pk__gt=position, vehicle_id__isnull=False)
+        if station_id is not None:
+            rows = rows.filter(station_id=station_id)
+        rows = list(rows.order_by("pk").values_list("pk", "vehicle_id")[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # Vehicles deleted or moved out of the station since have no card here
+        cards = ScanCardService.cards_for([vehicle_id for _, vehicle_id in rows], station_id)
+        changes = []
+        for _, vehicle_id in rows:
+            found = cards.get(vehicle_id)
+            if found is None:
+                changes.append({"id": vehicle_id, "deleted": True})
+            else:
+                card, is_active = found
+                changes.append({"id": vehicle_id, **card, "active": is_active})
+
+        return {
+            "cursor": VehicleChangeFeed.cursor(rows[-1][0] if rows else position, station_id),
+            "has_more": has_more,
+            "changes": changes,
+        }
+
+    @staticmethod
+    def _lock():
+        """
+        Held until the surrounding transaction ends, so feed rows commit in id order.
+        """
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [VehicleChangeFeed.LOCK_KEY])
+
+    @staticmethod
+    def _write(rows):
+        if not rows:
+            return
+        with transaction.atomic():
+            VehicleChangeFeed._lock()
+            created = VehicleChange.objects.bulk_create(rows)
+            first = min(row.pk for row in created)
+            by_station = defaultdict(list)
+            for row in rows:
+                by_station[row.station_id].append(row.vehicle_id)
+            for station_id, vehicle_ids in by_station.items():
+                VehicleChange.objects.filter(vehicle_id__in=vehicle_ids, station_id=station_id, pk__lt=first).delete()
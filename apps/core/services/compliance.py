@@ -0,0 +1,122 @@
+from datetime import timedelta
+from decimal import Decimal, ROUND_FLOOR
+
+from django.utils import timezone
+
+from apps.core.events import compliance_status_changed
+from apps.core.models import Vehicle, VehicleLedgerState
+from apps.core.services.rate_schedule import RateScheduleService
+from apps.core.services.vehicle_finance import VehicleFinanceService
+
+
+class ComplianceService:
+    """
+    Writes the 7-day rule tier into VehicleLedgerState.compliance_status,
+    so "every INACTIVE_DUE_TO_DEBT vehicle" is an indexed filter instead of a fleet-wide loop.
+    """
+
+    # Debt depth (in days of the current rate) at which a vehicle becomes INACTIVE_DUE_TO_DEBT
+    DEBT_DAYS_LIMIT = 7
+
+    @staticmethod
+    def recompute(vehicles, today=None):
+        """
+        Recomputes and stores the tier for already-loaded vehicles
+        (ideally loaded through VehicleFinanceService.with_finance), together with the
+        day it has to be looked at again (always after `today`, default the current day).
+        Sends compliance_status_changed for every change.
+        Returns the number of vehicles whose tier changed.
+        """
+        now = timezone.now()
+        today = today or now.date()
+        states = []
+        changes = []
+
+        for vehicle in vehicles:
+            state = VehicleFinanceService.get_ledger_state(vehicle)
+            if state is None:
+                state = VehicleLedgerState.objects.create(vehicle=vehicle)
+            snapshot = VehicleFinanceService.snapshot(vehicle)
+            if snapshot.compliance_status != state.compliance_status:
+                changes.append((vehicle.pk, state.compliance_status, snapshot.compliance_status))
+            state.compliance_status = snapshot.compliance_status
+            state.status_computed_at = now
+            state.next_status_check = ComplianceService.next_check_date(vehicle, snapshot, today)
+            states.append(state)
+
+        VehicleLedgerState.objects.bulk_update(states, ["compliance_status", "status_computed_at", "next_status_check"])
+
+        for vehicle_id, previous, current in changes:
+            compliance_status_changed.send(
+                sender=ComplianceService, vehicle_id=vehicle_id, previous=previous, current=current, changed_at=now
+            )
+        return len(changes)
+
+    @staticmethod
+    def next_check_date(vehicle, snapshot, today=None):
+        """
+        First day the tier would drop if nothing else happened: the balance shrinks by one
+        day's rate per day, ACTIVE turns OWING once it goes negative and OWING turns
+        INACTIVE_DUE_TO_DEBT below -7 days. Exemptions and no-charge days only push the
+        real date later, so checking early and rescheduling is always safe; a rate change
+        can bring it forward, so the check is never later than the next one.
+        None when time alone can't change the tier.
+        """
+        today = today or timezone.now().date()
+        rate = snapshot.daily_rate
+        if snapshot.compliance_status == "INACTIVE_DUE_TO_DEBT" or rate <= 0:
+            return None
+        if not vehicle.is_active or VehicleFinanceService.billing_start_date(vehicle) is None:
+            return None
+
+        balance = Decimal(str(snapshot.balance))
+        if snapshot.compliance_status == "ACTIVE":
+            days = (balance / rate).to_integral_value(rounding=ROUND_FLOOR) + 1
+        else:
+            days = ((balance + rate * ComplianceService.DEBT_DAYS_LIMIT) / rate).to_integral_value(rounding=ROUND_FLOOR) + 1
+        check = today + timedelta(days=max(int(days), 1))
+
+        rate_change = RateScheduleService.for_vehicle(vehicle).next_change_after(today)
+        if rate_change is not None and rate_change < check:
+            check = rate_change
+        return check
+
+    @staticmethod
+    def refresh_vehicle(vehicle_id):
+        """
+        Keeps a single vehicle's stored tier current after a payment or exemption write.
+        """
+        vehicles = VehicleFinanceService.with_finance(Vehicle.objects.filter(pk=vehicle_id))
+        return ComplianceService.recompute(vehicles)
+
+    @staticmethod
+    def refresh_vehicles(vehicle_ids):
+        """
+        refresh_vehicle for a batch of vehicles written together (same queries as one).
+        """
+        vehicles = VehicleFinanceService.with_finance(Vehicle.objects.filter(pk__in=list(vehicle_ids)))
+        return ComplianceService.recompute(vehicles)
+
+    @staticmethod
+    def recheck_all(day=None):
+        """
+        Makes every vehicle due for the next scheduler run, for fleet-wide changes
+        (global rate, no-charge calendar) that move every crossing date at once.
+        """
+        return VehicleLedgerState.objects.update(next_status_check=day or timezone.now().date())
+
+    @staticmethod
+    def iter_batches(batch_size=500, after=None):
+        """
+        Yields the fleet in primary-key order, one batch at a time.
+        `after` is the last primary key already processed (resume cursor).
+        """
+        while True:
+            queryset = Vehicle.objects.order_by("pk")
+            if after is not None:
+                queryset = queryset.filter(pk__gt=after)
+            batch = list(VehicleFinanceService.with_finance(queryset)[:batch_size])
+            if not batch:
+                return
+            yield batch
+            after = batch[-1].pk
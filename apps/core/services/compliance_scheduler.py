@@ -0,0 +1,86 @@
+import heapq
+
+from django.utils import timezone
+
+from apps.core.models import Vehicle, VehicleLedgerState
+from apps.core.services.compliance import ComplianceService
+from apps.core.services.vehicle_finance import VehicleFinanceService
+
+
+class ComplianceScheduler:
+    """
+    Priority queue of (next_status_check, vehicle id), so the daily run only touches
+    the vehicles whose debt crosses a 7-day rule boundary that day instead of the fleet.
+
+    The queue is rebuilt from VehicleLedgerState.next_status_check on start (the column
+    is the durable copy); payments and exemptions keep that column current through
+    ComplianceService.recompute, so a popped entry is re-checked against it first.
+    """
+
+    def __init__(self):
+        self.heap = []
+
+    @classmethod
+    def load(cls, until=None):
+        """
+        Rebuilds the queue from stored state. `until` limits it to checks due by that day.
+        """
+        scheduler = cls()
+        states = VehicleLedgerState.objects.filter(next_status_check__isnull=False)
+        if until is not None:
+            states = states.filter(next_status_check__lte=until)
+        scheduler.heap = list(states.values_list("next_status_check", "vehicle_id"))
+        heapq.heapify(scheduler.heap)
+        return scheduler
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, day, vehicle_id):
+        if day is not None:
+            heapq.heappush(self.heap, (day, vehicle_id))
+
+    def peek(self):
+        return self.heap[0] if self.heap else None
+
+    def pop_due(self, today, limit=None):
+        """
+        Vehicle ids whose check is due on or before `today`, earliest first.
+        """
+        due = []
+        while self.heap and self.heap[0][0] <= today and (limit is None or len(due) < limit):
+            due.append(heapq.heappop(self.heap)[1])
+        return due
+
+    def run(self, today=None, batch_size=500):
+        """
+        Processes every due vehicle: recomputes (and stores) its tier and next check,
+        which sends compliance_status_changed for crossings, then queues it again.
+        Returns (processed, changed).
+        """
+        today = today or timezone.now().date()
+        processed = 0
+        changed = 0
+
+        while True:
+            vehicle_ids = self.pop_due(today, limit=batch_size)
+            if not vehicle_ids:
+                break
+
+            # Skip entries a payment or exemption has already rescheduled
+            vehicles = [
+                vehicle
+                for vehicle in VehicleFinanceService.with_finance(Vehicle.objects.filter(pk__in=vehicle_ids))
+                if vehicle.ledger_state.next_status_check is not None
+                and vehicle.ledger_state.next_status_check <= today
+            ]
+            changed += ComplianceService.recompute(vehicles, today)
+            processed += len(vehicles)
+
+            # Only checks after `today` go back in, so one run never sees a vehicle twice
+            for vehicle in vehicles:
+                next_check = vehicle.ledger_state.next_status_check
+                if next_check is not None and next_check > today:
+                    self.push(next_check, vehicle.pk)
+
+        return processed, changed
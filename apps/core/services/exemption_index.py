@@ -0,0 +1,120 @@
+from bisect import bisect_right
+from datetime import timedelta
+
+from django.db import transaction
+
+from apps.core.models import VehicleExemption, VehicleExemptionSpan
+
+
+class ExemptionIndex:
+    """
+    Normalized store of approved exemptions: merged, non-overlapping spans per vehicle
+    with running day totals. Overlapping exemptions are counted once.
+
+    Lookups are a single probe on the (vehicle, start_date) index, or a bisect
+    over spans that were already loaded; no exemption rows are read.
+    """
+
+    @staticmethod
+    def merge(ranges):
+        """
+        Merges (start_date, end_date) pairs into sorted, non-overlapping spans.
+        Touching ranges (one ends the day before the next starts) are joined too.
+        Returns a list of (start_date, end_date, cumulative_days).
+        """
+        merged = []
+        for start, end in sorted(r for r in ranges if r[1] >= r[0]):
+            if merged and start <= merged[-1][1] + timedelta(days=1):
+                if end > merged[-1][1]:
+                    merged[-1][1] = end
+            else:
+                merged.append([start, end])
+
+        spans = []
+        total = 0
+        for start, end in merged:
+            total += (end - start).days + 1
+            spans.append((start, end, total))
+        return spans
+
+    @staticmethod
+    def rebuild_vehicle(vehicle_id):
+        """
+        Rewrites the spans of one vehicle from its approved exemptions.
+        Returns (total exempt days, last exempt day or None).
+        """
+        ranges = VehicleExemption.objects.filter(
+            vehicle_id=vehicle_id, is_approved=True
+        ).values_list("start_date", "end_date")
+        spans = ExemptionIndex.merge(ranges)
+
+        with transaction.atomic():
+            VehicleExemptionSpan.objects.filter(vehicle_id=vehicle_id).delete()
+            VehicleExemptionSpan.objects.bulk_create([
+                VehicleExemptionSpan(vehicle_id=vehicle_id, start_date=start, end_date=end, cumulative_days=total)
+                for start, end, total in spans
+            ])
+
+        if not spans:
+            return 0, None
+        return spans[-1][2], spans[-1][1]
+
+    # --- Lookups against the database (one index probe) ---
+
+    @staticmethod
+    def _span_at_or_before(vehicle_id, day):
+        return (
+            VehicleExemptionSpan.objects
+            .filter(vehicle_id=vehicle_id, start_date__lte=day)
+            .order_by("-start_date")
+            .values_list("start_date", "end_date", "cumulative_days")
+            .first()
+        )
+
+    @staticmethod
+    def exempt_days_until(vehicle_id, day):
+        """
+        Number of exempt days on or before `day`.
+        """
+        return ExemptionIndex._days_until(ExemptionIndex._span_at_or_before(vehicle_id, day), day)
+
+    @staticmethod
+    def active_span(vehicle_id, day):
+        """
+        (start_date, end_date) of the span covering `day`, or None.
+        """
+        return ExemptionIndex._covering(ExemptionIndex._span_at_or_before(vehicle_id, day), day)
+
+    # --- Lookups against spans already in memory (bisect) ---
+
+    @staticmethod
+    def _locate(spans, day):
+        position = bisect_right(spans, day, key=lambda span: span[0])
+        return spans[position - 1] if position else None
+
+    @staticmethod
+    def exempt_days_until_in(spans, day):
+        return ExemptionIndex._days_until(ExemptionIndex._locate(spans, day), day)
+
+    @staticmethod
+    def active_span_in(spans, day):
+        return ExemptionIndex._covering(ExemptionIndex._locate(spans, day), day)
+
+    # --- Shared span arithmetic ---
+
+    @staticmethod
+    def _days_until(span, day):
+        if span is None:
+            return 0
+        start, end, cumulative = span
+        if day >= end:
+            return cumulative
+        # Inside the span: drop the days after `day`
+        return cumulative - (end - day).days
+
+    @staticmethod
+    def _covering(span, day):
+        if span is None:
+            return None
+        start, end, _ = span
+        return (start, end) if start <= day <= end else None
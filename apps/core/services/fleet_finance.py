@@ -0,0 +1,325 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.core.models import DailyRate, Vehicle, Payment, VehicleExemptionSpan, VehicleLedgerState
+from apps.core.services.no_charge_calendar import NoChargeCalendar
+from apps.core.services.rate_schedule import RateScheduleService
+
+
+class FleetFinanceCalculator:
+    """
+    Vectorized version of VehicleFinanceService for the whole fleet.
+
+    Loads the inputs with a handful of values_list() queries into NumPy arrays and
+    computes days active, chargeable days, expected revenue, balance and the 7-day
+    tier for every vehicle in one pass. Money is handled as integer kobo (int64),
+    so the results match the per-object Decimal maths exactly.
+
+    Rate schedules of the whole fleet are flattened into one sorted array of segments
+    keyed by (vehicle index, start day) with per-vehicle cumulative costs, so the cost
+    of any range for every vehicle at once is a single np.searchsorted.
+    Fleet-wide no-charge days come in as a prefix-popcount array over day ordinals.
+    """
+
+    TIERS = np.array(["ACTIVE", "OWING", "INACTIVE_DUE_TO_DEBT"])
+
+    # Segment keys are vehicle_index * DAY_SPAN + day ordinal (date.max.toordinal() < DAY_SPAN)
+    DAY_SPAN = 10_000_000
+
+    def __init__(self, queryset=None, today=None):
+        self.queryset = queryset if queryset is not None else Vehicle.objects.all()
+        self.today = today or timezone.now().date()
+        self.load_seconds = 0.0
+        self.compute_seconds = 0.0
+
+    # --- Loading ---
+
+    @staticmethod
+    def _to_kobo(values):
+        return np.array([int(Decimal(str(value)) * 100) for value in values], dtype=np.int64)
+
+    def load(self):
+        started = time.perf_counter()
+
+        rows = list(self.queryset.order_by().values_list("pk", "activated_at", "daily_rate", "is_active"))
+        self.ids = [row[0] for row in rows]
+        index = {pk: i for i, pk in enumerate(self.ids)}
+        count = len(rows)
+
+        # First billed day as an ordinal (same 4 PM rule as VehicleFinanceService.billing_start_date).
+        # -1 marks vehicles that were never activated.
+        start = np.full(count, -1, dtype=np.int64)
+        for i, (_, activated_at, _, _) in enumerate(rows):
+            if activated_at is not None:
+                day = activated_at.date()
+                if timezone.localtime(activated_at).hour >= 16:
+                    day += timedelta(days=1)
+                start[i] = day.toordinal()
+        self.start_ordinal = start
+
+        self.is_active = np.array([row[3] for row in rows], dtype=bool)
+        self._load_rates(rows)
+        self.calendar_first, self.calendar_prefix = NoChargeCalendar.current().prefix_array()
+
+        # Paid totals come from the ledger counters; vehicles without counters fall back to the aggregate
+        self.paid_kobo = np.zeros(count, dtype=np.int64)
+        missing = set(self.ids)
+        states = VehicleLedgerState.objects.filter(vehicle__in=self.queryset).values_list("vehicle_id", "total_paid")
+        for vehicle_id, total_paid in states:
+            if vehicle_id in index:
+                self.paid_kobo[index[vehicle_id]] = int(total_paid * 100)
+                missing.discard(vehicle_id)
+        if missing:
+            totals = (
+                Payment.objects
+                .filter(vehicle_id__in=missing, payment_status="success")
+                .values_list("vehicle_id")
+                .annotate(total=Sum("amount"))
+            )
+            for vehicle_id, total in totals:
+                self.paid_kobo[index[vehicle_id]] = int(total * 100)
+
+        # Merged exemption spans as parallel arrays (owner index, start ordinal, end ordinal)
+        ranges = VehicleExemptionSpan.objects.filter(
+            vehicle__in=self.queryset
+        ).values_list("vehicle_id", "start_date", "end_date")
+        owners, starts, ends = [], [], []
+        for vehicle_id, start_date, end_date in ranges:
+            owners.append(index[vehicle_id])
+            starts.append(start_date.toordinal())
+            ends.append(end_date.toordinal())
+        self.exemption_owner = np.array(owners, dtype=np.int64)
+        self.exemption_start = np.array(starts, dtype=np.int64)
+        self.exemption_end = np.array(ends, dtype=np.int64)
+
+        self.load_seconds = time.perf_counter() - started
+        return self
+
+    def _load_rates(self, rows):
+        own = {}
+        overrides = DailyRate.objects.filter(vehicle__in=self.queryset).values_list("vehicle_id", "effective_from", "rate")
+        for vehicle_id, effective_from, rate in overrides:
+            own.setdefault(vehicle_id, []).append((effective_from, rate))
+        global_rates = RateScheduleService.global_rates()
+
+        owners, starts, rates = [], [], []
+        for i, (pk, _, daily_rate, _) in enumerate(rows):
+            for start, rate in RateScheduleService.build(daily_rate, global_rates, own.get(pk, [])).segments:
+                owners.append(i)
+                starts.append(start.toordinal())
+                rates.append(rate)
+
+        owner = np.array(owners, dtype=np.int64)
+        start = np.array(starts, dtype=np.int64)
+        rate = self._to_kobo(rates)
+
+        # Cost of each segment up to the next one of the same vehicle, then a running
+        # total that restarts at every vehicle's first segment
+        count = len(owner)
+        first = np.ones(count, dtype=bool)
+        first[1:] = owner[1:] != owner[:-1]
+        length_cost = np.zeros(count, dtype=np.int64)
+        length_cost[:-1] = np.where(first[1:], 0, (start[1:] - start[:-1]) * rate[:-1])
+        running = np.cumsum(length_cost) - length_cost
+        first_index = np.maximum.accumulate(np.where(first, np.arange(count), 0))
+
+        self.segment_key = owner * self.DAY_SPAN + start
+        self.segment_start = start
+        self.segment_rate = rate
+        self.segment_cumulative = running - running[first_index]
+        self.segment_first_index = first_index
+
+    def _no_charge_before(self, ordinal):
+        """
+        Fleet-wide no-charge days strictly before each ordinal (prefix popcount lookup).
+        """
+        offset = np.clip(ordinal - self.calendar_first, 0, len(self.calendar_prefix) - 1)
+        return self.calendar_prefix[offset]
+
+    def _cost_before(self, owner, ordinal):
+        """
+        Kobo owed by each `owner` vehicle for every day strictly before `ordinal` (arrays).
+        """
+        segment = np.searchsorted(self.segment_key, owner * self.DAY_SPAN + ordinal, side="right") - 1
+        return self.segment_cumulative[segment] + (ordinal - self.segment_start[segment]) * self.segment_rate[segment]
+
+    def _no_charge_cost_before(self, owner, ordinal):
+        """
+        Same as _cost_before, counting only the no-charge days: the day counter inside
+        each segment is the prefix popcount instead of the ordinal.
+        """
+        segment = np.searchsorted(self.segment_key, owner * self.DAY_SPAN + ordinal, side="right") - 1
+        inside = self._no_charge_before(ordinal) - self._no_charge_before(self.segment_start[segment])
+        return self.segment_no_charge_cumulative[segment] + inside * self.segment_rate[segment]
+
+    def _prepare_no_charge_costs(self):
+        count = len(self.segment_start)
+        first = np.zeros(count, dtype=bool)
+        first[self.segment_first_index] = True
+        length_cost = np.zeros(count, dtype=np.int64)
+        days = self._no_charge_before(self.segment_start[1:]) - self._no_charge_before(self.segment_start[:-1])
+        length_cost[:-1] = np.where(first[1:], 0, days * self.segment_rate[:-1])
+        running = np.cumsum(length_cost) - length_cost
+        self.segment_no_charge_cumulative = running - running[self.segment_first_index]
+
+    # --- Computation ---
+
+    def compute(self):
+        started = time.perf_counter()
+        today = self.today.toordinal()
+
+        activated = self.start_ordinal >= 0
+        days_active = np.where(activated, np.maximum(today - self.start_ordinal + 1, 0), 0)
+
+        # Spans never overlap; they are capped at today and future spans count 0 days
+        capped_end = np.minimum(self.exemption_end, today)
+        durations = np.maximum(capped_end - self.exemption_start + 1, 0)
+        exempt_days = np.zeros(len(self.ids), dtype=np.int64)
+        np.add.at(exempt_days, self.exemption_owner, durations)
+
+        # No-charge days in the billed period, minus those inside the vehicle's own exemptions
+        vehicles = np.arange(len(self.ids), dtype=np.int64)
+        first_day = np.where(activated, self.start_ordinal, today + 1)
+        no_charge_days = np.maximum(self._no_charge_before(today + 1) - self._no_charge_before(first_day), 0)
+        overlap_start = np.maximum(self.exemption_start, first_day[self.exemption_owner])
+        overlapping = capped_end >= overlap_start
+        overlap_days = np.where(
+            overlapping, self._no_charge_before(capped_end + 1) - self._no_charge_before(overlap_start), 0
+        )
+        np.subtract.at(no_charge_days, self.exemption_owner, overlap_days)
+
+        chargeable = np.where(self.is_active, np.maximum(days_active - exempt_days - no_charge_days, 0), 0)
+
+        # Every billed day and every exempt day priced at the rate in force that day
+        billed_kobo = np.maximum(self._cost_before(vehicles, today + 1) - self._cost_before(vehicles, first_day), 0)
+        span_kobo = np.where(
+            durations > 0,
+            self._cost_before(self.exemption_owner, capped_end + 1)
+            - self._cost_before(self.exemption_owner, self.exemption_start),
+            0,
+        )
+        excused_kobo = np.zeros(len(self.ids), dtype=np.int64)
+        np.add.at(excused_kobo, self.exemption_owner, span_kobo)
+
+        self._prepare_no_charge_costs()
+        no_charge_kobo = np.maximum(
+            self._no_charge_cost_before(vehicles, today + 1) - self._no_charge_cost_before(vehicles, first_day), 0
+        )
+        overlap_kobo = np.where(
+            overlapping,
+            self._no_charge_cost_before(self.exemption_owner, capped_end + 1)
+            - self._no_charge_cost_before(self.exemption_owner, overlap_start),
+            0,
+        )
+        np.subtract.at(no_charge_kobo, self.exemption_owner, overlap_kobo)
+        excused_kobo += no_charge_kobo
+
+        expected_kobo = np.where(self.is_active, np.maximum(billed_kobo - excused_kobo, 0), 0)
+        balance_kobo = self.paid_kobo - expected_kobo
+
+        # The 7-day threshold uses today's rate
+        today_segment = np.searchsorted(self.segment_key, vehicles * self.DAY_SPAN + today, side="right") - 1
+        self.rate_kobo = self.segment_rate[today_segment]
+        tier = np.where(balance_kobo >= 0, 0, np.where(balance_kobo < -(self.rate_kobo * 7), 2, 1))
+
+        self.days_active = days_active
+        self.exempt_days = exempt_days
+        self.no_charge_days = no_charge_days
+        self.chargeable_days = chargeable
+        self.expected_kobo = expected_kobo
+        self.balance_kobo = balance_kobo
+        self.tier_index = tier
+
+        self.compute_seconds = time.perf_counter() - started
+        return self
+
+    def run(self):
+        return self.load().compute()
+
+    # --- Results ---
+
+    @property
+    def compliance_status(self):
+        return self.TIERS[self.tier_index]
+
+    def store_statuses(self, batch_size=1000):
+        """
+        Writes the computed tiers to VehicleLedgerState.compliance_status (only rows that changed).
+        Returns the number of rows updated.
+        """
+        now = timezone.now()
+        statuses = dict(zip(self.ids, (str(status) for status in self.compliance_status)))
+        changed = [
+            state
+            for state in VehicleLedgerState.objects.filter(vehicle__in=self.queryset).only("vehicle_id", "compliance_status")
+            if state.compliance_status != statuses[state.vehicle_id]
+        ]
+        for state in changed:
+            state.compliance_status = statuses[state.vehicle_id]
+            state.status_computed_at = now
+        VehicleLedgerState.objects.bulk_update(changed, ["compliance_status", "status_computed_at"], batch_size=batch_size)
+        return len(changed)
+
+    def results(self):
+        """
+        Per-vehicle results keyed by vehicle id, in the same units as VehicleFinanceService.
+        """
+        statuses = self.compliance_status
+        return {
+            pk: {
+                "days_active": int(self.days_active[i]),
+                "exempted_days": int(self.exempt_days[i]),
+                "no_charge_days": int(self.no_charge_days[i]),
+                "total_paid": Decimal(int(self.paid_kobo[i])) / 100,
+                "expected_revenue": Decimal(int(self.expected_kobo[i])) / 100,
+                "balance": Decimal(int(self.balance_kobo[i])) / 100,
+                "compliance_status": str(statuses[i]),
+            }
+            for i, pk in enumerate(self.ids)
+        }
+
+    def summary(self):
+        """
+        Fleet health totals for the admin dashboard.
+        """
+        counts = np.bincount(self.tier_index, minlength=len(self.TIERS))
+        debt_kobo = -self.balance_kobo[self.balance_kobo < 0].sum()
+        seconds = self.load_seconds + self.compute_seconds
+        return {
+            "vehicles": len(self.ids),
+            "status_counts": {str(tier): int(n) for tier, n in zip(self.TIERS, counts)},
+            "total_expected_revenue": Decimal(int(self.expected_kobo.sum())) / 100,
+            "total_paid": Decimal(int(self.paid_kobo.sum())) / 100,
+            "total_outstanding_debt": Decimal(int(debt_kobo)) / 100,
+            "load_ms": round(self.load_seconds * 1000, 1),
+            "compute_ms": round(self.compute_seconds * 1000, 1),
+            "ms_per_100k": round(seconds * 1000 * 100_000 / len(self.ids), 1) if self.ids else 0,
+        }
+
+    def verify_parity(self):
+        """
+        Compares every vehicle against the per-object VehicleFinanceService.
+        Returns a list of (vehicle_id, field, vectorized, per_object) mismatches.
+        """
+        from apps.core.services.vehicle_finance import VehicleFinanceService
+
+        fields = [
+            "days_active", "exempted_days", "no_charge_days", "total_paid",
+            "expected_revenue", "balance", "compliance_status",
+        ]
+        vectorized = self.results()
+        mismatches = []
+
+        for vehicle in VehicleFinanceService.with_finance(self.queryset.order_by()).iterator(chunk_size=1000):
+            snapshot = VehicleFinanceService.snapshot(vehicle)
+            for field in fields:
+                expected = getattr(snapshot, field)
+                actual = vectorized[vehicle.pk][field]
+                if expected != actual:
+                    mismatches.append((vehicle.pk, field, actual, expected))
+        return mismatches
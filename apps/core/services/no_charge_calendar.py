@@ -0,0 +1,136 @@
+import time
+from datetime import date
+
+import numpy as np
+from django.core.cache import cache
+
+from apps.core.models import NoChargeDay
+
+
+class NoChargeCalendar:
+    """
+    Fleet-wide no-charge days as one bitmap per year (bit i = day i of the year).
+
+    Each year also keeps its prefix popcounts (no-charge days before day i) and the
+    count of every earlier year, so "how many no-charge days between A and B" is O(1)
+    whatever the range. prefix_array() exposes the same counts as a NumPy array for
+    the vectorized fleet calculations.
+    """
+
+    CACHE_KEY = "calendar:no-charge"
+    CACHE_SECONDS = 60
+    # How long this process reuses its calendar before comparing it with the cache
+    # again; finance reads it once per vehicle, so a page must not cost a round trip each
+    LOCAL_SECONDS = 1
+
+    # Last built calendar of this process, reused while the cached bitmaps don't change
+    _built = None
+    _checked_at = 0.0
+
+    def __init__(self, bitmaps):
+        self.bitmaps = bitmaps
+        self.prefix = {}
+        self.before_year = {}
+        self.total = 0
+
+        years = sorted(bitmaps)
+        if not years:
+            self.first_ordinal = self.end_ordinal = 0
+            return
+        self.first_ordinal = date(years[0], 1, 1).toordinal()
+        self.end_ordinal = date(years[-1] + 1, 1, 1).toordinal()
+
+        # Years without a single no-charge day still get an (empty) entry
+        for year in range(years[0], years[-1] + 1):
+            bits = self.unpack(year, bitmaps.get(year))
+            self.before_year[year] = self.total
+            self.prefix[year] = np.concatenate(([0], np.cumsum(bits))).tolist()
+            self.total += self.prefix[year][-1]
+
+    # --- Bitmaps ---
+
+    @staticmethod
+    def days_in_year(year):
+        return date(year + 1, 1, 1).toordinal() - date(year, 1, 1).toordinal()
+
+    @staticmethod
+    def unpack(year, bitmap):
+        size = NoChargeCalendar.days_in_year(year)
+        if not bitmap:
+            return np.zeros(size, dtype=np.int64)
+        bits = np.unpackbits(np.frombuffer(bitmap, dtype=np.uint8), bitorder="little")
+        return bits[:size].astype(np.int64)
+
+    @staticmethod
+    def build_bitmaps(days):
+        """
+        {year: packed bitmap bytes} for an iterable of dates.
+        """
+        bits = {}
+        for day in days:
+            year_bits = bits.setdefault(day.year, np.zeros(NoChargeCalendar.days_in_year(day.year), dtype=np.uint8))
+            year_bits[day.timetuple().tm_yday - 1] = 1
+        return {year: np.packbits(year_bits, bitorder="little").tobytes() for year, year_bits in bits.items()}
+
+    @staticmethod
+    def current():
+        """
+        The calendar built from NoChargeDay, cached across requests. Other processes'
+        changes show up within LOCAL_SECONDS; this process's own right away.
+        """
+        now = time.monotonic()
+        built = NoChargeCalendar._built
+        if built is not None and now - NoChargeCalendar._checked_at < NoChargeCalendar.LOCAL_SECONDS:
+            return built
+
+        bitmaps = cache.get(NoChargeCalendar.CACHE_KEY)
+        if bitmaps is None:
+            bitmaps = NoChargeCalendar.build_bitmaps(NoChargeDay.objects.values_list("date", flat=True))
+            cache.set(NoChargeCalendar.CACHE_KEY, bitmaps, NoChargeCalendar.CACHE_SECONDS)
+
+        if built is None or built.bitmaps != bitmaps:
+            built = NoChargeCalendar(bitmaps)
+            NoChargeCalendar._built = built
+        NoChargeCalendar._checked_at = now
+        return built
+
+    @staticmethod
+    def invalidate():
+        cache.delete(NoChargeCalendar.CACHE_KEY)
+        NoChargeCalendar._built = None
+
+    # --- Counting ---
+
+    def count_before(self, ordinal):
+        """
+        No-charge days strictly before the given day ordinal.
+        """
+        if ordinal <= self.first_ordinal:
+            return 0
+        if ordinal >= self.end_ordinal:
+            return self.total
+        day = date.fromordinal(ordinal)
+        return self.before_year[day.year] + self.prefix[day.year][day.timetuple().tm_yday - 1]
+
+    def count(self, start, end):
+        """
+        No-charge days between start and end, both included.
+        """
+        if end < start:
+            return 0
+        return self.count_before(end.toordinal() + 1) - self.count_before(start.toordinal())
+
+    def is_no_charge(self, day):
+        return self.count(day, day) == 1
+
+    def prefix_array(self):
+        """
+        (first ordinal, prefix) with prefix[i] = no-charge days before first ordinal + i,
+        for vectorized lookups: clip the ordinal offsets to [0, len(prefix) - 1].
+        """
+        if not self.prefix:
+            return 0, np.zeros(1, dtype=np.int64)
+        counts = [0]
+        for year in sorted(self.prefix):
+            counts.extend(self.before_year[year] + c for c in self.prefix[year][1:])
+        return self.first_ordinal, np.array(counts, dtype=np.int64)
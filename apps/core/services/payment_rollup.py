@@ -0,0 +1,180 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.core.models import Payment, PaymentDailyRollup, VehicleLedgerState
+
+
+class PaymentRollupService:
+    """
+    Maintains PaymentDailyRollup: one row of (sum, count) per day, payment method,
+    collecting agent and vehicle, covering successful payments only.
+
+    The payment signals move a row whenever a payment enters or leaves 'success'
+    (or a successful one is edited); rebuild() recomputes any date range from scratch.
+
+    Every change also bumps a global payments version (after commit), which caches
+    of payment aggregates (see DashboardCache) stamp their entries with.
+    """
+
+    VERSION_KEY = "payments:version"
+
+    @staticmethod
+    def version():
+        version = cache.get(PaymentRollupService.VERSION_KEY)
+        if version is None:
+            # Lost (restart / eviction): start from the clock so it never goes back to
+            # a version an old entry could still carry
+            cache.add(PaymentRollupService.VERSION_KEY, int(time.time() * 1000), None)
+            version = cache.get(PaymentRollupService.VERSION_KEY)
+        return version
+
+    @staticmethod
+    def bump_version():
+        try:
+            cache.incr(PaymentRollupService.VERSION_KEY)
+        except ValueError:
+            PaymentRollupService.version()
+
+    @staticmethod
+    def day_of(timestamp):
+        return timezone.localtime(timestamp).date()
+
+    @staticmethod
+    def apply(vehicle_id, day, payment_method, collected_by_id, amount, count):
+        """
+        Adds (or with negative amount/count, takes out) payments from one rollup row.
+        """
+        key = {
+            "day": day,
+            "payment_method": payment_method,
+            "collected_by_id": collected_by_id,
+            "vehicle_id": vehicle_id,
+        }
+        with transaction.atomic():
+            # Same row lock as TaxLedgerService.post: writers of one vehicle are
+            # serialized, so two of them can't both insert the same key
+            list(VehicleLedgerState.objects.select_for_update().filter(vehicle_id=vehicle_id).values_list("pk"))
+
+            row = PaymentDailyRollup.objects.filter(**key).order_by("pk").values_list("pk", flat=True).first()
+            if row is None:
+                if count > 0:
+                    PaymentDailyRollup.objects.create(**key, total_amount=amount, payment_count=count)
+                    transaction.on_commit(PaymentRollupService.bump_version)
+                return
+
+            PaymentDailyRollup.objects.filter(pk=row).update(
+                total_amount=F("total_amount") + amount,
+                payment_count=F("payment_count") + count,
+            )
+            PaymentDailyRollup.objects.filter(pk=row, payment_count__lte=0).delete()
+        transaction.on_commit(PaymentRollupService.bump_version)
+
+    @staticmethod
+    def add(vehicle_id, amount, paid_at, payment_method, collected_by_id):
+        PaymentRollupService.apply(
+            vehicle_id, PaymentRollupService.day_of(paid_at), payment_method, collected_by_id, amount, 1
+        )
+
+    @staticmethod
+    def remove(vehicle_id, amount, paid_at, payment_method, collected_by_id):
+        PaymentRollupService.apply(
+            vehicle_id, PaymentRollupService.day_of(paid_at), payment_method, collected_by_id, -amount, -1
+        )
+
+    @staticmethod
+    def add_many(payments):
+        """
+        add() for a batch of new successful payments: existing rows are moved with one
+        bulk update and new ones inserted with one bulk insert. The caller holds the
+        vehicles' VehicleLedgerState row locks (see apply).
+        """
+        totals = {}
+        for payment in payments:
+            key = (
+                PaymentRollupService.day_of(payment.timestamp),
+                payment.payment_method,
+                payment.collected_by_id,
+                payment.vehicle_id,
+            )
+            amount, count = totals.get(key, (0, 0))
+            totals[key] = (amount + payment.amount, count + 1)
+        if not totals:
+            return
+
+        existing = {}
+        rows = PaymentDailyRollup.objects.filter(
+            vehicle_id__in={key[3] for key in totals}, day__in={key[0] for key in totals}
+        ).order_by("-pk")
+        for row in rows:
+            # Same row apply() would pick: the lowest pk of a key
+            existing[(row.day, row.payment_method, row.collected_by_id, row.vehicle_id)] = row
+
+        changed, created = [], []
+        for key, (amount, count) in totals.items():
+            row = existing.get(key)
+            if row is None:
+                day, payment_method, collected_by_id, vehicle_id = key
+                created.append(PaymentDailyRollup(
+                    day=day,
+                    payment_method=payment_method,
+                    collected_by_id=collected_by_id,
+                    vehicle_id=vehicle_id,
+                    total_amount=amount,
+                    payment_count=count,
+                ))
+            else:
+                row.total_amount += amount
+                row.payment_count += count
+                changed.append(row)
+
+        with transaction.atomic():
+            PaymentDailyRollup.objects.bulk_update(changed, ["total_amount", "payment_count"])
+            PaymentDailyRollup.objects.bulk_create(created)
+            transaction.on_commit(PaymentRollupService.bump_version)
+
+    @staticmethod
+    def rebuild(start=None, end=None):
+        """
+        Recomputes the rollups for the days start..end (both included; open-ended when
+        None) from the payments table. Returns the number of rows written.
+        """
+        rollups = PaymentDailyRollup.objects.all()
+        payments = Payment.objects.filter(payment_status="success")
+        if start:
+            rollups = rollups.filter(day__gte=start)
+            payments = payments.filter(timestamp__date__gte=start)
+        if end:
+            rollups = rollups.filter(day__lte=end)
+            payments = payments.filter(timestamp__date__lte=end)
+
+        rows = (
+            payments
+            .annotate(day=TruncDate("timestamp"))
+            .values("day", "payment_method", "collected_by_id", "vehicle_id")
+            .annotate(total=Sum("amount"), count=Count("id"))
+            .order_by()
+        )
+
+        with transaction.atomic():
+            rollups.delete()
+            created = PaymentDailyRollup.objects.bulk_create(
+                [
+                    PaymentDailyRollup(
+                        day=row["day"],
+                        payment_method=row["payment_method"],
+                        collected_by_id=row["collected_by_id"],
+                        vehicle_id=row["vehicle_id"],
+                        total_amount=row["total"],
+                        payment_count=row["count"],
+                    )
+                    for row in rows.iterator()
+                ],
+                batch_size=1000,
+            )
+            transaction.on_commit(PaymentRollupService.bump_version)
+        return len(created)
@@ -0,0 +1,114 @@
+from collections import OrderedDict
+
+from django.db import transaction
+
+from apps.core.models import Payment, Vehicle
+from apps.core.services.change_feed import VehicleChangeFeed
+from apps.core.services.compliance import ComplianceService
+from apps.core.services.payment_rollup import PaymentRollupService
+from apps.core.services.scan_card import ScanCardService
+from apps.core.services.tax_ledger import TaxLedgerService
+from apps.core.services.vehicle_ledger import VehicleLedgerService
+from apps.users.models import Agent
+from utils.plates import plate_key
+
+
+class PaymentSyncService:
+    """
+    Records an agent's queued offline collections in one go.
+
+    Every collection carries a key generated on the device; a key the agent already
+    synced (or repeated in the same batch) is answered with the existing payment
+    instead of a second one, so re-sending a batch after a dropped connection is
+    safe. The (collected_by, idempotency_key) unique constraint backs this up.
+
+    New payments are inserted with one bulk_create, which skips the payment signals,
+    so the ledger counters, rollups, tax ledger, stored tier, scan cards and change
+    feed are moved here with their bulk counterparts: a fixed number of queries for
+    the whole batch.
+    """
+
+    CREATED = "created"
+    DUPLICATE = "duplicate"
+    REJECTED = "rejected"
+
+    @staticmethod
+    def sync(agent, collections, station_id=None):
+        """
+        `collections` are validated dicts (idempotency_key, plate_number, amount,
+        collected_at, optional notes). Returns one result per collection, in order.
+        With `station_id`, plates of other stations' vehicles are rejected as unknown.
+        """
+        keys = OrderedDict()
+        for collection in collections:
+            keys.setdefault(collection["idempotency_key"], collection)
+
+        candidates = Vehicle.objects.filter(plate_key__in={plate_key(c["plate_number"]) for c in keys.values()})
+        if station_id is not None:
+            candidates = candidates.filter(station_id=station_id)
+        vehicles = {vehicle.plate_key: vehicle for vehicle in candidates.only("pk", "plate_key", "plate_number")}
+
+        with transaction.atomic():
+            # Serializes syncs of the same agent, so two uploads of one batch can't both
+            # miss each other's keys
+            Agent.objects.select_for_update().filter(pk=agent.pk).exists()
+
+            existing = dict(
+                Payment.objects.filter(collected_by=agent, idempotency_key__in=list(keys))
+                .values_list("idempotency_key", "pk")
+            )
+
+            payments = []
+            rejected = {}
+            for key, collection in keys.items():
+                if key in existing:
+                    continue
+                vehicle = vehicles.get(plate_key(collection["plate_number"]))
+                if vehicle is None:
+                    rejected[key] = "Vehicle not found."
+                    continue
+                payments.append(Payment(
+                    vehicle=vehicle,
+                    amount=collection["amount"],
+                    payment_method="agent",
+                    collected_by=agent,
+                    payment_status="success",
+                    idempotency_key=key,
+                    collected_at=collection["collected_at"],
+                    notes=collection.get("notes") or "Collected offline via Agent App",
+                ))
+
+            if payments:
+                Payment.objects.bulk_create(payments)
+                PaymentSyncService._apply(payments)
+
+        created = {payment.idempotency_key: payment.pk for payment in payments}
+        results = []
+        for collection in collections:
+            key = collection["idempotency_key"]
+            result = {"idempotency_key": key}
+            if key in rejected:
+                result.update(status=PaymentSyncService.REJECTED, error=rejected[key])
+            elif key in created and keys[key] is collection:
+                result.update(status=PaymentSyncService.CREATED, payment_id=created[key])
+            else:
+                result.update(status=PaymentSyncService.DUPLICATE, payment_id=existing.get(key) or created.get(key))
+            results.append(result)
+        return results
+
+    @staticmethod
+    def _apply(payments):
+        """
+        What the payment post_save signal does for each new successful payment.
+        """
+        totals = {}
+        for payment in payments:
+            amount, paid_at = totals.get(payment.vehicle_id, (0, payment.timestamp))
+            totals[payment.vehicle_id] = (amount + payment.amount, max(paid_at, payment.timestamp))
+
+        VehicleLedgerService.apply_payments(totals)
+        PaymentRollupService.add_many(payments)
+        TaxLedgerService.post_payments(payments)
+        ComplianceService.refresh_vehicles(totals)
+        ScanCardService.refresh_many(totals)
+        VehicleChangeFeed.record_many(totals)
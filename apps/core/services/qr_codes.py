@@ -0,0 +1,121 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from apps.core.models import Vehicle
+from utils.qr_assets import qr_assets
+
+logger = logging.getLogger(__name__)
+
+
+class QRCodeService:
+    """
+    Sticker QR codes, off the request path.
+
+    Vehicles are created with qr_status "pending"; after commit the new ids are
+    queued (celery, see apps.core.tasks) and a worker renders the QR, uploads it to
+    media storage and marks the vehicle "ready". A job that keeps failing marks it
+    "failed". Nothing is lost when there is no broker, it is down or a job is
+    dropped: the generate_qr_codes command drains whatever is still pending.
+    """
+
+    # A pending vehicle older than this is reported as stuck in stats()
+    STUCK_AFTER = timedelta(minutes=10)
+
+    @staticmethod
+    def render(plate_number):
+        """
+        The plate's QR as a PNG asset from the shared cache (see QRAssetCache).
+        """
+        return qr_assets.png(plate_number)
+
+    @staticmethod
+    def generate(vehicle_id):
+        """
+        Renders and uploads one vehicle's QR. Returns the seconds it took, or None if
+        there was nothing to do (vehicle gone, or its QR already made).
+        """
+        vehicle = Vehicle.objects.filter(pk=vehicle_id).only("pk", "plate_number", "qr_code", "qr_status").first()
+        if vehicle is None or (vehicle.qr_status == Vehicle.QR_READY and vehicle.qr_code):
+            return None
+
+        started = time.monotonic()
+        asset = QRCodeService.render(vehicle.plate_number)
+        vehicle.qr_code.save(f"qr_{asset.digest[:16]}.png", ContentFile(asset.content), save=False)
+        # A plain update: the rest of the vehicle (and its signals) isn't touched
+        Vehicle.objects.filter(pk=vehicle.pk).update(
+            qr_code=vehicle.qr_code.name,
+            qr_status=Vehicle.QR_READY,
+            qr_generated_at=timezone.now(),
+        )
+        return time.monotonic() - started
+
+    @staticmethod
+    def mark_failed(vehicle_id):
+        Vehicle.objects.filter(pk=vehicle_id).exclude(qr_status=Vehicle.QR_READY).update(qr_status=Vehicle.QR_FAILED)
+
+    @staticmethod
+    def enqueue(vehicle_ids):
+        """
+        Queues QR jobs for these vehicles once the current transaction commits. With
+        no broker configured (or one that can't be reached) the vehicles simply stay
+        pending for the generate_qr_codes command. Returns whether jobs were queued.
+        """
+        from apps.core.tasks import generate_qr_code
+
+        vehicle_ids = [vehicle_id for vehicle_id in vehicle_ids if vehicle_id is not None]
+        if not vehicle_ids or not settings.CELERY_BROKER_URL:
+            return False
+
+        def publish():
+            for vehicle_id in vehicle_ids:
+                try:
+                    generate_qr_code.delay(str(vehicle_id))
+                except Exception:
+                    logger.warning("Could not queue QR jobs; %s vehicle(s) left pending", len(vehicle_ids), exc_info=True)
+                    return
+
+        transaction.on_commit(publish)
+        return True
+
+    @staticmethod
+    def leftover_ids(include_failed=False):
+        """
+        Vehicles the workers won't make a QR for, oldest first: pending ones queued more
+        than STUCK_AFTER ago (younger ones may still be in the queue, and rendering them
+        here too would upload the same QR twice), every pending one when there is no
+        broker, and with `include_failed` the failed ones.
+        """
+        leftover = Q(qr_status=Vehicle.QR_PENDING)
+        if settings.CELERY_BROKER_URL:
+            leftover &= Q(created_at__lt=timezone.now() - QRCodeService.STUCK_AFTER)
+        if include_failed:
+            leftover |= Q(qr_status=Vehicle.QR_FAILED)
+        return Vehicle.objects.filter(leftover).order_by("created_at").values_list("pk", flat=True)
+
+    @staticmethod
+    def stats():
+        """
+        Queue health from the vehicles themselves (so it is the same from every
+        process): counts per status, QRs made in the last hour and per minute
+        over it, and the age of the oldest pending vehicle.
+        """
+        now = timezone.now()
+        counts = dict(Vehicle.objects.values_list("qr_status").annotate(n=Count("pk")).values_list("qr_status", "n"))
+        last_hour = Vehicle.objects.filter(qr_generated_at__gte=now - timedelta(hours=1)).count()
+        oldest = Vehicle.objects.filter(qr_status=Vehicle.QR_PENDING).aggregate(oldest=Min("created_at"))["oldest"]
+        return {
+            "pending": counts.get(Vehicle.QR_PENDING, 0),
+            "ready": counts.get(Vehicle.QR_READY, 0),
+            "failed": counts.get(Vehicle.QR_FAILED, 0),
+            "generated_last_hour": last_hour,
+            "per_minute": round(last_hour / 60, 2),
+            "oldest_pending_seconds": int((now - oldest).total_seconds()) if oldest else None,
+            "stuck": bool(oldest and now - oldest > QRCodeService.STUCK_AFTER),
+        }
@@ -0,0 +1,96 @@
+import re
+import uuid
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.core.models import LedgerEntry, Payment, PaymentDailyRollup, Vehicle
+
+
+class QueryPlanService:
+    """
+    EXPLAINs the hot read paths and reports the ones whose table is read with a
+    sequential scan, i.e. the ones that lost (or never had) a supporting index.
+
+    On PostgreSQL sequential scans are disabled for the EXPLAIN, so on a small or
+    freshly seeded database the planner still picks an index whenever one applies;
+    a "Seq Scan" left in the plan means no index can serve the query.
+    SQLite plans are checked for a bare "SCAN <table>".
+    """
+
+    @staticmethod
+    def _sample(model, field):
+        value = model.objects.exclude(**{f"{field}__isnull": True}).values_list(field, flat=True).first()
+        return value if value is not None else uuid.uuid4()
+
+    @staticmethod
+    def hot_queries():
+        """
+        (name, queryset) of every path the indexes are meant to serve, built the same
+        way the views and services build them.
+        """
+        now = timezone.now()
+        vehicle_id = QueryPlanService._sample(Payment, "vehicle_id")
+        agent_id = QueryPlanService._sample(Payment, "collected_by_id")
+        reference = Payment.objects.exclude(refrence__isnull=True).values_list("refrence", flat=True).first() or "REF"
+
+        return [
+            (
+                "dashboard: successful payments in a time range",
+                Payment.objects.filter(payment_status="success", timestamp__gte=now - timedelta(hours=6), timestamp__lt=now),
+            ),
+            (
+                "agent stats: payments collected by an agent since a time",
+                Payment.objects.filter(collected_by_id=agent_id, timestamp__gte=now - timedelta(days=30)),
+            ),
+            (
+                "vehicle serializers: latest payments of a vehicle",
+                Payment.objects.filter(vehicle_id=vehicle_id).order_by("-timestamp")[:3],
+            ),
+            (
+                "receipt verify / PDF / gateway callback: payment by reference",
+                Payment.objects.filter(refrence=reference),
+            ),
+            (
+                "vehicle retrieve / claim / scan: vehicle by plate key",
+                Vehicle.objects.filter(plate_key=QueryPlanService._sample(Vehicle, "plate_key")),
+            ),
+            (
+                "dashboard rollups: days in a range",
+                PaymentDailyRollup.objects.filter(day__gte=(now - timedelta(days=30)).date()),
+            ),
+            (
+                "ledger: balance of a vehicle as of a day",
+                LedgerEntry.objects.filter(
+                    vehicle_id=QueryPlanService._sample(Vehicle, "id"), posted_date__lte=now.date()
+                ).order_by("-posted_date", "-id")[:1],
+            ),
+        ]
+
+    @staticmethod
+    def explain(queryset):
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            return queryset.explain()
+
+    @staticmethod
+    def has_sequential_scan(plan, table):
+        if connection.vendor == "postgresql":
+            return re.search(rf"Seq Scan on {re.escape(table)}\b", plan) is not None
+        # SQLite: "SCAN t" reads the table, "SCAN t USING [COVERING] INDEX i" the index
+        return re.search(rf"\bSCAN {re.escape(table)}\b(?! USING)", plan) is not None
+
+    @staticmethod
+    def check():
+        """
+        [(name, plan, ok)] for every hot query.
+        """
+        results = []
+        for name, queryset in QueryPlanService.hot_queries():
+            plan = QueryPlanService.explain(queryset)
+            ok = not QueryPlanService.has_sequential_scan(plan, queryset.model._meta.db_table)
+            results.append((name, plan, ok))
+        return results
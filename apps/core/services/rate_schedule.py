@@ -0,0 +1,214 @@
+import time
+from bisect import bisect_right
+from datetime import date
+from decimal import Decimal, ROUND_FLOOR
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.core.models import DailyRate
+
+
+class RateSchedule:
+    """
+    A vehicle's daily rate as a piecewise-constant function of the date.
+
+    Segments are (start date, rate) in date order, the first one starting at date.min.
+    cumulative[i] is the cost of every day before segment i starts, so the cost of any
+    date range is two binary searches instead of a day-by-day loop.
+    """
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.starts = [start.toordinal() for start, _ in segments]
+        self.rates = [Decimal(str(rate)) for _, rate in segments]
+
+        self.cumulative = [Decimal("0.00")]
+        for i in range(1, len(self.starts)):
+            length = self.starts[i] - self.starts[i - 1]
+            self.cumulative.append(self.cumulative[-1] + length * self.rates[i - 1])
+
+    @property
+    def is_flat(self):
+        return len(set(self.rates)) == 1
+
+    def rate_on(self, day):
+        return self.rates[bisect_right(self.starts, day.toordinal()) - 1]
+
+    def next_change_after(self, day):
+        """
+        First day after `day` on which the rate changes, or None.
+        """
+        i = bisect_right(self.starts, day.toordinal())
+        return date.fromordinal(self.starts[i]) if i < len(self.starts) else None
+
+    def _cost_before(self, ordinal):
+        # Cost of every day strictly before `ordinal`
+        i = bisect_right(self.starts, ordinal) - 1
+        return self.cumulative[i] + (ordinal - self.starts[i]) * self.rates[i]
+
+    def cost(self, start, end):
+        """
+        Total charge for the days start..end, both included.
+        """
+        if end < start:
+            return Decimal("0.00")
+        return self._cost_before(end.toordinal() + 1) - self._cost_before(start.toordinal())
+
+    def calendar_cost(self, calendar, start, end):
+        """
+        Charge for only the no-charge days (see NoChargeCalendar) between start and end.
+        One O(1) calendar count per rate segment in the range.
+        """
+        if end < start or not calendar.total:
+            return Decimal("0.00")
+        first, stop = start.toordinal(), end.toordinal() + 1
+
+        total = Decimal("0.00")
+        i = bisect_right(self.starts, first) - 1
+        while i < len(self.starts) and self.starts[i] < stop:
+            segment_stop = min(self.starts[i + 1], stop) if i + 1 < len(self.starts) else stop
+            days = calendar.count_before(segment_stop) - calendar.count_before(max(self.starts[i], first))
+            total += days * self.rates[i]
+            i += 1
+        return total
+
+    def days_covered(self, start, amount):
+        """
+        How many consecutive days from `start` on `amount` pays for.
+        None when it never runs out (the rate drops to zero for good).
+        """
+        target = self._cost_before(start.toordinal()) + Decimal(str(amount))
+
+        # Last segment whose cumulative cost is still affordable; zero-rate segments
+        # share their successor's cumulative cost, so only a trailing one can be picked
+        i = bisect_right(self.cumulative, target) - 1
+        if self.rates[i] == 0:
+            return None
+
+        days = ((target - self.cumulative[i]) / self.rates[i]).to_integral_value(rounding=ROUND_FLOOR)
+        return self.starts[i] + int(days) - start.toordinal()
+
+
+class RateScheduleService:
+    """
+    Builds RateSchedules from the DailyRate table.
+
+    The global schedule is tiny and read for every vehicle, so it is cached (and dropped
+    whenever a global row changes); per-vehicle overrides are prefetched by
+    VehicleFinanceService.with_finance or loaded in one query for a batch.
+    """
+
+    CACHE_KEY = "rates:global"
+    CACHE_SECONDS = 60
+    # Every schedule reads the global rates, so this process keeps its copy this long
+    # before going back to the cache (see NoChargeCalendar.LOCAL_SECONDS)
+    LOCAL_SECONDS = 1
+
+    _local = None
+    _checked_at = 0.0
+
+    @staticmethod
+    def global_rates():
+        now = time.monotonic()
+        local = RateScheduleService._local
+        if local is not None and now - RateScheduleService._checked_at < RateScheduleService.LOCAL_SECONDS:
+            return local
+
+        rates = cache.get(RateScheduleService.CACHE_KEY)
+        if rates is None:
+            rates = list(
+                DailyRate.objects.filter(vehicle__isnull=True)
+                .order_by("effective_from")
+                .values_list("effective_from", "rate")
+            )
+            cache.set(RateScheduleService.CACHE_KEY, rates, RateScheduleService.CACHE_SECONDS)
+        RateScheduleService._local = rates
+        RateScheduleService._checked_at = now
+        return rates
+
+    @staticmethod
+    def invalidate_global():
+        cache.delete(RateScheduleService.CACHE_KEY)
+        RateScheduleService._local = None
+
+    @staticmethod
+    def build(base_rate, global_rates, vehicle_rates):
+        """
+        The global schedule applies until the vehicle's first own entry; from then on
+        only the vehicle's entries count, so a later global change never replaces an
+        override. Before any entry the vehicle's base rate applies.
+        """
+        vehicle_rates = sorted(vehicle_rates)
+        own_from = vehicle_rates[0][0] if vehicle_rates else None
+        entries = sorted(
+            (day, rate) for day, rate in global_rates if own_from is None or day < own_from
+        ) + vehicle_rates
+        segments = [(date.min, Decimal(str(base_rate)))]
+        for day, rate in entries:
+            if segments[-1][0] == day:
+                segments[-1] = (day, rate)
+            elif segments[-1][1] != rate:
+                segments.append((day, rate))
+        return RateSchedule(segments)
+
+    @staticmethod
+    def for_vehicle(vehicle):
+        """
+        The vehicle's schedule, cached on the instance.
+        """
+        schedule = getattr(vehicle, "_rate_schedule", None)
+        if schedule is not None:
+            return schedule
+
+        prefetched = getattr(vehicle, "prefetched_rates", None)
+        if prefetched is not None:
+            own = [(row.effective_from, row.rate) for row in prefetched]
+        elif vehicle.pk is None:
+            own = []
+        else:
+            own = list(DailyRate.objects.filter(vehicle_id=vehicle.pk).values_list("effective_from", "rate"))
+
+        schedule = RateScheduleService.build(vehicle.daily_rate, RateScheduleService.global_rates(), own)
+        vehicle._rate_schedule = schedule
+        return schedule
+
+    @staticmethod
+    def schedules_for(vehicles):
+        """
+        Schedules for a batch of loaded vehicles with a single query, keyed by pk.
+        """
+        own = {}
+        rows = DailyRate.objects.filter(vehicle__in=[v.pk for v in vehicles]).values_list(
+            "vehicle_id", "effective_from", "rate"
+        )
+        for vehicle_id, effective_from, rate in rows:
+            own.setdefault(vehicle_id, []).append((effective_from, rate))
+
+        global_rates = RateScheduleService.global_rates()
+        return {
+            vehicle.pk: RateScheduleService.build(vehicle.daily_rate, global_rates, own.get(vehicle.pk, []))
+            for vehicle in vehicles
+        }
+
+    @staticmethod
+    def record_vehicle_change(vehicle_id, old_rate, new_rate, day=None):
+        """
+        Vehicle.daily_rate was edited. Start the new rate on `day` (default today) and
+        pin what the schedule charged before it: every earlier segment (the old base
+        rate, global rates, the vehicle's own rows) becomes a row of the vehicle's own,
+        so earlier days keep their price whatever the global schedule does.
+        """
+        day = day or timezone.now().date()
+        own = list(DailyRate.objects.filter(vehicle_id=vehicle_id).values_list("effective_from", "rate"))
+        charged = RateScheduleService.build(old_rate, RateScheduleService.global_rates(), own)
+        pinned = {effective_from for effective_from, _ in own}
+        DailyRate.objects.bulk_create(
+            [
+                DailyRate(vehicle_id=vehicle_id, effective_from=start, rate=rate)
+                for start, rate in charged.segments
+                if start < day and start not in pinned
+            ],
+            ignore_conflicts=True,
+        )
+        DailyRate.objects.update_or_create(vehicle_id=vehicle_id, effective_from=day, defaults={"rate": new_rate})
@@ -0,0 +1,200 @@
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from apps.core.models import DailyRate, Vehicle, VehicleExemption
+from apps.core.services.vehicle_finance import VehicleFinanceService
+from utils.plates import plate_key
+
+CENTS = Decimal("0.01")
+
+
+class ScanCardService:
+    """
+    The few fields an agent needs after scanning a sticker (plate, owner, tier,
+    balance, daily rate, exempt today, last payment day), kept as one cache entry
+    per plate key. Entries remember the vehicle's station, so agents scoped to a
+    station are only answered for that station's plates.
+
+    A scan is one cache round trip (the entry and the global version together). A
+    miss costs one plate_key probe plus the exemption and rate prefetches the
+    balance needs; get_many builds any number of misses with those same three.
+    Finance writes rebuild the vehicle's entry after commit, so the
+    next scan normally hits. Changes that move every balance (no-charge days, global
+    rates) bump the version instead. Entries built on an earlier day are rebuilt,
+    since the balance moves with the date.
+
+    Entries live for a day, so this relies on the default cache being shared by
+    every process (see CACHES in settings.prod): with a per-process cache, a
+    payment taken through one process would go unseen by the others' cards.
+    """
+
+    KEY = "scan:{}"
+    VERSION_KEY = "scan:version"
+    CACHE_SECONDS = 60 * 60 * 24
+
+    @staticmethod
+    def key(value):
+        return ScanCardService.KEY.format(plate_key(value))
+
+    @staticmethod
+    def version():
+        version = cache.get(ScanCardService.VERSION_KEY)
+        if version is None:
+            cache.add(ScanCardService.VERSION_KEY, int(time.time() * 1000), None)
+            version = cache.get(ScanCardService.VERSION_KEY)
+        return version
+
+    @staticmethod
+    def invalidate_all():
+        try:
+            cache.incr(ScanCardService.VERSION_KEY)
+        except ValueError:
+            ScanCardService.version()
+
+    @staticmethod
+    def get(plate, station_id=None):
+        """
+        (card, is_active) for a plate in any spelling, or None if no vehicle has it
+        (or, with `station_id`, if that station's fleet doesn't).
+        """
+        key = ScanCardService.key(plate)
+        found = cache.get_many([ScanCardService.VERSION_KEY, key])
+        version = found.get(ScanCardService.VERSION_KEY) or ScanCardService.version()
+        entry = found.get(key)
+        if not ScanCardService._is_current(entry, version):
+            vehicle = ScanCardService._vehicles(plate_key=plate_key(plate)).first()
+            if vehicle is None:
+                return None
+            entry = ScanCardService._entry(vehicle, version)
+            cache.set(key, entry, ScanCardService.CACHE_SECONDS)
+
+        if not ScanCardService._in_station(entry, station_id):
+            return None
+        return entry["card"], entry["is_active"]
+
+    @staticmethod
+    def get_many(plates, station_id=None):
+        """
+        {plate key: (card, is_active)} for a list of plates in one cache round trip.
+        The misses are built together, in the same three queries however many there
+        are. Plates no vehicle has (or outside `station_id`) are left out.
+        """
+        keys = {plate_key(plate) for plate in plates} - {""}
+        found = cache.get_many([ScanCardService.VERSION_KEY, *(ScanCardService.KEY.format(key) for key in keys)])
+        version = found.get(ScanCardService.VERSION_KEY) or ScanCardService.version()
+
+        cards, missing = {}, []
+        for key in keys:
+            entry = found.get(ScanCardService.KEY.format(key))
+            if not ScanCardService._is_current(entry, version):
+                missing.append(key)
+            elif ScanCardService._in_station(entry, station_id):
+                cards[key] = (entry["card"], entry["is_active"])
+
+        if missing:
+            built = {}
+            for vehicle in ScanCardService._vehicles(plate_key__in=missing):
+                entry = ScanCardService._entry(vehicle, version)
+                built[ScanCardService.KEY.format(vehicle.plate_key)] = entry
+                if ScanCardService._in_station(entry, station_id):
+                    cards[vehicle.plate_key] = (entry["card"], entry["is_active"])
+            cache.set_many(built, ScanCardService.CACHE_SECONDS)
+        return cards
+
+    @staticmethod
+    def cards_for(vehicle_ids, station_id=None):
+        """
+        {vehicle id: (card, is_active)} built from the database (storing them too),
+        for callers that know vehicles by id rather than by plate.
+        """
+        if not vehicle_ids:
+            return {}
+        version = ScanCardService.version()
+        entries = {
+            vehicle: ScanCardService._entry(vehicle, version)
+            for vehicle in ScanCardService._vehicles(pk__in=vehicle_ids)
+        }
+        cache.set_many(
+            {ScanCardService.KEY.format(vehicle.plate_key): entry for vehicle, entry in entries.items()},
+            ScanCardService.CACHE_SECONDS,
+        )
+        return {
+            vehicle.pk: (entry["card"], entry["is_active"])
+            for vehicle, entry in entries.items()
+            if ScanCardService._in_station(entry, station_id)
+        }
+
+    @staticmethod
+    def refresh(vehicle_id, previous_plate_key=None):
+        """
+        Rebuilds one vehicle's entry once the current transaction commits
+        (or drops it, with the one under its old plate, if the vehicle is gone).
+        """
+        if previous_plate_key:
+            transaction.on_commit(lambda: cache.delete(ScanCardService.KEY.format(previous_plate_key)))
+        ScanCardService.refresh_many([vehicle_id])
+
+    @staticmethod
+    def refresh_many(vehicle_ids):
+        """
+        refresh() for a batch of vehicles, rebuilt together after commit.
+        """
+        vehicle_ids = list(vehicle_ids)
+        transaction.on_commit(lambda: ScanCardService.cards_for(vehicle_ids))
+
+    @staticmethod
+    def _is_current(entry, version):
+        return (
+            bool(entry)
+            and entry["version"] == version
+            and entry["day"] == timezone.now().date().isoformat()
+        )
+
+    @staticmethod
+    def _in_station(entry, station_id):
+        return station_id is None or entry["station_id"] == station_id
+
+    @staticmethod
+    def _vehicles(**lookup):
+        return (
+            Vehicle.objects
+            .filter(**lookup)
+            .select_related("ledger_state")
+            .prefetch_related(
+                Prefetch(
+                    "exemptions",
+                    queryset=VehicleExemption.objects.filter(is_approved=True),
+                    to_attr="approved_exemptions",
+                ),
+                Prefetch("rates", queryset=DailyRate.objects.all(), to_attr="prefetched_rates"),
+            )
+        )
+
+    @staticmethod
+    def _entry(vehicle, version):
+        snapshot = VehicleFinanceService.snapshot(vehicle)
+        state = VehicleFinanceService.get_ledger_state(vehicle)
+        last_paid = state.last_payment_at if state is not None else None
+
+        card = {
+            "plate": vehicle.plate_number,
+            "owner": vehicle.owner_name,
+            "status": snapshot.compliance_status,
+            # Money as 2-place strings, like the DRF DecimalFields of the other endpoints
+            "balance": str(Decimal(snapshot.balance).quantize(CENTS)),
+            "rate": str(Decimal(snapshot.daily_rate).quantize(CENTS)),
+            "exempt": VehicleFinanceService.get_active_exemption(vehicle) is not None,
+            "last_paid": timezone.localtime(last_paid).date().isoformat() if last_paid else None,
+        }
+        return {
+            "version": version,
+            "day": timezone.now().date().isoformat(),
+            "card": card,
+            "is_active": vehicle.is_active,
+            "station_id": vehicle.station_id,
+        }
@@ -0,0 +1,474 @@
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef, Q, Sum
+from django.utils import timezone
+
+from apps.core.models import LedgerEntry, NoChargeDay, Payment, Vehicle, VehicleExemptionSpan, VehicleLedgerState
+from apps.core.services.exemption_index import ExemptionIndex
+from apps.core.services.no_charge_calendar import NoChargeCalendar
+from apps.core.services.rate_schedule import RateScheduleService
+
+logger = logging.getLogger(__name__)
+
+class TaxLedgerService:
+    """
+    Posts to the append-only LedgerEntry table and answers balance questions from it.
+
+    Every entry stores the vehicle's running balance after it, and the head of the chain
+    is kept on VehicleLedgerState.ledger_balance. Entries of a vehicle are ordered by
+    (posted_date, id), so nothing may be posted before the vehicle's latest entry.
+    An explicit posted_date before it is an error; entries posted "today" (payments,
+    reversals, exemption credits, from the model signals) go on the latest entry's
+    day instead, so a future-dated entry never makes a payment write fail.
+    """
+
+    ZERO = Decimal("0.00")
+
+    # --- Balances ---
+
+    @staticmethod
+    def current_balance(vehicle_id):
+        state = VehicleLedgerState.objects.filter(vehicle_id=vehicle_id).values_list(
+            "ledger_balance", "ledger_opened_on"
+        ).first()
+        if state is None or state[1] is None:
+            return None
+        return state[0]
+
+    @staticmethod
+    def balance_as_of(vehicle_id, day):
+        """
+        Balance at the end of `day`: the running balance of the last entry posted on or
+        before it (one probe on the (vehicle, posted_date, id) index).
+        Returns None when the vehicle has no ledger yet.
+        """
+        balance = (
+            LedgerEntry.objects
+            .filter(vehicle_id=vehicle_id, posted_date__lte=day)
+            .order_by("-posted_date", "-id")
+            .values_list("running_balance", flat=True)
+            .first()
+        )
+        if balance is not None:
+            return balance
+        opened = VehicleLedgerState.objects.filter(
+            vehicle_id=vehicle_id, ledger_opened_on__isnull=False
+        ).exists()
+        return TaxLedgerService.ZERO if opened else None
+
+    @staticmethod
+    def statement(vehicle_id, start=None, end=None):
+        entries = LedgerEntry.objects.filter(vehicle_id=vehicle_id)
+        if start:
+            entries = entries.filter(posted_date__gte=start)
+        if end:
+            entries = entries.filter(posted_date__lte=end)
+        return entries.order_by("posted_date", "id")
+
+    # --- Posting ---
+
+    @staticmethod
+    def open(vehicle_id, day=None):
+        """
+        Starts an empty ledger (new vehicles have no history to backfill).
+        """
+        VehicleLedgerState.objects.filter(vehicle_id=vehicle_id, ledger_opened_on__isnull=True).update(
+            ledger_opened_on=day or timezone.now().date()
+        )
+
+    @staticmethod
+    def post(vehicle_id, entry_type, debit=ZERO, credit=ZERO, posted_date=None, payment=None, memo=""):
+        """
+        Appends one entry and moves the running balance.
+        Skipped (returns None) for vehicles whose ledger has not been opened yet.
+        """
+        explicit_date = posted_date is not None
+        posted_date = posted_date or timezone.now().date()
+        debit = Decimal(str(debit))
+        credit = Decimal(str(credit))
+
+        with transaction.atomic():
+            # Row lock on the chain head serializes writers of the same vehicle
+            state = VehicleLedgerState.objects.select_for_update().filter(vehicle_id=vehicle_id).first()
+            if state is None or state.ledger_opened_on is None:
+                return None
+
+            last_posted = (
+                LedgerEntry.objects
+                .filter(vehicle_id=vehicle_id)
+                .order_by("-posted_date", "-id")
+                .values_list("posted_date", flat=True)
+                .first()
+            )
+            if last_posted and posted_date < last_posted:
+                if explicit_date:
+                    raise ValueError(f"Ledger is append-only: cannot post on {posted_date}, last entry is {last_posted}.")
+                logger.warning(
+                    "Vehicle %s ledger has entries up to %s; posting %s there instead of %s",
+                    vehicle_id, last_posted, entry_type, posted_date,
+                )
+                posted_date = last_posted
+
+            balance = state.ledger_balance + credit - debit
+            entry = LedgerEntry.objects.create(
+                vehicle_id=vehicle_id,
+                posted_date=posted_date,
+                entry_type=entry_type,
+                debit=debit,
+                credit=credit,
+                running_balance=balance,
+                payment=payment,
+                memo=memo,
+            )
+            VehicleLedgerState.objects.filter(vehicle_id=vehicle_id).update(ledger_balance=balance)
+        return entry
+
+    @staticmethod
+    def post_payment(payment):
+        return TaxLedgerService.post(
+            payment.vehicle_id, "payment", credit=payment.amount, payment=payment,
+            memo=f"Payment {payment.refrence}",
+        )
+
+    @staticmethod
+    def post_payments(payments, posted_date=None):
+        """
+        post_payment for a batch of payments, in a fixed number of queries. Vehicles
+        whose ledger is not open are skipped, and dates are handled as in post().
+        """
+        explicit_date = posted_date is not None
+        posted_date = posted_date or timezone.now().date()
+        vehicle_ids = {payment.vehicle_id for payment in payments}
+        if not vehicle_ids:
+            return []
+
+        with transaction.atomic():
+            states = {
+                state.vehicle_id: state
+                for state in VehicleLedgerState.objects.select_for_update().filter(
+                    vehicle_id__in=vehicle_ids, ledger_opened_on__isnull=False
+                )
+            }
+            later = dict(
+                LedgerEntry.objects
+                .filter(vehicle_id__in=states, posted_date__gt=posted_date)
+                .values("vehicle_id")
+                .annotate(last=Max("posted_date"))
+                .values_list("vehicle_id", "last")
+            )
+            if later and explicit_date:
+                raise ValueError(f"Ledger is append-only: vehicle {next(iter(later))} has entries after {posted_date}.")
+            for vehicle_id, last in later.items():
+                logger.warning("Vehicle %s ledger has entries up to %s; posting payments there", vehicle_id, last)
+
+            entries = []
+            for payment in payments:
+                state = states.get(payment.vehicle_id)
+                if state is None:
+                    continue
+                state.ledger_balance += payment.amount
+                entries.append(LedgerEntry(
+                    vehicle_id=payment.vehicle_id,
+                    posted_date=later.get(payment.vehicle_id, posted_date),
+                    entry_type="payment",
+                    credit=payment.amount,
+                    running_balance=state.ledger_balance,
+                    payment=payment,
+                    memo=f"Payment {payment.refrence}",
+                ))
+            LedgerEntry.objects.bulk_create(entries)
+            VehicleLedgerState.objects.bulk_update(states.values(), ["ledger_balance"])
+        return entries
+
+    @staticmethod
+    def post_payment_reversal(vehicle_id, amount, payment=None, memo=""):
+        """
+        A successful payment was edited, failed afterwards or deleted: debit it back.
+        """
+        return TaxLedgerService.post(vehicle_id, "adjustment", debit=amount, payment=payment, memo=memo)
+
+    @staticmethod
+    def sync_exemption_credits(vehicle_id):
+        """
+        Brings the exemption credits in line with the approved spans: charges already
+        posted on exempt days are credited back, and credits for days that are no longer
+        exempt are debited again. Posts at most one entry.
+        """
+        spans = list(VehicleExemptionSpan.objects.filter(vehicle_id=vehicle_id).values_list("start_date", "end_date"))
+        entries = LedgerEntry.objects.filter(vehicle_id=vehicle_id)
+
+        owed_credit = TaxLedgerService.ZERO
+        if spans:
+            covered = reduce(or_, (Q(posted_date__range=span) for span in spans))
+            owed_credit = entries.filter(covered, entry_type="charge").aggregate(total=Sum("debit"))["total"] or owed_credit
+
+        given = entries.filter(entry_type="exemption").aggregate(credit=Sum("credit"), debit=Sum("debit"))
+        given_credit = (given["credit"] or TaxLedgerService.ZERO) - (given["debit"] or TaxLedgerService.ZERO)
+
+        difference = owed_credit - given_credit
+        entry = None
+        if difference > 0:
+            entry = TaxLedgerService.post(vehicle_id, "exemption", credit=difference, memo="Exemption credit")
+        elif difference < 0:
+            entry = TaxLedgerService.post(vehicle_id, "exemption", debit=-difference, memo="Exemption withdrawn")
+
+        # No-charge credits leave exempt days to this one, so they move with the spans
+        TaxLedgerService.sync_no_charge_credits(vehicle_ids=[vehicle_id])
+        return entry
+
+    @staticmethod
+    def sync_no_charge_credits(vehicle_ids=None, days=None, batch_size=1000):
+        """
+        The same for fleet-wide no-charge days declared (or dropped) after their charge
+        was posted: charges on no-charge days are credited back, credits for days no
+        longer in the calendar are debited again. Exempt days are left to the exemption
+        credits. Covers `vehicle_ids`, or every vehicle charged on one of `days`.
+        Posts at most one entry per vehicle; returns the number posted.
+        """
+        charges = LedgerEntry.objects.filter(entry_type="charge")
+        if vehicle_ids is not None:
+            vehicles = Q(vehicle_id__in=vehicle_ids)
+        else:
+            vehicles = Q(vehicle_id__in=charges.filter(posted_date__in=days).values("vehicle_id"))
+
+        exempt = VehicleExemptionSpan.objects.filter(
+            vehicle_id=OuterRef("vehicle_id"), start_date__lte=OuterRef("posted_date"), end_date__gte=OuterRef("posted_date")
+        )
+        owed = dict(
+            charges.filter(vehicles, posted_date__in=NoChargeDay.objects.values("date"))
+            .exclude(Exists(exempt))
+            .values("vehicle_id")
+            .annotate(total=Sum("debit"))
+            .values_list("vehicle_id", "total")
+        )
+        given = dict(
+            LedgerEntry.objects.filter(vehicles, entry_type="no_charge")
+            .values("vehicle_id")
+            .annotate(total=Sum("credit") - Sum("debit"))
+            .values_list("vehicle_id", "total")
+        )
+        differences = {
+            vehicle_id: owed.get(vehicle_id, TaxLedgerService.ZERO) - given.get(vehicle_id, TaxLedgerService.ZERO)
+            for vehicle_id in owed.keys() | given.keys()
+        }
+        differences = sorted((vehicle_id, amount) for vehicle_id, amount in differences.items() if amount)
+
+        posted = 0
+        for i in range(0, len(differences), batch_size):
+            posted += TaxLedgerService._post_no_charge_credits(dict(differences[i:i + batch_size]))
+        return posted
+
+    @staticmethod
+    def _post_no_charge_credits(differences):
+        today = timezone.now().date()
+        with transaction.atomic():
+            states = {
+                state.vehicle_id: state
+                for state in VehicleLedgerState.objects.select_for_update().filter(
+                    vehicle_id__in=differences, ledger_opened_on__isnull=False
+                )
+            }
+            later = dict(
+                LedgerEntry.objects
+                .filter(vehicle_id__in=states, posted_date__gt=today)
+                .values("vehicle_id")
+                .annotate(last=Max("posted_date"))
+                .values_list("vehicle_id", "last")
+            )
+
+            entries = []
+            for vehicle_id, state in states.items():
+                difference = differences[vehicle_id]
+                state.ledger_balance += difference
+                entries.append(LedgerEntry(
+                    vehicle_id=vehicle_id,
+                    posted_date=later.get(vehicle_id, today),
+                    entry_type="no_charge",
+                    credit=max(difference, TaxLedgerService.ZERO),
+                    debit=max(-difference, TaxLedgerService.ZERO),
+                    running_balance=state.ledger_balance,
+                    memo="No-charge day credit" if difference > 0 else "No-charge day withdrawn",
+                ))
+            LedgerEntry.objects.bulk_create(entries)
+            VehicleLedgerState.objects.bulk_update(states.values(), ["ledger_balance"])
+        return len(entries)
+
+    # --- Daily accrual ---
+
+    @staticmethod
+    def accrue_charges(day=None, batch_size=1000):
+        """
+        Posts the daily charges up to `day` (default today) to every vehicle being
+        billed, catching up from the day after its charged_through (or from when its
+        ledger opened), so a missed run is charged by the next one. Exempt days and
+        fleet-wide no-charge days get no charge. Safe to re-run: vehicles already
+        charged through `day` are skipped. Returns the number of charges posted.
+        """
+        day = day or timezone.now().date()
+        vehicles = (
+            Vehicle.objects
+            .filter(
+                is_active=True,
+                activated_at__isnull=False,
+                ledger_state__ledger_opened_on__lte=day,
+            )
+            .filter(Q(ledger_state__charged_through__isnull=True) | Q(ledger_state__charged_through__lt=day))
+            .only("pk", "activated_at", "daily_rate")
+            .order_by("pk")
+        )
+
+        posted = 0
+        batch = []
+        for vehicle in vehicles.iterator(chunk_size=batch_size):
+            batch.append(vehicle)
+            if len(batch) >= batch_size:
+                posted += TaxLedgerService._post_charges(batch, day)
+                batch = []
+        if batch:
+            posted += TaxLedgerService._post_charges(batch, day)
+        return posted
+
+    @staticmethod
+    def _post_charges(vehicles, day):
+        from apps.core.services.vehicle_finance import VehicleFinanceService
+
+        ids = [vehicle.pk for vehicle in vehicles]
+        schedules = RateScheduleService.schedules_for(vehicles)
+        calendar = NoChargeCalendar.current()
+        spans = {}
+        for vehicle_id, start, end in VehicleExemptionSpan.objects.filter(vehicle_id__in=ids).values_list(
+            "vehicle_id", "start_date", "end_date"
+        ):
+            spans.setdefault(vehicle_id, []).append((start, end))
+
+        with transaction.atomic():
+            states = {
+                state.vehicle_id: state
+                for state in VehicleLedgerState.objects.select_for_update().filter(vehicle_id__in=ids)
+            }
+            last_posted = dict(
+                LedgerEntry.objects.filter(vehicle_id__in=ids)
+                .values("vehicle_id")
+                .annotate(last=Max("posted_date"))
+                .values_list("vehicle_id", "last")
+            )
+
+            entries = []
+            for vehicle in vehicles:
+                state = states.get(vehicle.pk)
+                if state is None or state.ledger_opened_on is None or (state.charged_through or date.min) >= day:
+                    continue
+                first = state.charged_through + timedelta(days=1) if state.charged_through else state.ledger_opened_on
+                first = max(first, VehicleFinanceService.billing_start_date(vehicle))
+                last = last_posted.get(vehicle.pk)
+                schedule = schedules[vehicle.pk]
+
+                charged = first
+                while charged <= day:
+                    rate = schedule.rate_on(charged)
+                    exempt = any(start <= charged <= end for start, end in spans.get(vehicle.pk, ()))
+                    if rate > 0 and not exempt and not calendar.is_no_charge(charged):
+                        state.ledger_balance -= rate
+                        if last is None or charged >= last:
+                            entries.append(LedgerEntry(
+                                vehicle_id=vehicle.pk,
+                                posted_date=charged,
+                                entry_type="charge",
+                                debit=rate,
+                                running_balance=state.ledger_balance,
+                            ))
+                            last = charged
+                        else:
+                            # Later entries already exist (e.g. a payment taken after midnight
+                            # before this catch-up ran): the charge goes on the latest day
+                            logger.warning(
+                                "Vehicle %s ledger has entries up to %s; charging %s there", vehicle.pk, last, charged
+                            )
+                            entries.append(LedgerEntry(
+                                vehicle_id=vehicle.pk,
+                                posted_date=last,
+                                entry_type="adjustment",
+                                debit=rate,
+                                running_balance=state.ledger_balance,
+                                memo=f"Daily charge for {charged}",
+                            ))
+                    charged += timedelta(days=1)
+                state.charged_through = day
+
+            LedgerEntry.objects.bulk_create(entries)
+            VehicleLedgerState.objects.bulk_update(states.values(), ["ledger_balance", "charged_through"])
+        return len(entries)
+
+    # --- Backfill ---
+
+    @staticmethod
+    def backfill(vehicle, today=None):
+        """
+        Builds the ledger of a vehicle that predates it: one charge per billed, non-exempt
+        day up to today and one entry per successful payment, in date order.
+        Vehicles whose ledger is already open are left alone. Returns the entries written.
+        """
+        from apps.core.services.vehicle_finance import VehicleFinanceService
+
+        today = today or timezone.now().date()
+        state, _ = VehicleLedgerState.objects.get_or_create(vehicle=vehicle)
+        if state.ledger_opened_on is not None:
+            return 0
+
+        # (date, order, debit, credit, entry type, payment); charges go before payments on the same day
+        events = []
+        start = VehicleFinanceService.billing_start_date(vehicle)
+        schedule = RateScheduleService.for_vehicle(vehicle)
+        calendar = NoChargeCalendar.current()
+        if start is not None and vehicle.is_active:
+            spans = list(
+                VehicleExemptionSpan.objects.filter(vehicle=vehicle).values_list("start_date", "end_date", "cumulative_days")
+            )
+            day = start
+            while day <= today:
+                span = ExemptionIndex.active_span_in(spans, day)
+                if span is not None:
+                    day = span[1] + timedelta(days=1)
+                    continue
+                rate = schedule.rate_on(day)
+                if rate > 0 and not calendar.is_no_charge(day):
+                    events.append((day, 0, rate, TaxLedgerService.ZERO, "charge", None))
+                day += timedelta(days=1)
+
+        for payment in Payment.objects.filter(vehicle=vehicle, payment_status="success").order_by("timestamp"):
+            paid_on = min(timezone.localtime(payment.timestamp).date(), today)
+            events.append((paid_on, 1, TaxLedgerService.ZERO, payment.amount, "payment", payment))
+
+        events.sort(key=lambda event: (event[0], event[1]))
+
+        with transaction.atomic():
+            state = VehicleLedgerState.objects.select_for_update().get(vehicle=vehicle)
+            if state.ledger_opened_on is not None:
+                return 0
+
+            balance = TaxLedgerService.ZERO
+            entries = []
+            for posted_date, _, debit, credit, entry_type, payment in events:
+                balance += credit - debit
+                entries.append(LedgerEntry(
+                    vehicle=vehicle,
+                    posted_date=posted_date,
+                    entry_type=entry_type,
+                    debit=debit,
+                    credit=credit,
+                    running_balance=balance,
+                    payment=payment,
+                    memo=f"Payment {payment.refrence}" if payment else "",
+                ))
+            LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+            state.ledger_balance = balance
+            state.ledger_opened_on = today
+            state.charged_through = today
+            state.save(update_fields=["ledger_balance", "ledger_opened_on", "charged_through"])
+        return len(entries)
@@ -0,0 +1,167 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from apps.core.models import Vehicle, Payment, VehicleLedgerState
+from apps.core.services.exemption_index import ExemptionIndex
+from apps.core.services.rate_schedule import RateScheduleService
+
+
+class VehicleLedgerService:
+    """
+    Keeps the denormalized VehicleLedgerState counters in step with payments and exemptions.
+    Payment counters are moved with F() expressions so concurrent writers never lose an update;
+    exemption counters are set from the merged spans (see ExemptionIndex).
+    """
+
+    @staticmethod
+    def ensure_state(vehicle_id):
+        state, _ = VehicleLedgerState.objects.get_or_create(vehicle_id=vehicle_id)
+        return state
+
+    @staticmethod
+    def apply_payment(vehicle_id, amount, paid_at):
+        """
+        A successful payment was added (positive amount) or taken back (negative amount).
+        """
+        amount = Decimal(str(amount))
+        VehicleLedgerService.ensure_state(vehicle_id)
+
+        with transaction.atomic():
+            if amount >= 0:
+                VehicleLedgerState.objects.filter(vehicle_id=vehicle_id).update(
+                    total_paid=F("total_paid") + amount,
+                    last_payment_at=Greatest(Coalesce(F("last_payment_at"), Value(paid_at)), Value(paid_at)),
+                    balance_as_of=timezone.now(),
+                )
+            else:
+                # Removing a payment can move the "last payment" backwards, so look it up again
+                last_payment_at = (
+                    Payment.objects
+                    .filter(vehicle_id=vehicle_id, payment_status="success")
+                    .aggregate(last=Max("timestamp"))["last"]
+                )
+                VehicleLedgerState.objects.filter(vehicle_id=vehicle_id).update(
+                    total_paid=F("total_paid") + amount,
+                    last_payment_at=last_payment_at,
+                    balance_as_of=timezone.now(),
+                )
+            VehicleLedgerService.refresh_paid_through(vehicle_id)
+
+    @staticmethod
+    def apply_payments(totals):
+        """
+        apply_payment for a batch of new successful payments, in a fixed number of
+        queries: `totals` is {vehicle_id: (amount, latest paid_at)}.
+        """
+        if not totals:
+            return
+        with transaction.atomic():
+            VehicleLedgerState.objects.bulk_create(
+                [VehicleLedgerState(vehicle_id=vehicle_id) for vehicle_id in totals], ignore_conflicts=True
+            )
+            states = list(
+                VehicleLedgerState.objects
+                .select_for_update(of=("self",))
+                .select_related("vehicle")
+                .filter(vehicle_id__in=totals)
+            )
+            schedules = RateScheduleService.schedules_for([state.vehicle for state in states])
+
+            now = timezone.now()
+            for state in states:
+                amount, paid_at = totals[state.vehicle_id]
+                state.total_paid += Decimal(str(amount))
+                state.last_payment_at = max(state.last_payment_at or paid_at, paid_at)
+                state.balance_as_of = now
+                state.vehicle._rate_schedule = schedules[state.vehicle_id]
+                state.paid_through = VehicleLedgerService.calculate_paid_through(
+                    state.vehicle, state.total_paid, state.approved_exempt_days
+                )
+            VehicleLedgerState.objects.bulk_update(
+                states, ["total_paid", "last_payment_at", "balance_as_of", "paid_through"]
+            )
+
+    @staticmethod
+    def refresh_exemptions(vehicle_id):
+        """
+        An exemption of this vehicle was approved, edited or stopped counting.
+        Overlapping exemptions must only count once, so the merged spans are rebuilt
+        and the counters set from them (instead of adding raw durations).
+        """
+        VehicleLedgerService.ensure_state(vehicle_id)
+
+        with transaction.atomic():
+            exempt_days, exempt_until = ExemptionIndex.rebuild_vehicle(vehicle_id)
+            VehicleLedgerState.objects.filter(vehicle_id=vehicle_id).update(
+                approved_exempt_days=exempt_days,
+                exempt_until=exempt_until,
+                balance_as_of=timezone.now(),
+            )
+            VehicleLedgerService.refresh_paid_through(vehicle_id)
+
+    @staticmethod
+    def calculate_paid_through(vehicle, total_paid, exempt_days):
+        """
+        Last day covered by payments, i.e. the balance is >= 0 up to and including this date.
+        Payments are spent day by day at the rate in force on each day.
+        Returns None for vehicles that are not being charged.
+        """
+        from apps.core.services.vehicle_finance import VehicleFinanceService
+
+        start = VehicleFinanceService.billing_start_date(vehicle)
+        if start is None or not vehicle.is_active:
+            return None
+
+        paid_days = RateScheduleService.for_vehicle(vehicle).days_covered(start, total_paid)
+        if paid_days is None:
+            return None
+        return start + timedelta(days=exempt_days + paid_days - 1)
+
+    @staticmethod
+    def refresh_paid_through(vehicle_id):
+        """
+        Recomputes the debt ordering key after the counters or the vehicle itself changed.
+        """
+        state = VehicleLedgerState.objects.select_related("vehicle").filter(vehicle_id=vehicle_id).first()
+        if state is None:
+            return
+        paid_through = VehicleLedgerService.calculate_paid_through(
+            state.vehicle, state.total_paid, state.approved_exempt_days
+        )
+        if paid_through != state.paid_through:
+            VehicleLedgerState.objects.filter(vehicle_id=vehicle_id).update(paid_through=paid_through)
+
+    @staticmethod
+    def rebuild(vehicle_ids=None):
+        """
+        Recomputes every counter from the source tables.
+        Used to backfill vehicles that predate the counters and to repair drift.
+        """
+        vehicles = Vehicle.objects.all()
+        if vehicle_ids is not None:
+            vehicles = vehicles.filter(pk__in=vehicle_ids)
+
+        for vehicle in vehicles.iterator():
+            paid = (
+                Payment.objects
+                .filter(vehicle=vehicle, payment_status="success")
+                .aggregate(total=Sum("amount"), last=Max("timestamp"))
+            )
+            exempt_days, exempt_until = ExemptionIndex.rebuild_vehicle(vehicle.pk)
+
+            total_paid = paid["total"] or Decimal("0.00")
+            VehicleLedgerState.objects.update_or_create(
+                vehicle=vehicle,
+                defaults={
+                    "total_paid": total_paid,
+                    "last_payment_at": paid["last"],
+                    "approved_exempt_days": exempt_days,
+                    "exempt_until": exempt_until,
+                    "paid_through": VehicleLedgerService.calculate_paid_through(vehicle, total_paid, exempt_days),
+                    "balance_as_of": timezone.now(),
+                },
+            )
@@ -0,0 +1,291 @@
+import logging
+import re
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+
+from apps.core.models import Vehicle
+from utils.plates import plate_key
+
+logger = logging.getLogger(__name__)
+
+
+# "ad-123 4" and "AD1234" are the same plate for searching
+normalize_plate = plate_key
+
+
+def normalize_phone(value):
+    return re.sub(r"[^0-9]", "", value or "")
+
+
+def trigrams(text):
+    """
+    pg_trgm style trigrams: the text padded with two spaces in front and one behind.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)} if text else set()
+
+
+def similarity(a, b):
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+def word_similarity(term, text):
+    """
+    Share of the term's trigrams found in the closest word of `text` (close to
+    pg_trgm's word_similarity, which measures against the term rather than both).
+    """
+    grams = trigrams(term)
+    if not grams:
+        return 0.0
+    return max((len(grams & trigrams(word)) / len(grams) for word in text.split()), default=0.0)
+
+
+class VehicleSearchService:
+    """
+    Ranked vehicle search on plate, phone and owner name for the list endpoints.
+
+    Plates are compared without separators ("AD123" finds "AD-1234") and misspelt
+    ones still match by trigram similarity; phones match on their digits, a trailing
+    fragment being enough; owner names case-insensitively, by part or by word
+    similarity. Returns [(vehicle id, score)] best first, score in (0, 1].
+
+    PostgreSQL runs one query on the pg_trgm GIN indexes (migrations 0013 and 0014)
+    under a statement timeout. Other databases use VehicleNgramIndex, an in-process
+    trigram index, with the same time budget. A search past the budget returns what
+    was ranked so far (possibly nothing) rather than making the caller wait.
+    """
+
+    SCOPES = ("plate", "phone", "owner")
+    LIMIT = 50
+    BUDGET_MS = 300
+    MIN_SIMILARITY = 0.3
+    MIN_WORD_SIMILARITY = 0.6
+    MIN_PHONE_DIGITS = 3
+
+    # Bumped by whichever process changes a vehicle; read from the shared cache by all
+    VERSION_KEY = "vehicles:search-version"
+
+    # Indexed expressions (must match the ones in migrations 0013 and 0014)
+    PLATE_SQL = "plate_key"
+    PHONE_SQL = "regexp_replace(phone_number, '[^0-9]', '', 'g')"
+    OWNER_SQL = "upper(owner_name)"
+
+    @staticmethod
+    def search(query, scopes=SCOPES, limit=LIMIT, station_id=None):
+        """
+        `station_id` limits the search to one station's vehicles (agents' searches).
+        """
+        query = (query or "").strip()
+        if not query:
+            return []
+        if connection.vendor == "postgresql":
+            return VehicleSearchService._search_postgres(query, scopes, limit, station_id)
+        deadline = time.monotonic() + VehicleSearchService.BUDGET_MS / 1000
+        return VehicleNgramIndex.current().search(query, scopes, limit, deadline, station_id)
+
+    @staticmethod
+    def terms(query, scopes):
+        """
+        The query as each scope compares it; scopes it can't apply to are left out.
+        """
+        terms = {}
+        plate = normalize_plate(query)
+        if "plate" in scopes and plate:
+            terms["plate"] = plate
+        phone = normalize_phone(query)
+        # Letters mean a plate or a name, not a phone number
+        is_number = not re.search(r"[A-Za-z]", query)
+        if "phone" in scopes and is_number and len(phone) >= VehicleSearchService.MIN_PHONE_DIGITS:
+            terms["phone"] = phone
+        if "owner" in scopes:
+            terms["owner"] = query.upper()
+        return terms
+
+    @staticmethod
+    def score(terms, plate, phone, owner):
+        """
+        Same ranking as the PostgreSQL query, on normalized values.
+        """
+        best = 0.0
+        term = terms.get("plate")
+        if term:
+            if plate == term:
+                best = 1.0
+            elif plate.startswith(term):
+                best = 0.9
+            elif term in plate:
+                best = 0.8
+            else:
+                sim = similarity(plate, term)
+                if sim >= VehicleSearchService.MIN_SIMILARITY:
+                    best = sim * 0.75
+        term = terms.get("phone")
+        if term and term in phone:
+            best = max(best, 0.85 if phone.endswith(term) else 0.6)
+        term = terms.get("owner")
+        if term:
+            if owner.startswith(term):
+                best = max(best, 0.7)
+            elif term in owner:
+                best = max(best, 0.6)
+            else:
+                sim = word_similarity(term, owner)
+                if sim >= VehicleSearchService.MIN_WORD_SIMILARITY:
+                    best = max(best, sim * 0.5)
+        return best
+
+    @staticmethod
+    def _escape_like(value):
+        return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    @staticmethod
+    def _search_postgres(query, scopes, limit, station_id=None):
+        terms = VehicleSearchService.terms(query, scopes)
+        like = VehicleSearchService._escape_like
+        scores, matches, score_params, match_params = [], [], [], []
+
+        if "plate" in terms:
+            plate, term = VehicleSearchService.PLATE_SQL, terms["plate"]
+            scores.append(
+                f"CASE WHEN {plate} = %s THEN 1.0 WHEN {plate} LIKE %s THEN 0.9 WHEN {plate} LIKE %s THEN 0.8 "
+                f"WHEN similarity({plate}, %s) >= %s THEN similarity({plate}, %s) * 0.75 ELSE 0 END"
+            )
+            score_params += [term, f"{term}%", f"%{term}%", term, VehicleSearchService.MIN_SIMILARITY, term]
+            matches.append(f"{plate} LIKE %s OR {plate} %% %s")
+            match_params += [f"%{term}%", term]
+
+        if "phone" in terms:
+            phone, term = VehicleSearchService.PHONE_SQL, terms["phone"]
+            scores.append(f"CASE WHEN {phone} LIKE %s THEN 0.85 WHEN {phone} LIKE %s THEN 0.6 ELSE 0 END")
+            score_params += [f"%{term}", f"%{term}%"]
+            matches.append(f"{phone} LIKE %s")
+            match_params.append(f"%{term}%")
+
+        if "owner" in terms:
+            owner, term = VehicleSearchService.OWNER_SQL, terms["owner"]
+            scores.append(
+                f"CASE WHEN {owner} LIKE %s THEN 0.7 WHEN {owner} LIKE %s THEN 0.6 "
+                f"WHEN word_similarity(%s, {owner}) >= %s THEN word_similarity(%s, {owner}) * 0.5 ELSE 0 END"
+            )
+            score_params += [f"{like(term)}%", f"%{like(term)}%", term, VehicleSearchService.MIN_WORD_SIMILARITY, term]
+            matches.append(f"{owner} LIKE %s OR %s <%% {owner}")
+            match_params += [f"%{like(term)}%", term]
+
+        if not scores:
+            return []
+
+        where = " OR ".join(f"({match})" for match in matches)
+        if station_id is not None:
+            # Served by the station index: a station's few vehicles are checked directly
+            where = f"station_id = %s AND ({where})"
+            match_params.insert(0, station_id)
+
+        sql = f"""
+            SELECT id, GREATEST({", ".join(scores)}) AS score
+            FROM {Vehicle._meta.db_table}
+            WHERE {where}
+            ORDER BY score DESC, id
+            LIMIT %s
+        """
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"SET LOCAL statement_timeout = {int(VehicleSearchService.BUDGET_MS)}")
+                cursor.execute(sql, score_params + match_params + [limit])
+                rows = cursor.fetchall()
+                cursor.execute("SET LOCAL statement_timeout TO DEFAULT")
+        except DatabaseError:
+            logger.warning("Vehicle search for %r ran past %sms", query, VehicleSearchService.BUDGET_MS)
+            return []
+        return [(pk, float(score)) for pk, score in rows if score > 0]
+
+    # --- Invalidation (in-process index) ---
+
+    @staticmethod
+    def version():
+        version = cache.get(VehicleSearchService.VERSION_KEY)
+        if version is None:
+            cache.add(VehicleSearchService.VERSION_KEY, int(time.time() * 1000), None)
+            version = cache.get(VehicleSearchService.VERSION_KEY)
+        return version
+
+    @staticmethod
+    def invalidate():
+        try:
+            cache.incr(VehicleSearchService.VERSION_KEY)
+        except ValueError:
+            VehicleSearchService.version()
+
+
+class VehicleNgramIndex:
+    """
+    In-process trigram index of every vehicle's normalized plate, phone and owner name,
+    for databases without pg_trgm. Rebuilt when VehicleSearchService.version moves
+    (vehicle saves and deletes bump it).
+    """
+
+    # (version, index) last built by this process
+    _built = None
+
+    def __init__(self, rows):
+        self.rows = {}
+        self.stations = {}
+        self.postings = {scope: {} for scope in VehicleSearchService.SCOPES}
+        for pk, plate, phone, owner, station_id in rows:
+            entry = (normalize_plate(plate), normalize_phone(phone), (owner or "").upper())
+            self.rows[pk] = entry
+            self.stations[pk] = station_id
+            for scope, text in zip(VehicleSearchService.SCOPES, entry):
+                for gram in self.grams(text):
+                    self.postings[scope].setdefault(gram, set()).add(pk)
+
+    @staticmethod
+    def grams(text):
+        # Unpadded, so a fragment from the middle or end of a value still shares them
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    @classmethod
+    def current(cls):
+        version = VehicleSearchService.version()
+        built = cls._built
+        if built is None or built[0] != version:
+            rows = Vehicle.objects.values_list("id", "plate_number", "phone_number", "owner_name", "station_id")
+            built = (version, cls(rows.iterator()))
+            cls._built = built
+        return built[1]
+
+    def search(self, query, scopes, limit, deadline, station_id=None):
+        terms = VehicleSearchService.terms(query, scopes)
+
+        # Candidates sharing the most trigrams with the query are scored first, so a
+        # search cut short by the deadline has still looked at the likeliest rows
+        shared = Counter()
+        short = False
+        for scope, term in terms.items():
+            grams = self.grams(term)
+            if not grams:
+                short = True
+                continue
+            for gram in grams:
+                shared.update(self.postings[scope].get(gram, ()))
+        candidates = [pk for pk, _ in shared.most_common()]
+        if short:
+            candidates += [pk for pk in self.rows if pk not in shared]
+        if station_id is not None:
+            candidates = [pk for pk in candidates if self.stations[pk] == station_id]
+
+        ranked = []
+        for i, pk in enumerate(candidates):
+            if i % 256 == 0 and time.monotonic() > deadline:
+                break
+            score = VehicleSearchService.score(terms, *self.rows[pk])
+            if score > 0:
+                ranked.append((pk, score))
+
+        ranked.sort(key=lambda row: (-row[1], str(row[0])))
+        return ranked[:limit]
@@ -0,0 +1,287 @@
+# core/signals.py
+import logging
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .events import compliance_status_changed
+from .models import Vehicle, Payment, VehicleExemption, DailyRate, NoChargeDay
+from .services.vehicle_ledger import VehicleLedgerService
+from .services.vehicle_finance import VehicleFinanceService
+from .services.compliance import ComplianceService
+from .services.tax_ledger import TaxLedgerService
+from .services.rate_schedule import RateScheduleService
+from .services.no_charge_calendar import NoChargeCalendar
+from .services.payment_rollup import PaymentRollupService
+from .services.vehicle_search import VehicleSearchService
+from .services.scan_card import ScanCardService
+from .services.change_feed import VehicleChangeFeed
+from .services.qr_codes import QRCodeService
+
+logger = logging.getLogger(__name__)
+
+
+def _invalidate_cached_vehicle(instance):
+    # The view usually still holds the vehicle instance it created the row from;
+    # drop its finance snapshot so the response shows the new balance.
+    if type(instance).vehicle.is_cached(instance):
+        VehicleFinanceService.invalidate(instance.vehicle)
+
+
+def _deleted_with_vehicle(origin):
+    # Cascade of a vehicle delete: its counters, rollups and ledger go with it, so
+    # writing them here would only recreate rows pointing at the deleted vehicle
+    return isinstance(origin, Vehicle) or (isinstance(origin, QuerySet) and origin.model is Vehicle)
+
+
+# --- Vehicles ---
+@receiver(pre_save, sender=Vehicle)
+def remember_previous_rate(sender, instance, raw=False, **kwargs):
+    instance._previous_daily_rate = None
+    instance._previous_plate_key = None
+    instance._previous_station_id = None
+    if raw or instance._state.adding:
+        return
+    previous = Vehicle.objects.filter(pk=instance.pk).values("daily_rate", "plate_key", "station_id").first()
+    if previous:
+        instance._previous_daily_rate = previous["daily_rate"]
+        instance._previous_plate_key = previous["plate_key"]
+        instance._previous_station_id = previous["station_id"]
+
+
+@receiver(post_save, sender=Vehicle)
+def sync_vehicle_ledger_state(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        VehicleLedgerService.ensure_state(instance.pk)
+        TaxLedgerService.open(instance.pk)
+
+    # An edited daily_rate applies from today on; earlier days keep the old price
+    previous_rate = getattr(instance, "_previous_daily_rate", None)
+    if previous_rate is not None and previous_rate != instance.daily_rate:
+        RateScheduleService.record_vehicle_change(instance.pk, previous_rate, instance.daily_rate)
+    # Activation time or daily rate may have changed
+    VehicleLedgerService.refresh_paid_through(instance.pk)
+    VehicleFinanceService.invalidate(instance)
+    ComplianceService.refresh_vehicle(instance.pk)
+
+    previous_plate_key = getattr(instance, "_previous_plate_key", None)
+    ScanCardService.refresh(instance.pk, previous_plate_key if previous_plate_key != instance.plate_key else None)
+
+
+@receiver(post_save, sender=Vehicle)
+def queue_qr_code(sender, instance, created, raw=False, **kwargs):
+    # Rendered and uploaded by a worker; the vehicle is saved with qr_status "pending"
+    if created and not raw and not instance.qr_code:
+        QRCodeService.enqueue([instance.pk])
+
+
+@receiver(post_delete, sender=Vehicle)
+def drop_scan_card(sender, instance, **kwargs):
+    ScanCardService.refresh(instance.pk, instance.plate_key)
+    # Its payment rollups were deleted with it
+    transaction.on_commit(PaymentRollupService.bump_version)
+
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+def refresh_vehicle_search(sender, instance, raw=False, **kwargs):
+    # Plate, phone or owner may have changed: in-process search indexes rebuild on next use
+    VehicleSearchService.invalidate()
+
+
+# --- Payments ---
+@receiver(pre_save, sender=Payment)
+def remember_previous_payment(sender, instance, raw=False, **kwargs):
+    # UUID primary keys are set before the first save, so rely on _state.adding
+    instance._ledger_previous = None
+    if raw or instance._state.adding:
+        return
+    previous = Payment.objects.filter(pk=instance.pk)
+    # Inside a transaction the row stays locked until the write commits, so two
+    # concurrent saves (e.g. double verify) can't both see it as still pending
+    if transaction.get_connection().in_atomic_block:
+        previous = previous.select_for_update()
+    instance._ledger_previous = (
+        previous
+        .values("vehicle_id", "amount", "payment_status", "timestamp", "payment_method", "collected_by_id")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Payment)
+def sync_payment_ledger(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_ledger_previous", None)
+
+    # Take the old contribution out, put the new one in.
+    # Covers status moving to/from 'success', amount edits and vehicle reassignment.
+    with transaction.atomic():
+        if previous and previous["payment_status"] == "success":
+            VehicleLedgerService.apply_payment(previous["vehicle_id"], -previous["amount"], previous["timestamp"])
+            PaymentRollupService.remove(
+                previous["vehicle_id"], previous["amount"], previous["timestamp"],
+                previous["payment_method"], previous["collected_by_id"],
+            )
+            TaxLedgerService.post_payment_reversal(
+                previous["vehicle_id"], previous["amount"], payment=instance, memo=f"Payment {instance.refrence} reversed"
+            )
+
+        if instance.payment_status == "success":
+            VehicleLedgerService.apply_payment(instance.vehicle_id, instance.amount, instance.timestamp)
+            PaymentRollupService.add(
+                instance.vehicle_id, instance.amount, instance.timestamp,
+                instance.payment_method, instance.collected_by_id,
+            )
+            TaxLedgerService.post_payment(instance)
+
+    if previous and previous["payment_status"] == "success" and previous["vehicle_id"] != instance.vehicle_id:
+        ComplianceService.refresh_vehicle(previous["vehicle_id"])
+        ScanCardService.refresh(previous["vehicle_id"])
+
+    if instance.payment_status == "success" or (previous and previous["payment_status"] == "success"):
+        ComplianceService.refresh_vehicle(instance.vehicle_id)
+        ScanCardService.refresh(instance.vehicle_id)
+
+    _invalidate_cached_vehicle(instance)
+
+
+@receiver(post_delete, sender=Payment)
+def remove_payment_from_ledger(sender, instance, origin=None, **kwargs):
+    if _deleted_with_vehicle(origin):
+        return
+    if instance.payment_status == "success":
+        with transaction.atomic():
+            VehicleLedgerService.apply_payment(instance.vehicle_id, -instance.amount, instance.timestamp)
+            PaymentRollupService.remove(
+                instance.vehicle_id, instance.amount, instance.timestamp,
+                instance.payment_method, instance.collected_by_id,
+            )
+            TaxLedgerService.post_payment_reversal(
+                instance.vehicle_id, instance.amount, memo=f"Payment {instance.refrence} deleted"
+            )
+        ComplianceService.refresh_vehicle(instance.vehicle_id)
+        ScanCardService.refresh(instance.vehicle_id)
+    _invalidate_cached_vehicle(instance)
+
+
+# --- Exemptions ---
+@receiver(pre_save, sender=VehicleExemption)
+def remember_previous_exemption(sender, instance, raw=False, **kwargs):
+    instance._ledger_previous = None
+    if raw or instance._state.adding:
+        return
+    instance._ledger_previous = (
+        VehicleExemption.objects
+        .filter(pk=instance.pk)
+        .values("vehicle_id", "is_approved")
+        .first()
+    )
+
+
+@receiver(post_save, sender=VehicleExemption)
+def sync_exemption_ledger(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_ledger_previous", None)
+
+    # Spans and counters only depend on approved exemptions
+    if previous and previous["is_approved"] and previous["vehicle_id"] != instance.vehicle_id:
+        VehicleLedgerService.refresh_exemptions(previous["vehicle_id"])
+        TaxLedgerService.sync_exemption_credits(previous["vehicle_id"])
+        ComplianceService.refresh_vehicle(previous["vehicle_id"])
+        ScanCardService.refresh(previous["vehicle_id"])
+
+    if instance.is_approved or (previous and previous["is_approved"]):
+        VehicleLedgerService.refresh_exemptions(instance.vehicle_id)
+        TaxLedgerService.sync_exemption_credits(instance.vehicle_id)
+        ComplianceService.refresh_vehicle(instance.vehicle_id)
+        ScanCardService.refresh(instance.vehicle_id)
+
+    _invalidate_cached_vehicle(instance)
+
+
+@receiver(post_delete, sender=VehicleExemption)
+def remove_exemption_from_ledger(sender, instance, origin=None, **kwargs):
+    if _deleted_with_vehicle(origin):
+        return
+    if instance.is_approved:
+        VehicleLedgerService.refresh_exemptions(instance.vehicle_id)
+        TaxLedgerService.sync_exemption_credits(instance.vehicle_id)
+        ComplianceService.refresh_vehicle(instance.vehicle_id)
+        ScanCardService.refresh(instance.vehicle_id)
+    _invalidate_cached_vehicle(instance)
+
+
+# --- Rates ---
+@receiver(post_save, sender=DailyRate)
+@receiver(post_delete, sender=DailyRate)
+def sync_rate_schedule(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or _deleted_with_vehicle(origin):
+        return
+    if instance.vehicle_id is None:
+        # Fleet-wide change: every crossing date moves, so everyone is re-checked on the
+        # next process_status_crossings run (paid_through catches up on rebuild_ledger_state)
+        RateScheduleService.invalidate_global()
+        ComplianceService.recheck_all()
+        ScanCardService.invalidate_all()
+        VehicleChangeFeed.reset()
+        return
+    VehicleLedgerService.refresh_paid_through(instance.vehicle_id)
+    ComplianceService.refresh_vehicle(instance.vehicle_id)
+    ScanCardService.refresh(instance.vehicle_id)
+    VehicleChangeFeed.record(instance.vehicle_id)
+
+
+# --- No-charge calendar ---
+@receiver(post_save, sender=NoChargeDay)
+@receiver(post_delete, sender=NoChargeDay)
+def sync_no_charge_calendar(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Charges already posted on the day are credited back (or, when it's dropped, debited again)
+    TaxLedgerService.sync_no_charge_credits(days=[instance.date])
+    # Every crossing date may move: re-check everyone on the next process_status_crossings run
+    NoChargeCalendar.invalidate()
+    ComplianceService.recheck_all()
+    ScanCardService.invalidate_all()
+    VehicleChangeFeed.reset()
+
+
+# --- Agent change feed ---
+@receiver(post_save, sender=Vehicle)
+def feed_vehicle_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous_station_id = getattr(instance, "_previous_station_id", None)
+    if previous_station_id is not None and previous_station_id != instance.station_id:
+        # Moved: the old station's agents drop it from their copy
+        VehicleChangeFeed.record(instance.pk, deleted=True, station_id=previous_station_id)
+    VehicleChangeFeed.record(instance.pk)
+
+
+@receiver(post_delete, sender=Vehicle)
+def feed_vehicle_deletion(sender, instance, **kwargs):
+    VehicleChangeFeed.record(instance.pk, deleted=True, station_id=instance.station_id)
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+@receiver(post_save, sender=VehicleExemption)
+@receiver(post_delete, sender=VehicleExemption)
+def feed_vehicle_finance_change(sender, instance, raw=False, origin=None, **kwargs):
+    # Balance, tier or exemption state of the vehicle (and of the previous one, if moved);
+    # a deleted vehicle's tombstone comes from feed_vehicle_deletion
+    if raw or _deleted_with_vehicle(origin):
+        return
+    previous = getattr(instance, "_ledger_previous", None) or {}
+    VehicleChangeFeed.record_many([instance.vehicle_id, previous.get("vehicle_id")])
+
+
+# --- Compliance events ---
+@receiver(compliance_status_changed)
+def log_compliance_status_change(sender, vehicle_id, previous, current, **kwargs):
+    logger.info("Vehicle %s compliance status %s -> %s", vehicle_id, previous, current)
@@ -0,0 +1,27 @@
+import logging
+
+from celery import shared_task
+
+from apps.core.services.qr_codes import QRCodeService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=5, acks_late=True, ignore_result=True)
+def generate_qr_code(self, vehicle_id):
+    """
+    Renders and uploads one vehicle's sticker QR (see QRCodeService). Upload errors
+    are retried with backoff (10s, 20s, 40s, ... capped at 10 minutes); after the
+    last retry the vehicle is marked failed.
+    """
+    try:
+        elapsed = QRCodeService.generate(vehicle_id)
+    except Exception as exc:
+        if self.request.retries >= self.max_retries:
+            QRCodeService.mark_failed(vehicle_id)
+            logger.error("QR for vehicle %s failed after %s attempts", vehicle_id, self.request.retries + 1)
+            raise
+        raise self.retry(exc=exc, countdown=min(600, 10 * 2 ** self.request.retries))
+
+    if elapsed is not None:
+        logger.info("QR for vehicle %s made in %.0fms", vehicle_id, elapsed * 1000)
@@ -0,0 +1,18 @@
+import pytest
+from django.core.cache import cache
+
+from apps.core.services.no_charge_calendar import NoChargeCalendar
+from apps.core.services.rate_schedule import RateScheduleService
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Rolled back rows send no signals, so the cached (and per-process) rate
+    # schedule and no-charge calendar would outlive the test that made them
+    cache.clear()
+    NoChargeCalendar.invalidate()
+    RateScheduleService.invalidate_global()
+    yield
+    cache.clear()
+    NoChargeCalendar.invalidate()
+    RateScheduleService.invalidate_global()
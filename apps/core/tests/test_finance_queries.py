@@ -0,0 +1,52 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.core.models import DailyRate, NoChargeDay, Vehicle
+from apps.core.services.no_charge_calendar import NoChargeCalendar
+from apps.core.services.rate_schedule import RateScheduleService
+from apps.core.services.vehicle_finance import VehicleFinanceService
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def database_cache(settings):
+    # The production fallback, where every cache read is a query
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "test_cache"}
+    }
+    call_command("createcachetable", verbosity=0)
+
+
+def load_page(count):
+    with CaptureQueriesContext(connection) as queries:
+        vehicles = list(VehicleFinanceService.with_finance(Vehicle.objects.order_by("plate_number"))[:count])
+        for vehicle in vehicles:
+            VehicleFinanceService.snapshot(vehicle)
+    return len(queries)
+
+
+def test_finance_page_query_count_does_not_grow_with_the_page(database_cache, monkeypatch):
+    # Long enough that a slow run doesn't go back to the cache in between
+    monkeypatch.setattr(NoChargeCalendar, "LOCAL_SECONDS", 60)
+    monkeypatch.setattr(RateScheduleService, "LOCAL_SECONDS", 60)
+    today = timezone.now().date()
+    NoChargeDay.objects.create(date=today - timedelta(days=3), reason="holiday")
+    DailyRate.objects.create(rate=Decimal("200.00"), effective_from=today - timedelta(days=10))
+    for i in range(50):
+        Vehicle.objects.create(
+            plate_number=f"FQ-{i:03d}",
+            owner_name="Test Owner",
+            phone_number="08000000000",
+            is_approved_by_admin=True,
+            activated_at=timezone.now() - timedelta(days=20),
+        )
+
+    load_page(1)
+    assert load_page(50) == load_page(5)
@@ -0,0 +1,139 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from apps.core.models import DailyRate, NoChargeDay, Payment, Vehicle, VehicleExemption, VehicleLedgerState
+from apps.core.services.fleet_finance import FleetFinanceCalculator
+from apps.core.services.vehicle_finance import VehicleFinanceService
+
+pytestmark = pytest.mark.django_db
+
+FIELDS = [
+    "days_active", "exempted_days", "no_charge_days", "total_paid",
+    "expected_revenue", "balance", "compliance_status",
+]
+
+
+def at(day, hour):
+    return timezone.make_aware(datetime.combine(day, time(hour)))
+
+
+def make_vehicle(plate, activated_at, daily_rate="150.00", is_active=True):
+    return Vehicle.objects.create(
+        plate_number=plate,
+        owner_name="Test Owner",
+        phone_number="08000000000",
+        daily_rate=Decimal(daily_rate),
+        is_active=is_active,
+        is_approved_by_admin=True,
+        activated_at=activated_at,
+    )
+
+
+def pay(vehicle, amount, status="success"):
+    return Payment.objects.create(vehicle=vehicle, amount=Decimal(amount), payment_status=status)
+
+
+def exempt(vehicle, start, end, approved=True):
+    return VehicleExemption.objects.create(
+        vehicle=vehicle, start_date=start, end_date=end, reason="other", is_approved=approved
+    )
+
+
+@pytest.fixture
+def fleet():
+    today = timezone.now().date()
+
+    # Fleet-wide no-charge days, some inside the exemptions below
+    for offset in (3, 10, 11, 25, 40):
+        NoChargeDay.objects.create(date=today - timedelta(days=offset), reason="holiday")
+
+    # Global rate changes, before and after the per-vehicle overrides
+    DailyRate.objects.create(rate=Decimal("180.00"), effective_from=today - timedelta(days=50))
+    DailyRate.objects.create(rate=Decimal("200.50"), effective_from=today - timedelta(days=8))
+
+    vehicles = {
+        # Activated after 4 PM: the first day isn't billed
+        "late": make_vehicle("PT-001", at(today - timedelta(days=20), 17)),
+        "morning": make_vehicle("PT-002", at(today - timedelta(days=20), 9)),
+        "today": make_vehicle("PT-003", at(today, 18)),
+        "never": make_vehicle("PT-004", None, is_active=False),
+        "inactive": make_vehicle("PT-005", at(today - timedelta(days=30), 10), is_active=False),
+        "exempt": make_vehicle("PT-006", at(today - timedelta(days=45), 16), daily_rate="99.99"),
+        "override": make_vehicle("PT-007", at(today - timedelta(days=60), 8)),
+        "debtor": make_vehicle("PT-008", at(today - timedelta(days=70), 12), daily_rate="200.50"),
+        "no_state": make_vehicle("PT-009", at(today - timedelta(days=15), 15)),
+        "owing": make_vehicle("PT-010", at(today - timedelta(days=2), 9)),
+    }
+
+    # Overlapping, ongoing, future and unapproved exemptions
+    exempt(vehicles["exempt"], today - timedelta(days=12), today - timedelta(days=9))
+    exempt(vehicles["exempt"], today - timedelta(days=10), today - timedelta(days=6))
+    exempt(vehicles["exempt"], today - timedelta(days=2), today + timedelta(days=5))
+    exempt(vehicles["exempt"], today + timedelta(days=10), today + timedelta(days=12))
+    exempt(vehicles["late"], today - timedelta(days=5), today - timedelta(days=1), approved=False)
+    exempt(vehicles["override"], today - timedelta(days=41), today - timedelta(days=38))
+
+    # Per-vehicle overrides, one of them older than the latest global change
+    DailyRate.objects.create(vehicle=vehicles["override"], rate=Decimal("120.00"), effective_from=today - timedelta(days=30))
+    DailyRate.objects.create(vehicle=vehicles["override"], rate=Decimal("130.25"), effective_from=today - timedelta(days=4))
+    DailyRate.objects.create(vehicle=vehicles["late"], rate=Decimal("75.00"), effective_from=today - timedelta(days=2))
+
+    pay(vehicles["late"], "1500.00")
+    pay(vehicles["late"], "300.25", status="pending")
+    pay(vehicles["morning"], "10000.00")
+    pay(vehicles["exempt"], "999.90")
+    pay(vehicles["override"], "2000.00")
+    pay(vehicles["override"], "150.00", status="failed")
+    pay(vehicles["debtor"], "401.00")
+    pay(vehicles["no_state"], "450.00")
+    pay(vehicles["no_state"], "100.00", status="pending")
+    pay(vehicles["owing"], "300.00")
+
+    # A pending payment verified later is counted once
+    verified = pay(vehicles["debtor"], "250.00", status="pending")
+    verified.payment_status = "success"
+    verified.save()
+
+    # Vehicles without ledger counters fall back to the payment aggregate
+    VehicleLedgerState.objects.filter(vehicle=vehicles["no_state"]).delete()
+    return vehicles
+
+
+def per_object(vehicle_ids):
+    snapshots = {}
+    queryset = VehicleFinanceService.with_finance(Vehicle.objects.filter(pk__in=vehicle_ids))
+    for vehicle in queryset:
+        snapshot = VehicleFinanceService.snapshot(vehicle)
+        snapshots[vehicle.pk] = {field: getattr(snapshot, field) for field in FIELDS}
+    return snapshots
+
+
+def test_vectorized_results_match_per_object_service(fleet):
+    ids = [vehicle.pk for vehicle in fleet.values()]
+    expected = per_object(ids)
+    actual = FleetFinanceCalculator(Vehicle.objects.filter(pk__in=ids)).run().results()
+
+    assert actual.keys() == expected.keys()
+    for name, vehicle in fleet.items():
+        for field in FIELDS:
+            assert actual[vehicle.pk][field] == expected[vehicle.pk][field], (name, field)
+
+
+def test_seed_covers_every_tier_and_rule(fleet):
+    results = FleetFinanceCalculator(Vehicle.objects.all()).run().results()
+
+    statuses = {result["compliance_status"] for result in results.values()}
+    assert statuses == {"ACTIVE", "OWING", "INACTIVE_DUE_TO_DEBT"}
+    assert results[fleet["late"].pk]["days_active"] == results[fleet["morning"].pk]["days_active"] - 1
+    assert results[fleet["today"].pk]["days_active"] == 0
+    assert results[fleet["exempt"].pk]["exempted_days"] > 0
+    assert results[fleet["morning"].pk]["no_charge_days"] > 0
+    assert results[fleet["debtor"].pk]["total_paid"] == Decimal("651.00")
+    assert results[fleet["no_state"].pk]["total_paid"] == Decimal("450.00")
+
+
+def test_verify_parity_reports_no_mismatches(fleet):
+    assert FleetFinanceCalculator(Vehicle.objects.all()).run().verify_parity() == []
@@ -0,0 +1,56 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from apps.core.models import LedgerEntry, Payment, Vehicle
+from apps.core.services.payment_rollup import PaymentRollupService
+from apps.core.services.query_plans import QueryPlanService
+from apps.core.services.tax_ledger import TaxLedgerService
+from apps.users.models import Agent, User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def postgresql_only():
+    # SQLite plans say little about the production indexes
+    if connection.vendor != "postgresql":
+        pytest.skip("query plans are only checked on PostgreSQL")
+
+
+@pytest.fixture
+def seeded():
+    user = User.objects.create_user(email="plans-agent@example.com", password="unused", role="agent")
+    agent = Agent.objects.create(user=user, full_name="Plan Agent", phone="08000000000")
+    today = timezone.now().date()
+
+    for i in range(50):
+        vehicle = Vehicle.objects.create(
+            plate_number=f"QP-{i:03d}",
+            owner_name="Test Owner",
+            phone_number="08000000000",
+            is_approved_by_admin=True,
+        )
+        TaxLedgerService.open(vehicle.pk, today - timedelta(days=10))
+        for j in range(4):
+            Payment.objects.create(
+                vehicle=vehicle,
+                amount=Decimal("150.00"),
+                payment_status="success" if j % 2 else "pending",
+                collected_by=agent if j < 2 else None,
+                refrence=f"QP-REF-{i}-{j}" if j % 2 else None,
+            )
+    PaymentRollupService.rebuild()
+    assert LedgerEntry.objects.exists()
+
+
+def test_hot_queries_use_an_index(seeded):
+    queries = QueryPlanService.hot_queries()
+    assert queries
+
+    for name, queryset in queries:
+        plan = QueryPlanService.explain(queryset)
+        assert "Seq Scan" not in plan, f"{name}\n{plan}"
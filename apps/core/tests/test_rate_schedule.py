@@ -0,0 +1,70 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from apps.core.models import DailyRate, Vehicle
+from apps.core.services.vehicle_finance import VehicleFinanceService
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def today():
+    return timezone.now().date()
+
+
+def expected_revenue(vehicle):
+    return VehicleFinanceService.snapshot(Vehicle.objects.get(pk=vehicle.pk)).expected_revenue
+
+
+def make_vehicle(days_active, daily_rate):
+    return Vehicle.objects.create(
+        plate_number="RT-001",
+        owner_name="Test Owner",
+        phone_number="08000000000",
+        daily_rate=Decimal(daily_rate),
+        is_approved_by_admin=True,
+        activated_at=timezone.now() - timedelta(days=days_active - 1),
+    )
+
+
+def edit_rate(vehicle, daily_rate):
+    vehicle = Vehicle.objects.get(pk=vehicle.pk)
+    vehicle.daily_rate = Decimal(daily_rate)
+    vehicle.save()
+
+
+def test_editing_the_base_rate_keeps_global_prices_of_past_days(today):
+    DailyRate.objects.create(rate=Decimal("200.00"), effective_from=today - timedelta(days=29))
+    vehicle = make_vehicle(40, "150.00")
+    before = expected_revenue(vehicle)
+    assert before == 10 * Decimal("150.00") + 30 * Decimal("200.00")
+
+    edit_rate(vehicle, "180.00")
+
+    # Only today moves to the new rate
+    assert expected_revenue(vehicle) == before - Decimal("200.00") + Decimal("180.00")
+
+
+def test_later_global_changes_leave_pinned_days_alone(today):
+    DailyRate.objects.create(rate=Decimal("200.00"), effective_from=today - timedelta(days=29))
+    vehicle = make_vehicle(40, "150.00")
+    edit_rate(vehicle, "180.00")
+    before = expected_revenue(vehicle)
+
+    DailyRate.objects.create(rate=Decimal("250.00"), effective_from=today - timedelta(days=5))
+
+    assert expected_revenue(vehicle) == before
+
+
+def test_editing_twice_keeps_every_earlier_price(today):
+    DailyRate.objects.create(rate=Decimal("200.00"), effective_from=today - timedelta(days=29))
+    vehicle = make_vehicle(40, "150.00")
+    DailyRate.objects.create(vehicle=vehicle, rate=Decimal("120.00"), effective_from=today - timedelta(days=9))
+    before = expected_revenue(vehicle)
+    assert before == 10 * Decimal("150.00") + 20 * Decimal("200.00") + 10 * Decimal("120.00")
+
+    edit_rate(vehicle, "180.00")
+    assert expected_revenue(vehicle) == before - Decimal("120.00") + Decimal("180.00")
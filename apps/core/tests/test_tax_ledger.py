@@ -0,0 +1,82 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from apps.core.models import LedgerEntry, NoChargeDay, Payment, Vehicle, VehicleExemption, VehicleLedgerState
+from apps.core.services.tax_ledger import TaxLedgerService
+from apps.core.services.vehicle_finance import VehicleFinanceService
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def today():
+    return timezone.now().date()
+
+
+@pytest.fixture
+def vehicle(today):
+    vehicle = Vehicle.objects.create(
+        plate_number="TL-001",
+        owner_name="Test Owner",
+        phone_number="08000000000",
+        daily_rate=Decimal("150.00"),
+        is_approved_by_admin=True,
+        activated_at=timezone.now() - timedelta(days=9),
+    )
+    # Ledger opened with the vehicle, ten days ago
+    VehicleLedgerState.objects.filter(vehicle=vehicle).update(ledger_opened_on=today - timedelta(days=9))
+    return vehicle
+
+
+def ledger_balance(vehicle):
+    return TaxLedgerService.current_balance(vehicle.pk)
+
+
+def finance_balance(vehicle):
+    return VehicleFinanceService.snapshot(Vehicle.objects.get(pk=vehicle.pk)).balance
+
+
+def test_a_missed_run_is_caught_up(vehicle, today):
+    TaxLedgerService.accrue_charges(today - timedelta(days=6))
+    # Nothing runs for five days, then the next run charges every day in between
+    TaxLedgerService.accrue_charges(today)
+
+    charges = LedgerEntry.objects.filter(vehicle=vehicle, entry_type="charge")
+    assert charges.count() == 10
+    assert ledger_balance(vehicle) == finance_balance(vehicle) == Decimal("-1500.00")
+
+    assert TaxLedgerService.accrue_charges(today) == 0
+    assert charges.count() == 10
+
+
+def test_catching_up_after_a_later_entry(vehicle, today):
+    TaxLedgerService.accrue_charges(today - timedelta(days=3))
+    # Posted today, so the two missed days can't go on their own dates any more
+    Payment.objects.create(vehicle=vehicle, amount=Decimal("300.00"), payment_status="success")
+    TaxLedgerService.accrue_charges(today)
+
+    late = LedgerEntry.objects.filter(vehicle=vehicle, entry_type="adjustment", posted_date=today)
+    assert late.count() == 2
+    assert ledger_balance(vehicle) == finance_balance(vehicle) == Decimal("-1200.00")
+
+
+def test_no_charge_day_declared_after_accrual(vehicle, today):
+    TaxLedgerService.accrue_charges(today)
+    holiday = NoChargeDay.objects.create(date=today - timedelta(days=3), reason="holiday")
+    assert ledger_balance(vehicle) == finance_balance(vehicle) == Decimal("-1350.00")
+
+    holiday.delete()
+    assert ledger_balance(vehicle) == finance_balance(vehicle) == Decimal("-1500.00")
+
+
+def test_no_charge_day_inside_an_exemption_is_credited_once(vehicle, today):
+    TaxLedgerService.accrue_charges(today)
+    NoChargeDay.objects.create(date=today - timedelta(days=3), reason="holiday")
+    VehicleExemption.objects.create(
+        vehicle=vehicle, start_date=today - timedelta(days=4), end_date=today - timedelta(days=2),
+        reason="other", is_approved=True,
+    )
+    assert ledger_balance(vehicle) == finance_balance(vehicle) == Decimal("-1050.00")
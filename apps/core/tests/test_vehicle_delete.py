@@ -0,0 +1,58 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from apps.core.models import (
+    DailyRate, LedgerEntry, Payment, PaymentDailyRollup, Vehicle, VehicleExemption, VehicleLedgerState,
+)
+
+# Real commits: foreign keys are only checked when the delete's transaction commits
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def vehicle():
+    today = timezone.now().date()
+    vehicle = Vehicle.objects.create(
+        plate_number="DEL-001",
+        owner_name="Test Owner",
+        phone_number="08000000000",
+        is_approved_by_admin=True,
+        activated_at=timezone.now() - timedelta(days=10),
+    )
+    Payment.objects.create(vehicle=vehicle, amount=Decimal("300.00"), payment_status="success")
+    Payment.objects.create(vehicle=vehicle, amount=Decimal("150.00"), payment_status="pending")
+    VehicleExemption.objects.create(
+        vehicle=vehicle, start_date=today - timedelta(days=3), end_date=today, reason="other", is_approved=True
+    )
+    DailyRate.objects.create(vehicle=vehicle, rate=Decimal("120.00"), effective_from=today - timedelta(days=2))
+    return vehicle
+
+
+def assert_nothing_left(vehicle_id):
+    assert not Vehicle.objects.filter(pk=vehicle_id).exists()
+    assert not Payment.objects.filter(vehicle_id=vehicle_id).exists()
+    assert not VehicleLedgerState.objects.filter(vehicle_id=vehicle_id).exists()
+    assert not PaymentDailyRollup.objects.filter(vehicle_id=vehicle_id).exists()
+    assert not LedgerEntry.objects.filter(vehicle_id=vehicle_id).exists()
+
+
+def test_deleting_a_vehicle_with_payments(vehicle):
+    assert PaymentDailyRollup.objects.filter(vehicle=vehicle).exists()
+    vehicle_id = vehicle.pk
+    vehicle.delete()
+    assert_nothing_left(vehicle_id)
+
+
+def test_deleting_vehicles_through_a_queryset(vehicle):
+    vehicle_id = vehicle.pk
+    Vehicle.objects.filter(pk=vehicle_id).delete()
+    assert_nothing_left(vehicle_id)
+
+
+def test_deleting_a_payment_still_updates_the_counters(vehicle):
+    Payment.objects.filter(vehicle=vehicle, payment_status="success").get().delete()
+    assert VehicleLedgerState.objects.get(vehicle=vehicle).total_paid == Decimal("0.00")
+    assert not PaymentDailyRollup.objects.filter(vehicle=vehicle).exists()
@@ -2,6 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from utils.payments_utils import PaystackGateway
 from apps.core.models import Payment, Vehicle
 import uuid
@@ -82,11 +83,15 @@ class VerifyPaymentView(APIView):
         # Call our Gateway to check real status
         is_successful = PaystackGateway.verify_payment(ref)
 
-        if is_successful:
-            payment.payment_status = 'success'
+        with transaction.atomic():
+            # Lock and re-read: a concurrent verify may have completed it meanwhile
+            payment = Payment.objects.select_for_update().get(pk=payment.pk)
+            if payment.payment_status == 'success':
+                return Response({"message": "Payment already verified"}, status=200)
+            payment.payment_status = 'success' if is_successful else 'failed'
             payment.save()
+
+        if is_successful:
             return Response({"message": "Payment successful!", "status": "success"}, status=200)
         else:
-            payment.payment_status = 'failed'
-            payment.save()
             return Response({"message": "Payment failed verification", "status": "failed"}, status=400)
\ No newline at end of file
@@ -11,6 +11,7 @@ class DriverPaymentCreateSerializer(serializers.ModelSerializer):
 
 from rest_framework import serializers
 from apps.core.models import Payment, Vehicle, VehicleExemption
+from apps.core.services.vehicle_finance import VehicleFinanceService
 
 class VehicleExemptionSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -36,14 +37,15 @@ class PaymentSerializer(serializers.ModelSerializer):
 class TaxpayerVehicleSerializer(serializers.ModelSerializer):
     current_balance = serializers.FloatField(read_only=True)
     compliance_status = serializers.ReadOnlyField() # The new 7-day rule status
-    daily_rate = serializers.FloatField(read_only=True)
+    daily_rate = serializers.FloatField(source='current_daily_rate', read_only=True)
+    qr_status = serializers.CharField(read_only=True) # qr_code is null until "ready"
     
     recent_payments = serializers.SerializerMethodField()
 
     class Meta:
         model = Vehicle
         fields = [
-            'id', 'plate_number', "owner", 'owner_name', 'phone_number', 'qr_code',
+            'id', 'plate_number', "owner", 'owner_name', 'phone_number', 'qr_code', 'qr_status',
             'is_active', 'created_at',
             'current_balance', 'daily_rate',
             'compliance_status', 
@@ -51,7 +53,7 @@ class TaxpayerVehicleSerializer(serializers.ModelSerializer):
         ]
 
     def get_recent_payments(self, obj):
-        payments = obj.payments.order_by('-timestamp')[:5] # Increased to 5 for better context
+        payments = VehicleFinanceService.get_recent_payments(obj, limit=5) # Increased to 5 for better context
         return PaymentSerializer(payments, many=True).data
 
     def qr_code(self, obj):
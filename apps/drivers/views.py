@@ -13,6 +13,7 @@ from rest_framework.views import APIView
 from rest_framework import status
 from apps.users.models import  TaxPayer
 import random
+from utils.plates import plate_key
 from utils.permissions import (
     IsAgent, 
     IsTaxPayer
@@ -21,6 +22,7 @@ from apps.core.models import(
     Vehicle, 
     Payment
 )
+from apps.core.services.vehicle_finance import VehicleFinanceService
 from .serializers import (
     PaymentSerializer, 
     TaxpayerVehicleSerializer,
@@ -37,7 +39,9 @@ class TaxpayerVehicleListView(generics.ListAPIView):
         # 1. Get the TaxPayer profile associated with the logged-in User
         taxpayer = get_object_or_404(TaxPayer, user=self.request.user)
         # 2. Return all vehicles linked to this TaxPayer
-        return Vehicle.objects.filter(owner=taxpayer).order_by('-created_at')
+        return VehicleFinanceService.with_finance(
+            Vehicle.objects.filter(owner=taxpayer)
+        ).order_by('-created_at')
 
 
 # Mock function for sending SMS (Replace with Twilio/Termii/KudiSMS later)
@@ -49,7 +53,6 @@ class ClaimProfileView(APIView):
     permission_classes = [IsTaxPayer]
     
     def get(self, request, plate_number):
-        plate_number = plate_number.upper().strip()
         
         # --- CHECK 1: Does THIS user already have a vehicle? ---
         # Assuming your TaxPayer model is linked to User, and Vehicle is linked to TaxPayer
@@ -67,7 +70,7 @@ class ClaimProfileView(APIView):
 
         # --- CHECK 2: Find the vehicle ---
         try:
-            vehicle = Vehicle.objects.get(plate_number=plate_number)
+            vehicle = Vehicle.objects.get(plate_key=plate_key(plate_number))
         except Vehicle.DoesNotExist:
             return Response(
                 {"error": "Vehicle not found. Please check the plate number."}, 
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def stations_from_locations(apps, schema_editor):
+    # The free-text station_location becomes a Station (same spelling, trimmed)
+    Agent = apps.get_model('users', 'Agent')
+    Station = apps.get_model('core', 'Station')
+    for agent in Agent.objects.exclude(station_location='').iterator():
+        name = agent.station_location.strip()
+        if name:
+            agent.station, _ = Station.objects.get_or_create(name=name)
+            agent.save(update_fields=['station'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_stations'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agent',
+            name='station',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='agents', to='core.station'),
+        ),
+        migrations.RunPython(stations_from_locations, migrations.RunPython.noop),
+    ]
@@ -32,6 +32,8 @@ class Agent(models.Model):
     full_name = models.CharField(max_length=100)
     phone = models.CharField(max_length=100)
     station_location = models.CharField(max_length=100, blank=True)
+    # Scopes the agent's vehicle list, search, scans and sync feed; None = whole fleet
+    station = models.ForeignKey("core.Station", on_delete=models.SET_NULL, null=True, blank=True, related_name="agents")
     active_status = models.CharField(max_length=100, choices=ACTIVE_STATUS_CHOICES, default="active")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -73,6 +73,17 @@ STORAGES = {
     },
 }
 
+# --- Background jobs (celery) ---
+# Deployments set CELERY_BROKER_URL (a redis:// URL, see render.yaml) and run
+# `celery -A src worker`. Without a broker nothing is queued: QR codes stay pending
+# until the generate_qr_codes command (a cron on render) makes them.
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL')
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Rendered QR codes by content hash (utils/qr_assets.py); safe to delete
+QR_ASSET_DIR = BASE_DIR / '.qr_assets'
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
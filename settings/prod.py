@@ -32,12 +32,28 @@ STORAGES = {
 }
 
 
-# Free-tier friendly cache
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+# Shared by every process (gunicorn workers, the celery worker, cron jobs): scan
+# cards, dashboard responses and the search / payments version counters are
+# invalidated by whichever process writes, so a per-process cache would keep
+# serving stale balances. Redis when REDIS_URL is set, otherwise a database table
+# (created with `python manage.py createcachetable`).
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            },
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "django_cache",
+        }
     }
-}
 
 LOGGING = {
     "version": 1,
@@ -0,0 +1,11 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings.dev')
+
+app = Celery('src')
+
+# All CELERY_* settings (see settings/base.py)
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
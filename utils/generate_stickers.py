@@ -1,65 +1,53 @@
-import qrcode
-from PIL import Image, ImageDraw, ImageFont
+"""
+Printable keke stickers: the plate's QR with the plate number under it, as SVG
+(vector, so it prints sharp at any size). The QR comes from the shared asset
+cache (utils/qr_assets.py), so reprinting a plate doesn't render it again.
+
+    python -m utils.generate_stickers AD-1234 AD-555-YL
+"""
 import os
+import re
+import sys
+from xml.sax.saxutils import escape
+
+from utils.qr_assets import qr_assets
 
 # Create a folder to save the stickers
 OUTPUT_FOLDER = "generated_stickers"
-if not os.path.exists(OUTPUT_FOLDER):
-    os.makedirs(OUTPUT_FOLDER)
-
-def generate_sticker(plate_number):
-    # 1. Generate the QR Code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_H, # High error correction (good for stickers that might get scratched)
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(plate_number)
-    qr.make(fit=True)
 
-    qr_img = qr.make_image(fill_color="black", back_color="white").convert('RGB')
+# Space under the QR for the plate number, in QR modules
+TEXT_BAND = 7
 
-    # 2. Create a Canvas (QR Code + Space for Text)
-    # We add 60 pixels at the bottom for the text
-    canvas_width = qr_img.width
-    canvas_height = qr_img.height + 60 
-    
-    final_image = Image.new('RGB', (canvas_width, canvas_height), 'white')
-    
-    # Paste the QR code onto the canvas
-    final_image.paste(qr_img, (0, 0))
 
-    # 3. Draw the Plate Number Text
-    draw = ImageDraw.Draw(final_image)
-    
-    # Load a font (Using default if custom font not found)
-    try:
-        # Try to use a nice bold font if available on your system (adjust path as needed)
-        font = ImageFont.truetype("arial.ttf", 30)
-    except IOError:
-        font = ImageFont.load_default()
+def sticker_svg(plate_number):
+    # High error correction: good for stickers that might get scratched
+    qr = qr_assets.svg(plate_number, error_correction="H").content.decode()
+    size = int(re.search(r'viewBox="0 0 (\d+)', qr).group(1))
+    # The QR goes in as a nested <svg>, sized to the top square of the sticker
+    qr = qr.replace("<svg ", f'<svg width="{size}" height="{size}" ', 1)
 
-    # Calculate text size to center it
-    # Note: textbbox is the modern replacement for textsize in newer Pillow versions
-    bbox = draw.textbbox((0, 0), plate_number, font=font)
-    text_width = bbox[2] - bbox[0]
-    text_height = bbox[3] - bbox[1]
-    
-    x_position = (canvas_width - text_width) / 2
-    y_position = qr_img.height + 10 # 10px padding below QR
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size + TEXT_BAND}">'
+        f'<rect width="{size}" height="{size + TEXT_BAND}" fill="#fff"/>'
+        f'{qr}'
+        f'<text x="{size / 2}" y="{size + TEXT_BAND - 2}" text-anchor="middle" font-family="Arial, Helvetica, sans-serif" '
+        f'font-weight="bold" font-size="5">{escape(plate_number)}</text>'
+        f'</svg>'
+    )
 
-    draw.text((x_position, y_position), plate_number, fill="black", font=font)
 
-    # 4. Save the file
-    filename = f"{OUTPUT_FOLDER}/{plate_number}.png"
-    final_image.save(filename)
+def generate_sticker(plate_number):
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    filename = f"{OUTPUT_FOLDER}/{plate_number}.svg"
+    with open(filename, "w") as f:
+        f.write(sticker_svg(plate_number))
     print(f"✅ Generated Sticker: {filename}")
 
+
 # --- RUN THE SCRIPT ---
 if __name__ == "__main__":
-    # List of plates to generate
-    plates_to_print = [
+    # Plates from the command line, or a sample sheet
+    plates_to_print = sys.argv[1:] or [
         "AD-1234",
         "AD-555-YL",
         "AD-999-AB"
@@ -68,4 +56,4 @@ if __name__ == "__main__":
     print("🖨️  Generating Keke Stickers...")
     for plate in plates_to_print:
         generate_sticker(plate)
-    print("Done! Check the 'generated_stickers' folder.")
\ No newline at end of file
+    print("Done! Check the 'generated_stickers' folder.")
@@ -0,0 +1,238 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import F, OrderBy, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Row count of a queryset without COUNT(*) where the database can tell: on
+    PostgreSQL the planner's estimate (EXPLAIN), elsewhere an exact count.
+    Returns (count, is_estimate).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count(), False
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"]), True
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination: each page is `WHERE (keys) beyond the cursor ORDER BY
+    keys LIMIT n`, an index range scan no matter how deep the page, instead of an
+    OFFSET that reads and throws away every earlier row.
+
+    The keys are the queryset's own ordering (so ?ordering= and custom sorts keep
+    working) with the primary key appended as tie-breaker, e.g. (created_at, id).
+    Nullable keys sort last. Cursors are opaque base64 tokens for the next/previous
+    links. There is no total by default; ?count=estimate adds the planner's estimate
+    (see estimate_count) and ?count=exact a real COUNT(*).
+    """
+
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    default_ordering = ("-created_at",)
+    invalid_cursor_message = "Invalid cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.keys = self.get_keys(queryset)
+        self.count, self.count_is_estimate = self.get_count(queryset, request)
+
+        cursor = self.decode_cursor(request)
+        self.reverse = cursor is not None and cursor[0]
+        if cursor is not None:
+            queryset = queryset.filter(self.seek(self.keys, cursor[1], self.reverse))
+        queryset = queryset.order_by(*self.order_by(self.keys, self.reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.rows = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        body = OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+        ])
+        if self.count is not None:
+            body["count"] = self.count
+            body["count_is_estimate"] = self.count_is_estimate
+        body["results"] = data
+        return Response(body)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == "estimate":
+            return estimate_count(queryset)
+        if mode == "exact":
+            return queryset.count(), False
+        return None, False
+
+    # --- Keys ---
+
+    @staticmethod
+    def resolve_field(model, path):
+        field = None
+        for part in path.split("__"):
+            field = model._meta.get_field(part)
+            model = field.related_model
+        return field
+
+    def get_keys(self, queryset):
+        """
+        [(path, descending, nullable, field)] from the queryset ordering, pk last.
+        """
+        model = queryset.model
+        pk_name = model._meta.pk.name
+        ordering = queryset.query.order_by or self.default_ordering
+
+        keys = []
+        for item in ordering:
+            if isinstance(item, str):
+                if item == "?":
+                    continue
+                descending, path = item.startswith("-"), item.lstrip("-")
+            elif isinstance(item, OrderBy) and isinstance(item.expression, F):
+                descending, path = item.descending, item.expression.name
+            else:
+                continue
+
+            if path == "pk":
+                path = pk_name
+            if path in queryset.query.annotations:
+                # e.g. a search rank
+                field, nullable = queryset.query.annotations[path].output_field, True
+            else:
+                field = self.resolve_field(model, path)
+                # A value behind a relation can be missing even if the column can't be NULL
+                nullable = field.null or "__" in path
+            keys.append((path, descending, nullable, field))
+            if path == pk_name:
+                return keys
+
+        descending = keys[0][1] if keys else False
+        keys.append((pk_name, descending, False, model._meta.pk))
+        return keys
+
+    @staticmethod
+    def order_by(keys, reverse=False):
+        ordering = []
+        for path, descending, nullable, _ in keys:
+            descending = descending != reverse
+            if nullable:
+                expression = F(path).desc if descending else F(path).asc
+                ordering.append(expression(nulls_first=True) if reverse else expression(nulls_last=True))
+            else:
+                ordering.append(f"-{path}" if descending else path)
+        return ordering
+
+    def seek(self, keys, values, reverse):
+        """
+        Rows strictly after the cursor in page order (before it when `reverse`);
+        NULLs come after every value.
+        """
+        (path, descending, nullable, _), value = keys[0], values[0]
+        beyond = "lt" if descending != reverse else "gt"
+
+        if len(keys) == 1:
+            return Q(**{f"{path}__{beyond}": value})
+        tail = self.seek(keys[1:], values[1:], reverse)
+
+        if value is None:
+            if reverse:
+                return Q(**{f"{path}__isnull": False}) | (Q(**{f"{path}__isnull": True}) & tail)
+            return Q(**{f"{path}__isnull": True}) & tail
+
+        condition = Q(**{f"{path}__{beyond}": value}) | (Q(**{path: value}) & tail)
+        if nullable and not reverse:
+            condition |= Q(**{f"{path}__isnull": True})
+        return condition
+
+    # --- Cursors ---
+
+    @staticmethod
+    def value_of(obj, path):
+        value = obj
+        for part in path.split("__"):
+            try:
+                value = getattr(value, part)
+            except ObjectDoesNotExist:
+                return None
+            if value is None:
+                return None
+        return value
+
+    def encode_cursor(self, obj, reverse):
+        values = []
+        for path, _, _, _ in self.keys:
+            value = self.value_of(obj, path)
+            if value is not None:
+                value = value.isoformat() if hasattr(value, "isoformat") else str(value)
+            values.append(value)
+        token = json.dumps([int(reverse), values], separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(token).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        """
+        (reverse, key values) of the ?cursor= token, or None on the first page.
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            reverse, raw = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            if len(raw) != len(self.keys):
+                raise ValueError
+            values = [
+                None if value is None else field.to_python(value)
+                for value, (_, _, _, field) in zip(raw, self.keys)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), values
+
+    def get_next_link(self):
+        if not self.has_next or not self.rows:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.rows[-1], False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.rows:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.rows[0], True))
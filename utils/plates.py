@@ -0,0 +1,60 @@
+import re
+
+from django.db.models import Q
+from django.http import Http404
+from rest_framework import serializers
+
+
+def plate_key(value):
+    """
+    Canonical form of a plate number: "ad-123 4", "AD 1234" and "ad1234" are all
+    "AD1234". Stored as Vehicle.plate_key (unique) and used for every plate lookup.
+    """
+    return re.sub(r"[^A-Z0-9]", "", (value or "").upper())
+
+
+def validate_plate_available(value, instance=None):
+    """
+    Serializer check that no other vehicle already has this plate under another
+    spelling (the unique index would otherwise surface as a server error).
+    """
+    from apps.core.models import Vehicle
+
+    key = plate_key(value)
+    if not key:
+        raise serializers.ValidationError("Enter a plate number with letters or digits.")
+    # An unchanged plate is always fine, including one left suffixed by migration 0014
+    if instance is not None and (value or "").upper().strip() == instance.plate_number:
+        return value
+    others = Vehicle.objects.filter(plate_key=key)
+    if instance is not None:
+        others = others.exclude(pk=instance.pk)
+    if others.exists():
+        raise serializers.ValidationError("A vehicle with this plate number already exists.")
+    return value
+
+
+class PlateLookupMixin:
+    """
+    For vehicle viewsets routed by plate: resolves the URL plate through
+    Vehicle.plate_key, so any spelling of it is one unique-index probe.
+
+    The exact stored plate_number wins over the key, so a vehicle whose key was
+    suffixed by migration 0014 (see the plate_collisions command) is still reached
+    through its own spelling and can be corrected.
+    """
+
+    lookup_field = 'plate_number'
+
+    def get_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        value = self.kwargs[lookup_url_kwarg]
+        exact = value.upper().strip()
+
+        candidates = list(queryset.filter(Q(plate_number=exact) | Q(plate_key=plate_key(value)))[:2])
+        if not candidates:
+            raise Http404("No Vehicle matches the given query.")
+        vehicle = next((candidate for candidate in candidates if candidate.plate_number == exact), candidates[0])
+        self.check_object_permissions(self.request, vehicle)
+        return vehicle
@@ -0,0 +1,174 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from typing import NamedTuple
+
+import qrcode
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class QRAsset(NamedTuple):
+    digest: str
+    content: bytes
+    content_type: str
+
+
+class QRAssetCache:
+    """
+    Rendered QR codes by content hash: a payload (plate, receipt URL, ...) is rendered
+    once, as SVG and/or PNG, and kept under sha256(render version, error correction,
+    payload). Lookups go through a bounded in-memory LRU, then a disk folder shared
+    by every process on the host, and only then render.
+
+    SVG is one stroked <path> of horizontal module runs (scalable for stickers and
+    print, and a few hundred bytes once gzipped); PNG is 1-bit, BOX_SIZE pixels per
+    module, about a third of the old RGB canvas.
+    Used for the vehicle QR (QRCodeService), the PDF receipt and the sticker sheets.
+
+    The folder is settings.QR_ASSET_DIR (default .qr_assets/ in the project). Entries
+    never go stale, so any of them can be deleted at any time.
+    """
+
+    # Bump when the output changes, so earlier files are no longer looked up
+    RENDER_VERSION = "1"
+    BOX_SIZE = 10
+    BORDER = 4
+    FORMATS = {"svg": "image/svg+xml", "png": "image/png"}
+    ERROR_CORRECTION = {
+        "L": qrcode.constants.ERROR_CORRECT_L,
+        "M": qrcode.constants.ERROR_CORRECT_M,
+        "Q": qrcode.constants.ERROR_CORRECT_Q,
+        "H": qrcode.constants.ERROR_CORRECT_H,
+    }
+
+    def __init__(self, directory=None, max_entries=256):
+        self._directory = Path(directory) if directory is not None else None
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "renders": 0}
+
+    @property
+    def directory(self):
+        if self._directory is None:
+            from django.conf import settings
+
+            default = Path(__file__).resolve().parent.parent / ".qr_assets"
+            self._directory = Path(getattr(settings, "QR_ASSET_DIR", default) if settings.configured else default)
+        return self._directory
+
+    @classmethod
+    def digest(cls, payload, error_correction="M"):
+        return hashlib.sha256(f"{cls.RENDER_VERSION}|{error_correction}|{payload}".encode()).hexdigest()
+
+    def get(self, payload, fmt="svg", error_correction="M"):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown QR format {fmt!r}")
+        if error_correction not in self.ERROR_CORRECTION:
+            raise ValueError(f"Unknown error correction {error_correction!r}")
+
+        digest = self.digest(payload, error_correction)
+        key = (digest, fmt)
+        with self._lock:
+            content = self._memory.get(key)
+            if content is not None:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return QRAsset(digest, content, self.FORMATS[fmt])
+
+        path = self.directory / digest[:2] / f"{digest}.{fmt}"
+        try:
+            content = path.read_bytes()
+            counter = "disk_hits"
+        except OSError:
+            content = self._render(payload, fmt, error_correction)
+            counter = "renders"
+            self._write(path, content)
+
+        with self._lock:
+            self.counters[counter] += 1
+            self._memory[key] = content
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+        return QRAsset(digest, content, self.FORMATS[fmt])
+
+    def svg(self, payload, error_correction="M"):
+        return self.get(payload, "svg", error_correction)
+
+    def png(self, payload, error_correction="M"):
+        return self.get(payload, "png", error_correction)
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, "memory_entries": len(self._memory), "max_entries": self.max_entries}
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    # --- Rendering ---
+    def _render(self, payload, fmt, error_correction):
+        qr = qrcode.QRCode(
+            error_correction=self.ERROR_CORRECTION[error_correction],
+            box_size=1,
+            border=self.BORDER,
+        )
+        qr.add_data(payload)
+        qr.make(fit=True)
+        matrix = qr.get_matrix()
+        return self._svg(matrix) if fmt == "svg" else self._png(matrix)
+
+    @staticmethod
+    def _svg(matrix):
+        # Each run of dark modules is a 1-unit stroke along the row's centre line;
+        # runs after the first in a row are relative moves ("m3 0h2"), the shortest form
+        size = len(matrix)
+        path = []
+        for y, row in enumerate(matrix):
+            x, pen = 0, None
+            while x < size:
+                if not row[x]:
+                    x += 1
+                    continue
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                path.append(f"M{start} {y}.5h{x - start}" if pen is None else f"m{start - pen} 0h{x - start}")
+                pen = x
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+            f'<path fill="#fff" d="M0 0h{size}v{size}H0z"/><path stroke="#000" d="{"".join(path)}"/></svg>'
+        ).encode()
+
+    def _png(self, matrix):
+        size = len(matrix)
+        image = Image.new("1", (size, size), 1)
+        image.putdata([0 if module else 1 for row in matrix for module in row])
+        image = image.resize((size * self.BOX_SIZE, size * self.BOX_SIZE), Image.NEAREST)
+        buffer = BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _write(path, content):
+        # Written under a temporary name and renamed, so readers never see half a file
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning("Could not store QR asset %s", path, exc_info=True)
+
+
+# Shared by the whole process
+qr_assets = QRAssetCache()
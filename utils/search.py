@@ -0,0 +1,36 @@
+from django.db.models import Case, FloatField, Value, When
+from rest_framework.filters import BaseFilterBackend
+
+from apps.core.services.vehicle_search import VehicleSearchService
+
+
+class VehicleSearchFilter(BaseFilterBackend):
+    """
+    ?search= for vehicle lists, ranked by VehicleSearchService and served by its
+    indexes (SearchFilter's ILIKE '%q%' reads the whole table on every keystroke).
+
+    Views choose what can be searched with `search_scopes` (default: plate, phone
+    and owner name). Results come best match first; the rank is annotated as
+    `search_rank` so keyset pagination can page through them.
+    """
+
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+
+        scopes = getattr(view, "search_scopes", VehicleSearchService.SCOPES)
+        station_id = view.get_station_id() if hasattr(view, "get_station_id") else None
+        ranked = VehicleSearchService.search(query, scopes, station_id=station_id)
+        if not ranked:
+            return queryset.none()
+
+        rank = Case(*[When(pk=pk, then=Value(score)) for pk, score in ranked], output_field=FloatField())
+        return (
+            queryset
+            .filter(pk__in=[pk for pk, _ in ranked])
+            .annotate(search_rank=rank)
+            .order_by("-search_rank", "pk")
+        )